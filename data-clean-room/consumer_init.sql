@@ -75,8 +75,8 @@ create or replace function dcr_samp_consumer.util.get_sql_jinja(template string,
   returns string
   language python
   runtime_version = 3.8
-  handler='apply_sql_template'
-  packages = ('six','jinja2==3.0.3','markupsafe')
+  handler='apply_sql_templates'
+  packages = ('six','jinja2==3.0.3','markupsafe','pandas')
   comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“consumer”}}'
 as
 $$
@@ -84,7 +84,7 @@ $$
 from __future__ import unicode_literals
 import jinja2
 from six import string_types
-from copy import deepcopy
+import hashlib
 import os
 import re
 from jinja2 import Environment
@@ -99,7 +99,7 @@ except ImportError:
     # For Python 2.6 and less
     from ordereddict import OrderedDict
 
-from threading import local
+from threading import local, Lock
 from random import Random
 
 _thread_local = local()
@@ -278,6 +278,32 @@ class JinjaSql(object):
             del _thread_local.param_index
 
 # Non-JinjaSql package code starts here
+
+# A single JinjaSql environment is shared by every call in the UDF process, and compiled templates are kept in an LRU
+# keyed by the template text hash, so validating many requests for the same template compiles it only once
+COMPILED_TEMPLATE_CACHE_SIZE = 256
+_jinja_sql = JinjaSql(param_style='pyformat')
+_compiled_templates = OrderedDict()
+_compiled_templates_lock = Lock()
+
+def get_compiled_template(template):
+    '''
+    Returns the compiled jinja Template for a template string, compiling it on first use.
+    '''
+    key = hashlib.sha256(template.encode('utf-8')).hexdigest()
+    with _compiled_templates_lock:
+        compiled = _compiled_templates.get(key)
+        if compiled is not None:
+            _compiled_templates.move_to_end(key)
+            return compiled
+
+    compiled = _jinja_sql.env.from_string(template)
+    with _compiled_templates_lock:
+        _compiled_templates[key] = compiled
+        while len(_compiled_templates) > COMPILED_TEMPLATE_CACHE_SIZE:
+            _compiled_templates.popitem(last=False)
+    return compiled
+
 def quote_sql_string(value):
     '''
     If `value` is a string type, escapes single quotes in the string
@@ -294,9 +320,8 @@ def quote_sql_string(value):
 def get_sql_from_template(query, bind_params):
     if not bind_params:
         return query
-    params = deepcopy(bind_params)
-    for key, val in params.items():
-        params[key] = quote_sql_string(val)
+    # bind params are only read here, so quote into a new dict instead of deep copying them
+    params = {key: quote_sql_string(val) for key, val in bind_params.items()}
     return query % params
 
 def strip_blank_lines(text):
@@ -311,10 +336,31 @@ def apply_sql_template(template, parameters):
     Apply a JinjaSql template (string) substituting parameters (dict) and return
     the final SQL.
     '''
-    j = JinjaSql(param_style='pyformat')
-    query, bind_params = j.prepare_query(template, parameters)
+    query, bind_params = _jinja_sql.prepare_query(get_compiled_template(template), parameters)
     return strip_blank_lines(get_sql_from_template(query, bind_params))
 
+import json
+import pandas
+
+def apply_sql_templates(df):
+    '''
+    Vectorized handler of the UDF. Applies the JinjaSql templates (column 0) to their parameters (column 1) for a
+    batch of rows, so set-based callers compile each distinct template once per batch. Rows without a template or
+    parameters return NULL.
+    '''
+    results = []
+    for template, parameters in zip(df[0], df[1]):
+        if not isinstance(template, string_types) or parameters is None:
+            results.append(None)
+            continue
+        if isinstance(parameters, string_types):
+            parameters = json.loads(parameters)
+        results.append(apply_sql_template(template, parameters))
+    return pandas.Series(results, dtype=object)
+
+apply_sql_templates._sf_vectorized_input = pandas.DataFrame
+apply_sql_templates._sf_max_batch_size = 1000
+
 $$;
 
 
@@ -356,6 +402,24 @@ alter share dcr_samp_requests_PROVIDER_ACCT add accounts = PROVIDER_ACCT;
 //select * from dcr_samp_app.cleanroom.instance;
 
 
+///////
+// CONSUMER_ACCT SETS UP THE RESULT CACHE
+///////
+
+// results of approved requests, keyed by the hash of the proposed query without its request id, so a repeated request
+// returns the cached result until it is older than the TTL or the provider data changed. A timestamp passed with the
+// request is part of the key, while the default SYSDATE() is left out. Changes to consumer data are only covered by
+// the TTL
+create or replace table dcr_samp_consumer.PROVIDER_ACCT_schema.result_cache (cache_key varchar(64), request_id varchar(1000),
+    template_name varchar(1000), result variant, data_version varchar(1000), cached_ts timestamp_ltz)
+comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“consumer”}}';
+
+// results older than ttl_seconds are not used, set to 0 to disable the cache
+create or replace table dcr_samp_consumer.util.result_cache_settings (ttl_seconds number)
+comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“consumer”}}'
+as select 3600 as ttl_seconds;
+
+
 ///////
 // creating Request stored proc
 ///////
@@ -433,6 +497,35 @@ create or replace procedure dcr_samp_consumer.PROVIDER_ACCT_schema.request(in_te
   // put request JSON into a temporary place so if it is approved we can use it later directly from SQL to avoid JS altering it
    var result = snowflake.execute({ sqlText: `create or replace table dcr_samp_consumer.PROVIDER_ACCT_schema.request_temp as select REQUEST FROM      table(result_scan(last_query_id()));` });
 
+  // return the cached result of the same request if it is still valid. Multi-party requests are not cached, since
+  // only this provider's data version is known here. Templates query consumer data at the request timestamp, so an
+  // explicit timestamp stays in the key, and only the default SYSDATE() is blanked
+  var cache_key = null;
+  if (!multi_party_request) {
+    var cache_params = `object_delete(r.request:REQUEST_PARAMS, 'request_id')`;
+    if (!AT_TIMESTAMP) {
+      cache_params = `object_insert(` + cache_params + `, 'at_timestamp', '', true)`;
+    };
+    try {
+      var result = snowflake.execute({ sqlText: `select sha2(dcr_samp_consumer.util.get_sql_jinja(t.template, ` + cache_params + `))
+        from dcr_samp_consumer.PROVIDER_ACCT_schema.request_temp r
+        join dcr_samp_app.cleanroom.templates t on t.template_name = r.request:QUERY_TEMPLATE::varchar` });
+      result.next();
+      cache_key = result.getColumnValue(1);
+      var result = snowflake.execute({ sqlText: `select request_id, result from dcr_samp_consumer.PROVIDER_ACCT_schema.result_cache
+        where cache_key = ? and result is not null
+        and cached_ts >= dateadd(second, -(select any_value(ttl_seconds) from dcr_samp_consumer.util.result_cache_settings), current_timestamp())
+        and equal_null(data_version, (select max(last_altered)::varchar from dcr_samp_app.cleanroom.provider_data_version))
+        order by cached_ts desc limit 1`, binds: [cache_key] });
+      if (result.next()) {
+        return [ "Cached Result", result.getColumnValue(1), result.getColumnValue(2)];
+      };
+    } catch (err) {
+      // send the request without the cache, e.g. if the provider does not share its data version
+      cache_key = null;
+    };
+  };
+
   var signed_request ='';
 
  //insert the signed request
@@ -445,6 +538,81 @@ create or replace procedure dcr_samp_consumer.PROVIDER_ACCT_schema.request(in_te
   result.next();
   var request_id = result.getColumnValue(1);
 
+  // reserve the cache entry, which run_request fills in once the request is approved
+  if (cache_key) {
+    snowflake.execute({ sqlText: `insert into dcr_samp_consumer.PROVIDER_ACCT_schema.result_cache (cache_key, request_id, template_name, cached_ts)
+      select ?, ?, ?, current_timestamp()`, binds: [cache_key, request_id, in_template_name] });
+  };
+
   return [ "Request Sent", request_id , request];
 
 $$;
+
+
+///////
+// creating Run Request stored proc
+///////
+
+// runs the approved query of a request and caches its result for repeated requests
+create or replace procedure dcr_samp_consumer.PROVIDER_ACCT_schema.run_request(request_id varchar(1000))
+    returns variant
+    language javascript
+    comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“consumer”}}'
+    execute as owner as
+    $$
+    // the query text comes from this consumer's own request, the provider's log only supplies the approval of the
+    // same query hash, so nothing the provider writes is run
+    var result = snowflake.execute({ sqlText: `select any_value(r.request:PROPOSED_QUERY::varchar)
+      from dcr_samp_consumer.PROVIDER_ACCT_schema.requests r
+      join dcr_samp_app.cleanroom.provider_log l on l.request_id = r.request_id
+      where r.request_id = ? and l.approved = true
+      and l.query_hash = sha2(r.request:PROPOSED_QUERY::varchar)
+      and l.query_hash = r.request:PROPOSED_QUERY_HASH::varchar`, binds: [REQUEST_ID] });
+    result.next();
+    var proposed_query = result.getColumnValue(1);
+    if (!proposed_query) {
+      return [ "Request Not Approved", REQUEST_ID, null];
+    };
+
+    // the data version is read before the query, so a change while it runs invalidates the result. Providers
+    // that do not share a data version get no cache reuse, as the lookup in request skips the cache
+    var data_version = null;
+    try {
+      var result = snowflake.execute({ sqlText: `select max(last_altered)::varchar from dcr_samp_app.cleanroom.provider_data_version` });
+      result.next();
+      data_version = result.getColumnValue(1);
+    } catch (err) {
+      data_version = null;
+    };
+
+    // run the query exactly as approved, so the data firewall matches its hash
+    var query_result = snowflake.execute({ sqlText: proposed_query });
+    var columns = [];
+    for (var i = 1; i <= query_result.getColumnCount(); i++) {
+      columns.push(query_result.getColumnName(i));
+    };
+    var rows = [];
+    while (query_result.next()) {
+      var row = [];
+      for (var i = 1; i <= columns.length; i++) {
+        var value = query_result.getColumnValue(i);
+        row.push(value !== null && typeof value === 'object' ? query_result.getColumnValueAsString(i) : value);
+      };
+      rows.push(row);
+    };
+    var cached_result = { "COLUMNS": columns, "ROWS": rows };
+
+    snowflake.execute({ sqlText: `update dcr_samp_consumer.PROVIDER_ACCT_schema.result_cache
+      set result = parse_json(?), data_version = ?, cached_ts = current_timestamp() where request_id = ?`,
+      binds: [JSON.stringify(cached_result), data_version, REQUEST_ID] });
+
+    // drop expired entries, results of older provider data and earlier results of the same request
+    snowflake.execute({ sqlText: `delete from dcr_samp_consumer.PROVIDER_ACCT_schema.result_cache c
+      where c.cached_ts < dateadd(second, -(select any_value(ttl_seconds) from dcr_samp_consumer.util.result_cache_settings), current_timestamp())
+      or (c.result is not null and not equal_null(c.data_version, ?))
+      or (c.request_id != ? and c.cache_key in (select cache_key from dcr_samp_consumer.PROVIDER_ACCT_schema.result_cache where request_id = ?))`,
+      binds: [data_version, REQUEST_ID, REQUEST_ID] });
+
+    return [ "Request Complete", REQUEST_ID, cached_result];
+
+$$;
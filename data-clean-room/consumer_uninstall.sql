@@ -33,3 +33,4 @@ end;
 $$;
 drop database if exists dcr_samp_consumer;
 drop database if exists dcr_samp_app;
+drop database if exists dcr_samp_deployment_db;
@@ -27,28 +27,32 @@ select * from dcr_samp_app.cleanroom.provider_customers_vw;
 
 create or replace schema dcr_samp_consumer.mydata;
 
-// create sample customers with other features (~33% of these should join to the providers emails due to the uniform(1, 3, random()) in the email addresses)
+// create sample customers with other features (~33% of these should join to the providers emails due to the uniform(1, 3, ...) in the email addresses).
+// DEMO_ROW_COUNT rows are generated from a hash of the row number and DEMO_SEED, so every run creates the same data
 
-create or replace table dcr_samp_consumer.mydata.customers 
+create or replace table dcr_samp_consumer.mydata.customers DEMO_CLUSTER_BY
 comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“consumer”}}'
 as
-select 'user'||seq4()||'_'||uniform(1, 3, random())||'@email.com' as email,
- replace(to_varchar(seq4() % 999, '000') ||'-'||to_varchar(seq4() % 888, '000')||'-'||to_varchar(seq4() % 777, '000')||uniform(1, 10, random()),' ','') as phone,
-  case when uniform(1,10,random())<2 then 'CAT'
-       when uniform(1,10,random())>=2 then 'DOG'
-       when uniform(1,10,random())>=1 then 'BIRD'
+select 'user'||seq4()||'_'||uniform(1, 3, hash(seq8(), DEMO_SEED + 2, 1))||'@email.com' as email,
+ replace(to_varchar(seq4() % 999, '000') ||'-'||to_varchar(seq4() % 888, '000')||'-'||to_varchar(seq4() % 777, '000')||uniform(1, 10, hash(seq8(), DEMO_SEED + 2, 2)),' ','') as phone,
+  case when uniform(1,10,hash(seq8(), DEMO_SEED + 2, 3))<2 then 'CAT'
+       when uniform(1,10,hash(seq8(), DEMO_SEED + 2, 4))>=2 then 'DOG'
+       when uniform(1,10,hash(seq8(), DEMO_SEED + 2, 5))>=1 then 'BIRD'
   else 'NO_PETS' end as pets,
-  round(20000+uniform(0,65000,random()),-2) as zip
-  from table(generator(rowcount => 1000000))
+  round(20000+uniform(0,65000,hash(seq8(), DEMO_SEED + 2, 6)),-2) as zip
+  from table(generator(rowcount => DEMO_ROW_COUNT))
+  order by email
   ;
 
-create or replace table dcr_samp_consumer.mydata.conversions 
+create or replace table dcr_samp_consumer.mydata.conversions DEMO_CLUSTER_BY
 comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“consumer”}}'
 as
-select email, 'product_'||uniform(1,5,random()) as product,
-('2021-'||uniform(3,5,random())||'-'||uniform(1,30,random()))::date as sls_date,
-uniform(1,100,random())+uniform(1,100,random())/100 as sales_dlr
-from dcr_samp_consumer.mydata.customers sample (10)
+select email, 'product_'||uniform(1,5,hash(email, DEMO_SEED, 1)) as product,
+('2021-'||uniform(3,5,hash(email, DEMO_SEED, 2))||'-'||uniform(1,30,hash(email, DEMO_SEED, 3)))::date as sls_date,
+uniform(1,100,hash(email, DEMO_SEED, 4))+uniform(1,100,hash(email, DEMO_SEED, 5))/100 as sales_dlr
+from dcr_samp_consumer.mydata.customers
+where uniform(1, 10, hash(email, DEMO_SEED, 0)) = 1
+order by email
 ;
 
 //select * from dcr_samp_consumer.mydata.customers;
@@ -57,6 +57,12 @@ select REQUEST_ID, APPROVED, request:PROPOSED_QUERY::varchar from dcr_samp_app.c
 
 // run query (paste in the query text shown in the results of the above select .. from provider_log, and run it)
 
+// or run it with run_request, which runs the query from your own requests table once the provider approved its
+// hash, and also caches the result. Sending the same request again then returns the cached
+// result right away as a "Cached Result", until it is older than the TTL in util.result_cache_settings or the
+// provider data changes. Changes to consumer data are only covered by the TTL
+//call dcr_samp_consumer.PROVIDER_ACCT_schema.run_request('<REQUEST_ID from provider_log>');
+
 
 
 
@@ -22,36 +22,41 @@ use warehouse app_wh;
 /// CREATE PROVIDER_ACCT DATA
 ///////
 
-// generate sample customers with emails and features
-create or replace table dcr_samp_provider_db.shared_schema.customers comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}' as
-select 'user'||seq4()||'_'||uniform(1, 3, random())||'@email.com' as email,
- replace(to_varchar(seq4() % 999, '000') ||'-'||to_varchar(seq4() % 888, '000')||'-'||to_varchar(seq4() % 777, '000')||uniform(1, 10, random()),' ','') as phone,
-  case when uniform(1,10,random())>3 then 'MEMBER'
-       when uniform(1,10,random())>5 then 'SILVER'
-       when uniform(1,10,random())>7 then 'GOLD'
+// generate sample customers with emails and features. DEMO_ROW_COUNT rows are generated from a hash of the row number
+// and DEMO_SEED, so every run creates the same data
+create or replace table dcr_samp_provider_db.shared_schema.customers DEMO_CLUSTER_BY comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}' as
+select 'user'||seq4()||'_'||uniform(1, 3, hash(seq8(), DEMO_SEED, 1))||'@email.com' as email,
+ replace(to_varchar(seq4() % 999, '000') ||'-'||to_varchar(seq4() % 888, '000')||'-'||to_varchar(seq4() % 777, '000')||uniform(1, 10, hash(seq8(), DEMO_SEED, 2)),' ','') as phone,
+  case when uniform(1,10,hash(seq8(), DEMO_SEED, 3))>3 then 'MEMBER'
+       when uniform(1,10,hash(seq8(), DEMO_SEED, 4))>5 then 'SILVER'
+       when uniform(1,10,hash(seq8(), DEMO_SEED, 5))>7 then 'GOLD'
 else 'PLATINUM' end as status,
-round(18+uniform(0,10,random())+uniform(0,50,random()),-1)+5*uniform(0,1,random()) as age_band
-from table(generator(rowcount => 1000000))
+round(18+uniform(0,10,hash(seq8(), DEMO_SEED, 6))+uniform(0,50,hash(seq8(), DEMO_SEED, 7)),-1)+5*uniform(0,1,hash(seq8(), DEMO_SEED, 8)) as age_band
+from table(generator(rowcount => DEMO_ROW_COUNT))
+order by email
 ;
 
-create or replace table dcr_samp_provider_db.shared_schema.exposures comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}' as
-select email, 'campaign_'||uniform(1,3,random()) as campaign,
-  case when uniform(1,10,random())>3 then 'STREAMING'
-       when uniform(1,10,random())>5 then 'MOBILE'
-       when uniform(1,10,random())>7 then 'LINEAR'
+create or replace table dcr_samp_provider_db.shared_schema.exposures DEMO_CLUSTER_BY comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}' as
+select email, 'campaign_'||uniform(1,3,hash(email, DEMO_SEED, 1)) as campaign,
+  case when uniform(1,10,hash(email, DEMO_SEED, 2))>3 then 'STREAMING'
+       when uniform(1,10,hash(email, DEMO_SEED, 3))>5 then 'MOBILE'
+       when uniform(1,10,hash(email, DEMO_SEED, 4))>7 then 'LINEAR'
 else 'DISPLAY' end as device_type,
-('2021-'||uniform(3,5,random())||'-'||uniform(1,30,random()))::date as exp_date,
-uniform(1,60,random()) as sec_view,
-uniform(0,2,random())+uniform(0,99,random())/100 as exp_cost
-from dcr_samp_provider_db.shared_schema.customers sample (20)
+('2021-'||uniform(3,5,hash(email, DEMO_SEED, 5))||'-'||uniform(1,30,hash(email, DEMO_SEED, 6)))::date as exp_date,
+uniform(1,60,hash(email, DEMO_SEED, 7)) as sec_view,
+uniform(0,2,hash(email, DEMO_SEED, 8))+uniform(0,99,hash(email, DEMO_SEED, 9))/100 as exp_cost
+from dcr_samp_provider_db.shared_schema.customers
+where uniform(1, 5, hash(email, DEMO_SEED, 0)) = 1
+order by email
 ;
 
 // generate subscription information for users
-create or replace table dcr_samp_provider_db.shared_schema.subscriptions comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}' as
+create or replace table dcr_samp_provider_db.shared_schema.subscriptions DEMO_CLUSTER_BY comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}' as
 select
-        'user'||seq4()||'_'||uniform(1, 3, random())||'@email.com' as email
-    ,   uniform(0,1,random()) as is_subscribed
-from table(generator(rowcount => 1000000))
+        'user'||seq4()||'_'||uniform(1, 3, hash(seq8(), DEMO_SEED + 1, 1))||'@email.com' as email
+    ,   uniform(0,1,hash(seq8(), DEMO_SEED + 1, 2)) as is_subscribed
+from table(generator(rowcount => DEMO_ROW_COUNT))
+order by email
 ;
 
 //select * from dcr_samp_provider_db.shared_schema.customers;
@@ -0,0 +1,100 @@
+/*************************************************************************************************************
+Script:             Data Clean Room - v5.5 - Provider Overlap Sketches, Media & Advertising
+Create Date:        2026-10-18
+Author:             agent
+Description:        Provider HyperLogLog sketches of customer emails for every status and age band, refreshed
+                    by a task when the customers table changes and shared behind the data firewall. Used by
+                    the approximate overlap templates in provider_sketch_templates.sql. Depends on the
+                    execution of scripts provider_init.sql and provider_data.sql.
+
+Copyright © 2022 Snowflake Inc. All rights reserved
+*************************************************************************************************************
+SUMMARY OF CHANGES
+Date(yyyy-mm-dd)    Author                              Comments
+------------------- -------------------                 --------------------------------------------
+2026-10-18          agent                               Initial Creation
+*************************************************************************************************************/
+
+use role data_clean_room_role;
+use warehouse app_wh;
+
+
+///////
+/// CREATE PROVIDER_ACCT SKETCHES
+///////
+
+// one sketch per combination of provider dimensions. Templates combine the sketches of the requested dimensions, so
+// coarser groupings need no sketches of their own. Sketches are exported as objects so they can be stored and shared.
+create or replace table dcr_samp_provider_db.shared_schema.customer_sketches
+    (status varchar, age_band number, email_sketch object, customer_count number, refreshed_ts timestamp)
+    comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}';
+
+// changes to the customers table trigger a refresh
+create or replace stream dcr_samp_provider_db.admin.customer_sketch_stream on table dcr_samp_provider_db.shared_schema.customers
+    comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}';
+
+create table if not exists dcr_samp_provider_db.admin.customer_sketch_refresh_log (refreshed_ts timestamp, changed_rows number, sketches number)
+    comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}';
+
+// rebuilds every sketch from the customers table and consumes the stream, in one transaction
+create or replace procedure dcr_samp_provider_db.admin.refresh_customer_sketches()
+returns string
+language javascript
+comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}'
+execute as owner
+as $$
+
+snowflake.execute({ sqlText: `begin` });
+try {
+  snowflake.execute({ sqlText: `insert overwrite into dcr_samp_provider_db.shared_schema.customer_sketches
+    select status, age_band, hll_export(hll_accumulate(email)), count(*), sysdate()
+    from dcr_samp_provider_db.shared_schema.customers
+    group by status, age_band` });
+  snowflake.execute({ sqlText: `insert into dcr_samp_provider_db.admin.customer_sketch_refresh_log
+    select sysdate(), count(*), (select count(*) from dcr_samp_provider_db.shared_schema.customer_sketches)
+    from dcr_samp_provider_db.admin.customer_sketch_stream` });
+  snowflake.execute({ sqlText: `commit` });
+} catch (err) {
+  snowflake.execute({ sqlText: `rollback` });
+  throw err;
+}
+
+var result = snowflake.execute({ sqlText: `select count(*), sum(customer_count) from dcr_samp_provider_db.shared_schema.customer_sketches` });
+result.next();
+return 'Refreshed ' + result.getColumnValue(1) + ' sketches of ' + result.getColumnValue(2) + ' customers';
+$$;
+
+call dcr_samp_provider_db.admin.refresh_customer_sketches();
+
+// refresh when the customers table changes
+
+CREATE OR REPLACE TASK dcr_samp_provider_db.admin.refresh_customer_sketches
+  SCHEDULE = '60 minute'  WAREHOUSE = 'app_wh'
+WHEN  SYSTEM$STREAM_HAS_DATA('dcr_samp_provider_db.admin.customer_sketch_stream')
+AS call dcr_samp_provider_db.admin.refresh_customer_sketches();
+
+ALTER TASK dcr_samp_provider_db.admin.refresh_customer_sketches RESUME;
+
+//select * from dcr_samp_provider_db.shared_schema.customer_sketches;
+//select * from dcr_samp_provider_db.admin.customer_sketch_refresh_log order by refreshed_ts desc;
+
+
+//////////////////
+// Protect the sketches with the Data Firewall
+//////////////////
+
+create or replace secure view dcr_samp_provider_db.cleanroom.provider_customer_sketches_vw
+comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}'
+as select status, age_band, email_sketch from dcr_samp_provider_db.shared_schema.customer_sketches;
+
+// shields up
+alter view dcr_samp_provider_db.cleanroom.provider_customer_sketches_vw add row access policy dcr_samp_provider_db.shared_schema.data_firewall on (status);
+
+// test RAP
+select * from dcr_samp_provider_db.cleanroom.provider_customer_sketches_vw;  // should return no rows
+
+grant select on dcr_samp_provider_db.cleanroom.provider_customer_sketches_vw to share dcr_samp_app;
+
+// use this to later pause sketch refreshes, if needed
+
+//ALTER TASK dcr_samp_provider_db.admin.refresh_customer_sketches SUSPEND;
@@ -0,0 +1,166 @@
+/*************************************************************************************************************
+Script:             Data Clean Room - v5.5 - Provider Sketch Templates, Media & Advertising
+Create Date:        2026-10-18
+Author:             agent
+Description:        Provider Jinja templates that estimate customer overlap from the HyperLogLog sketches
+                    maintained by provider_overlap_sketches.sql, instead of joining provider and consumer
+                    customers. Each estimate is returned with its 95% error bound. Depends on the execution
+                    of script provider_overlap_sketches.sql by every provider in the request.
+
+Copyright © 2022 Snowflake Inc. All rights reserved
+*************************************************************************************************************
+SUMMARY OF CHANGES
+Date(yyyy-mm-dd)    Author                              Comments
+------------------- -------------------                 --------------------------------------------
+2026-10-18          agent                               Initial Creation
+*************************************************************************************************************/
+
+
+use role data_clean_room_role;
+use warehouse app_wh;
+
+
+/////
+// PROVIDER_ACCT SKETCH TEMPLATES
+/////
+
+// the overlap of two sketched sets is estimated as |A| + |B| - |A union B|, and of three sets by inclusion-exclusion
+// over every union. Each estimate has a relative standard error of 1.62338%, and the reported overlap_error is 1.96
+// standard errors of the combined estimates. The where_clause filters consumer rows only.
+
+delete from dcr_samp_provider_db.templates.dcr_templates
+where party_account = 'CONSUMER_ACCT' and template_name in ('customer_overlap_sketch', 'customer_overlap_multiparty_sketch');
+
+insert into dcr_samp_provider_db.templates.dcr_templates (party_account,template_name, template, dimensions, template_type)
+values ('CONSUMER_ACCT','customer_overlap_sketch',
+$$
+with provider_sketches as (
+    select
+        {% for dim in dimensions if dim.startswith('p.') %}
+        identifier({{ dim }}),
+        {% endfor %}
+        hash({% for dim in dimensions if dim.startswith('p.') %}identifier({{ dim }}), {% endfor %}0) as p_key,
+        hll_combine(hll_import(p.email_sketch)) as p_sketch
+    from {{ app_data | sqlsafe }}.cleanroom.provider_customer_sketches_vw p
+    {% for dim in dimensions if dim.startswith('p.') %}
+    {% if loop.first %}group by{% else %},{% endif %} identifier({{ dim }})
+    {% endfor %}
+), consumer_sketches as (
+    select
+        {% for dim in dimensions if dim.startswith('c.') %}
+        identifier({{ dim }}),
+        {% endfor %}
+        hash({% for dim in dimensions if dim.startswith('c.') %}identifier({{ dim }}), {% endfor %}0) as c_key,
+        hll_accumulate(c.{{ consumer_join_field | sqlsafe }}) as c_sketch
+    from {{ consumer_db | sqlsafe }}.{{ consumer_schema | sqlsafe }}.{{ consumer_table | sqlsafe }} at(timestamp => '{{ at_timestamp | sqlsafe }}'::timestamp_ntz) c
+    where exists (select table_name from {{ consumer_db | sqlsafe }}.information_schema.tables where table_schema = upper('{{ consumer_schema | sqlsafe }}') and table_name = upper('{{ consumer_table| sqlsafe }}') and table_type = 'BASE TABLE')
+    {% if  where_clause  %}
+    and ( {{ where_clause | sqlsafe }} )
+    {% endif %}
+    {% for dim in dimensions if dim.startswith('c.') %}
+    {% if loop.first %}group by{% else %},{% endif %} identifier({{ dim }})
+    {% endfor %}
+), groups as (
+    select p.*, c.*, hash(p.p_key, c.c_key) as group_id, hll_estimate(p.p_sketch) as p_count, hll_estimate(c.c_sketch) as c_count
+    from provider_sketches p, consumer_sketches c
+), unions as (
+    select group_id, hll_estimate(hll_combine(sketch)) as union_count
+    from (select group_id, p_sketch as sketch from groups union all select group_id, c_sketch from groups)
+    group by group_id
+), estimates as (
+    select g.* exclude (group_id, p_key, c_key, p_sketch, c_sketch, p_count, c_count),
+        greatest(0, least(g.p_count, g.c_count, g.p_count + g.c_count - u.union_count)) as overlap,
+        round(1.96 * 0.0162338 * sqrt(square(g.p_count) + square(g.c_count) + square(u.union_count))) as overlap_error
+    from groups g join unions u on g.group_id = u.group_id
+)
+select * from estimates
+where overlap > 25
+order by overlap desc;
+$$,'c.pets|c.zip|p.status|p.age_band', 'SQL');
+
+insert into dcr_samp_provider_db.templates.dcr_templates (party_account,template_name, template, dimensions, template_type)
+values ('CONSUMER_ACCT','customer_overlap_multiparty_sketch',
+$$
+with provider_sketches as (
+    select
+        {% for dim in dimensions if dim.startswith('p.') %}
+        identifier({{ dim }}),
+        {% endfor %}
+        hash({% for dim in dimensions if dim.startswith('p.') %}identifier({{ dim }}), {% endfor %}0) as p_key,
+        hll_combine(hll_import(p.email_sketch)) as p_sketch
+    from {{ app_data | sqlsafe }}.cleanroom.provider_customer_sketches_vw p
+    {% for dim in dimensions if dim.startswith('p.') %}
+    {% if loop.first %}group by{% else %},{% endif %} identifier({{ dim }})
+    {% endfor %}
+), provider_two_sketches as (
+    select
+        {% for dim in dimensions if dim.startswith('p2.') %}
+        identifier({{ dim }}) as {{ dim | replace('p2.', 'p2_') | sqlsafe }},
+        {% endfor %}
+        hash({% for dim in dimensions if dim.startswith('p2.') %}identifier({{ dim }}), {% endfor %}0) as p2_key,
+        hll_combine(hll_import(p2.email_sketch)) as p2_sketch
+    from {{ app_two_data | sqlsafe }}.cleanroom.provider_customer_sketches_vw p2
+    {% for dim in dimensions if dim.startswith('p2.') %}
+    {% if loop.first %}group by{% else %},{% endif %} identifier({{ dim }})
+    {% endfor %}
+), consumer_sketches as (
+    select
+        {% for dim in dimensions if dim.startswith('c.') %}
+        identifier({{ dim }}),
+        {% endfor %}
+        hash({% for dim in dimensions if dim.startswith('c.') %}identifier({{ dim }}), {% endfor %}0) as c_key,
+        hll_accumulate(c.{{ consumer_join_field | sqlsafe }}) as c_sketch
+    from {{ consumer_db | sqlsafe }}.{{ consumer_schema | sqlsafe }}.{{ consumer_table | sqlsafe }} at(timestamp => '{{ at_timestamp | sqlsafe }}'::timestamp_ntz) c
+    where exists (select table_name from {{ consumer_db | sqlsafe }}.information_schema.tables where table_schema = upper('{{ consumer_schema | sqlsafe }}') and table_name = upper('{{ consumer_table| sqlsafe }}') and table_type = 'BASE TABLE')
+    {% if  where_clause  %}
+    and ( {{ where_clause | sqlsafe }} )
+    {% endif %}
+    {% for dim in dimensions if dim.startswith('c.') %}
+    {% if loop.first %}group by{% else %},{% endif %} identifier({{ dim }})
+    {% endfor %}
+), groups as (
+    select p.*, p2.*, c.*, hash(p.p_key, p2.p2_key, c.c_key) as group_id
+    from provider_sketches p, provider_two_sketches p2, consumer_sketches c
+), sketches as (
+    select group_id, 'p' as sketch_set, p_sketch as sketch from groups
+    union all select group_id, 'p2', p2_sketch from groups
+    union all select group_id, 'c', c_sketch from groups
+), counts as (
+    select group_id,
+        max(case when sketch_set = 'p' then hll_estimate(sketch) end) as p_count,
+        max(case when sketch_set = 'p2' then hll_estimate(sketch) end) as p2_count,
+        max(case when sketch_set = 'c' then hll_estimate(sketch) end) as c_count
+    from sketches
+    group by group_id
+), unions as (
+    select group_id, sketch_sets, hll_estimate(hll_combine(sketch)) as union_count
+    from (select s.group_id, s.sketch, u.sketch_sets
+          from sketches s
+          join (select column1 as sketch_sets from values ('p,p2'), ('p,c'), ('p2,c'), ('p,p2,c')) u
+            on array_contains(s.sketch_set::variant, split(u.sketch_sets, ',')))
+    group by group_id, sketch_sets
+), union_counts as (
+    select group_id,
+        max(case when sketch_sets = 'p,p2' then union_count end) as p_p2_count,
+        max(case when sketch_sets = 'p,c' then union_count end) as p_c_count,
+        max(case when sketch_sets = 'p2,c' then union_count end) as p2_c_count,
+        max(case when sketch_sets = 'p,p2,c' then union_count end) as p_p2_c_count
+    from unions
+    group by group_id
+), estimates as (
+    select g.* exclude (group_id, p_key, p2_key, c_key, p_sketch, p2_sketch, c_sketch),
+        greatest(0, least(n.p_count, n.p2_count, n.c_count,
+            n.p_count + n.p2_count + n.c_count - u.p_p2_count - u.p_c_count - u.p2_c_count + u.p_p2_c_count)) as overlap,
+        round(1.96 * 0.0162338 * sqrt(square(n.p_count) + square(n.p2_count) + square(n.c_count) + square(u.p_p2_count)
+            + square(u.p_c_count) + square(u.p2_c_count) + square(u.p_p2_c_count))) as overlap_error
+    from groups g
+    join counts n on g.group_id = n.group_id
+    join union_counts u on g.group_id = u.group_id
+)
+select * from estimates
+where overlap > 25
+order by overlap desc;
+$$,'c.pets|c.zip|p.status|p.age_band|p2.status|p2.age_band', 'SQL');
+
+// see the templates
+select * from dcr_samp_provider_db.templates.dcr_templates where template_name like '%_sketch';
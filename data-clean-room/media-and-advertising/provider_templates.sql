@@ -32,11 +32,13 @@ use warehouse app_wh;
 // PROVIDER_ACCT TEMPLATES
 /////
 
-// if you want to edit the templates, run this then re-insert them
-// delete from dcr_samp_provider_db.templates.dcr_templates;
+// each template is deleted before it is inserted, so editing a template and rerunning its statements replaces it
 
 //Change CONSUMER_ACCT with consumer account name and adjust query template as per requirement
 
+delete from dcr_samp_provider_db.templates.dcr_templates
+where party_account = 'CONSUMER_ACCT' and template_name = 'customer_overlap';
+
 insert into dcr_samp_provider_db.templates.dcr_templates (party_account,template_name, template, dimensions, template_type)
 values ('CONSUMER_ACCT','customer_overlap',
 $$
@@ -67,6 +69,9 @@ having count(distinct p.email)  > 25
 order by count(distinct p.email) desc;
 $$,'c.pets|c.zip|p.status|p.age_band', 'SQL');
 
+delete from dcr_samp_provider_db.templates.dcr_templates
+where party_account = 'CONSUMER_ACCT' and template_name = 'customer_overlap_multiparty';
+
 insert into dcr_samp_provider_db.templates.dcr_templates (party_account,template_name, template, dimensions, template_type)
 values ('CONSUMER_ACCT','customer_overlap_multiparty',
 $$
@@ -97,6 +102,9 @@ order by count(distinct p.email) desc;
 $$,'c.pets|c.zip|p.status|p.age_band|p2.status|p2.age_band', 'SQL');
 
 
+delete from dcr_samp_provider_db.templates.dcr_templates
+where party_account = 'CONSUMER_ACCT' and template_name = 'customer_overlap_waterfall';
+
 insert into dcr_samp_provider_db.templates.dcr_templates (party_account,template_name, template, dimensions, template_type)
 values ('CONSUMER_ACCT','customer_overlap_waterfall',
 $$
@@ -126,6 +134,9 @@ having count(distinct p.email)  > 25
 order by count(distinct p.email) desc;
 $$, 'c.pets|c.zip|p.status|p.age_band', 'SQL');
 
+delete from dcr_samp_provider_db.templates.dcr_templates
+where party_account = 'CONSUMER_ACCT' and template_name = 'campaign_conversion';
+
 insert into dcr_samp_provider_db.templates.dcr_templates (party_account,template_name, template, dimensions, template_type)
 values ('CONSUMER_ACCT','campaign_conversion',
 $$
@@ -173,6 +184,9 @@ $$, 'c.pets|c.zip|p.status|p.age_band|c_conv.product|p_exp.campaign|p_exp.device
 
 // multi-party Jinja, gets overlap that is subscribed (e.g., where 3rd party is a marketing platform)
 
+delete from dcr_samp_provider_db.templates.dcr_templates
+where party_account = 'CONSUMER_ACCT' and template_name = 'customer_overlap_multiparty_subscribers';
+
 insert into dcr_samp_provider_db.templates.dcr_templates (party_account,template_name, template, dimensions, template_type)
 values ('CONSUMER_ACCT','customer_overlap_multiparty_subscribers',
 $$
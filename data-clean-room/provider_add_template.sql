@@ -29,6 +29,9 @@ use warehouse app_wh;
 // ADD TEMPLATE
 /////
 
+delete from dcr_samp_provider_db.templates.dcr_templates
+where party_account = 'CONSUMER_ACCT' and template_name = 'NEW_TEMPLATE_NAME';
+
 insert into dcr_samp_provider_db.templates.dcr_templates (party_account, template_name, template, dimensions, template_type)
 values ('CONSUMER_ACCT', 'NEW_TEMPLATE_NAME',
 $$
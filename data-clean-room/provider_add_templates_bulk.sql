@@ -0,0 +1,63 @@
+/*************************************************************************************************************
+Script:             Data Clean Room - v5.5 - Provider Bulk Template Addition
+Create Date:        2026-10-18
+Author:             agent
+Description:        Adds or updates a catalog of provider templates for many consumers with one set-based
+                    merge. Templates whose text, dimensions and type are unchanged are skipped.
+
+Copyright © 2022 Snowflake Inc. All rights reserved
+*************************************************************************************************************
+SUMMARY OF CHANGES
+Date(yyyy-mm-dd)    Author                              Comments
+------------------- -------------------                 --------------------------------------------
+2026-10-18          agent                               Initial Creation
+*************************************************************************************************************/
+
+/*
+The consumer accounts and the template values in this script are generated by
+SnowflakeDcr.prepare_template_bulk_deployment, as ('ACCOUNT1'), ('ACCOUNT2') and
+('TEMPLATE_NAME', $$TEMPLATE_TEXT$$, 'DIMENSION1|DIMENSION2'), ... respectively.
+*/
+
+use role data_clean_room_role;
+use warehouse app_wh;
+
+
+/////
+// STAGE TEMPLATES
+/////
+
+create or replace temporary table dcr_samp_provider_db.templates.dcr_templates_stage
+    (template_name string, template string, dimensions varchar(2000), template_type string);
+
+insert into dcr_samp_provider_db.templates.dcr_templates_stage (template_name, template, dimensions, template_type)
+select column1, column2, column3, 'SQL' from values
+NEW_TEMPLATE_VALUES;
+
+create or replace temporary table dcr_samp_provider_db.templates.dcr_templates_stage_accounts (party_account varchar(1000));
+
+insert into dcr_samp_provider_db.templates.dcr_templates_stage_accounts (party_account)
+select column1 from values NEW_CONSUMER_ACCOUNTS;
+
+
+/////
+// MERGE TEMPLATES
+/////
+
+// one source row per consumer and template, compared with the current row by a hash of its content
+merge into dcr_samp_provider_db.templates.dcr_templates t
+using (
+    select a.party_account, s.template_name, s.template, s.dimensions, s.template_type,
+           sha2(s.template || '|' || coalesce(s.dimensions, '') || '|' || s.template_type) as template_hash
+    from dcr_samp_provider_db.templates.dcr_templates_stage s, dcr_samp_provider_db.templates.dcr_templates_stage_accounts a
+    qualify row_number() over (partition by a.party_account, s.template_name order by s.template) = 1
+) s
+on t.party_account = s.party_account and t.template_name = s.template_name
+when matched and sha2(coalesce(t.template, '') || '|' || coalesce(t.dimensions, '') || '|' || coalesce(t.template_type, '')) != s.template_hash then
+    update set template = s.template, dimensions = s.dimensions, template_type = s.template_type
+when not matched then
+    insert (party_account, template_name, template, dimensions, template_type)
+    values (s.party_account, s.template_name, s.template, s.dimensions, s.template_type);
+
+drop table if exists dcr_samp_provider_db.templates.dcr_templates_stage;
+drop table if exists dcr_samp_provider_db.templates.dcr_templates_stage_accounts;
@@ -0,0 +1,135 @@
+/*************************************************************************************************************
+Script:             Data Clean Room - v5.5 - Provider Data Onboarding, Match Table
+Create Date:        2026-10-18
+Author:             agent
+Description:        Onboards additional data for the provider as a narrow match table holding a normalized,
+                    hashed match key and only the dimension columns offered to templates. The match table is
+                    clustered by the match key and refreshed incrementally from a stream on the source.
+
+Copyright © 2022 Snowflake Inc. All rights reserved
+*************************************************************************************************************
+SUMMARY OF CHANGES
+Date(yyyy-mm-dd)    Author                              Comments
+------------------- -------------------                 --------------------------------------------
+2026-10-18          agent                               Initial Creation
+*************************************************************************************************************/
+
+/*
+Find and replace the following values:
+
+SOURCE_DATABASE - The database where the data to be shared lives
+SOURCE_SCHEMA - The schema where the data to be shared lives
+SOURCE_TABLE - The table where the data to be shared lives
+SOURCE_COLUMN - The column from the source table that consumers match on, e.g. email
+SOURCE_MATCH_COLUMNS - The dimension columns to share, each preceded by a comma, e.g. , STATUS, AGE_BAND
+
+The match key is sha2(lower(trim(SOURCE_COLUMN))), so consumer join fields must be normalized the same way.
+*/
+
+use role securityadmin; --Security or account admin required to grant select permissions on data outside of the clean room
+
+///////
+/// GRANT SELECT PERMISSIONS ON TABLE OR VIEW
+///////
+grant usage on database SOURCE_DATABASE to role data_clean_room_role;
+grant usage on schema SOURCE_DATABASE.SOURCE_SCHEMA to role data_clean_room_role;
+grant select on SOURCE_DATABASE.SOURCE_SCHEMA.SOURCE_TABLE to role data_clean_room_role;
+
+// the owner of the source table must enable change tracking before the clean room role can create a stream on it
+//alter table SOURCE_DATABASE.SOURCE_SCHEMA.SOURCE_TABLE set change_tracking = true;
+
+use role data_clean_room_role;
+use warehouse app_wh;
+
+
+///////
+/// CREATE MATCH TABLE
+///////
+
+// the stream is created first, so changes made while the match table is built are applied by the next refresh
+create or replace stream dcr_samp_provider_db.admin.SOURCE_TABLE_match_stream on table SOURCE_DATABASE.SOURCE_SCHEMA.SOURCE_TABLE
+    comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}';
+
+create or replace table dcr_samp_provider_db.shared_schema.SOURCE_TABLE_match cluster by (match_key)
+    comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}'
+as select sha2(lower(trim(SOURCE_COLUMN))) as match_key SOURCE_MATCH_COLUMNS
+from SOURCE_DATABASE.SOURCE_SCHEMA.SOURCE_TABLE
+where SOURCE_COLUMN is not null
+order by match_key;
+
+// match keys changed since the last refresh
+create or replace table dcr_samp_provider_db.admin.SOURCE_TABLE_match_changes (match_key varchar)
+    comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}';
+
+// rebuilds the match rows of every changed match key from the source and consumes the stream, in one transaction
+create or replace procedure dcr_samp_provider_db.admin.refresh_SOURCE_TABLE_match()
+returns string
+language javascript
+comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}'
+execute as owner
+as $$
+
+snowflake.execute({ sqlText: `begin` });
+try {
+  var result = snowflake.execute({ sqlText: `insert into dcr_samp_provider_db.admin.SOURCE_TABLE_match_changes
+    select distinct sha2(lower(trim(SOURCE_COLUMN))) from dcr_samp_provider_db.admin.SOURCE_TABLE_match_stream
+    where SOURCE_COLUMN is not null` });
+  result.next();
+  var changed_keys = result.getColumnValue(1);
+  snowflake.execute({ sqlText: `delete from dcr_samp_provider_db.shared_schema.SOURCE_TABLE_match m
+    using dcr_samp_provider_db.admin.SOURCE_TABLE_match_changes c where m.match_key = c.match_key` });
+  snowflake.execute({ sqlText: `insert into dcr_samp_provider_db.shared_schema.SOURCE_TABLE_match
+    select sha2(lower(trim(SOURCE_COLUMN))) as match_key SOURCE_MATCH_COLUMNS
+    from SOURCE_DATABASE.SOURCE_SCHEMA.SOURCE_TABLE
+    where SOURCE_COLUMN is not null and sha2(lower(trim(SOURCE_COLUMN))) in
+      (select match_key from dcr_samp_provider_db.admin.SOURCE_TABLE_match_changes)` });
+  snowflake.execute({ sqlText: `delete from dcr_samp_provider_db.admin.SOURCE_TABLE_match_changes` });
+  snowflake.execute({ sqlText: `commit` });
+} catch (err) {
+  snowflake.execute({ sqlText: `rollback` });
+  throw err;
+}
+
+return 'Refreshed ' + changed_keys + ' match keys';
+$$;
+
+// refresh when the source changes
+
+CREATE OR REPLACE TASK dcr_samp_provider_db.admin.refresh_SOURCE_TABLE_match
+  SCHEDULE = '5 minute'  WAREHOUSE = 'app_wh'
+WHEN  SYSTEM$STREAM_HAS_DATA('dcr_samp_provider_db.admin.SOURCE_TABLE_match_stream')
+AS call dcr_samp_provider_db.admin.refresh_SOURCE_TABLE_match();
+
+ALTER TASK dcr_samp_provider_db.admin.refresh_SOURCE_TABLE_match RESUME;
+
+//select count(*) from dcr_samp_provider_db.shared_schema.SOURCE_TABLE_match;
+
+
+//////////////////
+// Protect provider data with Data Firewall
+//////////////////
+
+// create the view to share the protected match table
+create or replace secure view dcr_samp_provider_db.cleanroom.SOURCE_TABLE_match_vw
+comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}'
+as select * from dcr_samp_provider_db.shared_schema.SOURCE_TABLE_match;
+
+// shields down
+//alter view dcr_samp_provider_db.cleanroom.SOURCE_TABLE_match_vw drop row access policy dcr_samp_provider_db.shared_schema.data_firewall;
+
+// shields up
+alter view dcr_samp_provider_db.cleanroom.SOURCE_TABLE_match_vw add row access policy dcr_samp_provider_db.shared_schema.data_firewall on (match_key);
+
+// test RAP
+select * from dcr_samp_provider_db.cleanroom.SOURCE_TABLE_match_vw;  // should now return no rows
+
+
+//////
+// share views to cleanroom
+//////
+
+grant select on dcr_samp_provider_db.cleanroom.SOURCE_TABLE_match_vw to share dcr_samp_app;
+
+// use this to later pause match table refreshes, if needed
+
+//ALTER TASK dcr_samp_provider_db.admin.refresh_SOURCE_TABLE_match SUSPEND;
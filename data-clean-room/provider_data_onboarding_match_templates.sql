@@ -0,0 +1,62 @@
+/*************************************************************************************************************
+Script:             Data Clean Room - v5.5 - Provider Data Onboarding, Match Table Templates
+Create Date:        2026-10-18
+Author:             agent
+Description:        Provider Jinja template that joins consumer data to the match table created by
+                    provider_data_onboarding_match.sql. Depends on the execution of that script.
+
+Copyright © 2022 Snowflake Inc. All rights reserved
+*************************************************************************************************************
+SUMMARY OF CHANGES
+Date(yyyy-mm-dd)    Author                              Comments
+------------------- -------------------                 --------------------------------------------
+2026-10-18          agent                               Initial Creation
+*************************************************************************************************************/
+
+/*
+Find and replace the following values:
+
+CONSUMER_ACCT - The account that will be using the template
+SOURCE_TABLE - The table onboarded with provider_data_onboarding_match.sql
+SOURCE_MATCH_DIMENSIONS - A pipe-separated list of the match table dimensions, e.g. p.STATUS|p.AGE_BAND
+*/
+
+use role data_clean_room_role;
+use warehouse app_wh;
+
+
+/////
+// ADD TEMPLATE
+/////
+
+// the consumer join field is normalized and hashed like the match key, so the join reads only the narrow match table
+
+delete from dcr_samp_provider_db.templates.dcr_templates
+where party_account = 'CONSUMER_ACCT' and template_name = 'SOURCE_TABLE_match_overlap';
+
+insert into dcr_samp_provider_db.templates.dcr_templates (party_account, template_name, template, dimensions, template_type)
+values ('CONSUMER_ACCT', 'SOURCE_TABLE_match_overlap',
+$$
+select
+    {% for dim in dimensions %}
+    identifier({{ dim }}),
+    {% endfor %}
+    count(distinct p.match_key) as overlap
+from
+    {{ app_data | sqlsafe }}.cleanroom.SOURCE_TABLE_match_vw p,
+    {{ consumer_db | sqlsafe }}.{{ consumer_schema | sqlsafe }}.{{ consumer_table | sqlsafe }} at(timestamp => '{{ at_timestamp | sqlsafe }}'::timestamp_ntz) c
+where
+    sha2(lower(trim(c.{{ consumer_join_field | sqlsafe }}))) = p.match_key
+    and exists (select table_name from {{ consumer_db | sqlsafe }}.information_schema.tables where table_schema = upper('{{ consumer_schema | sqlsafe }}') and table_name = upper('{{ consumer_table| sqlsafe }}') and table_type = 'BASE TABLE')
+    {% if  where_clause  %}
+    and ( {{ where_clause | sqlsafe }} )
+    {% endif %}
+{% for dim in dimensions %}
+    {% if loop.first %}group by{% else %},{% endif %} identifier({{ dim }})
+{% endfor %}
+having count(distinct p.match_key)  > 25
+order by count(distinct p.match_key) desc;
+$$, 'SOURCE_MATCH_DIMENSIONS', 'SQL');
+
+// see the template
+select * from dcr_samp_provider_db.templates.dcr_templates where template_name = 'SOURCE_TABLE_match_overlap';
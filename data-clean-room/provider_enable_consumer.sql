@@ -52,6 +52,7 @@ create or replace database dcr_samp_CONSUMER_ACCT from share CONSUMER_ACCT.dcr_s
 create or replace stream dcr_samp_provider_db.admin.request_stream_CONSUMER_ACCT on table dcr_samp_CONSUMER_ACCT.PROVIDER_ACCT_schema.requests append_only = true show_initial_rows = true
 comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}';
 delete from dcr_samp_provider_db.admin.request_log;
+delete from dcr_samp_provider_db.admin.approved_hashes;
 
 // see request status and streams
 
@@ -72,6 +73,7 @@ select * from dcr_samp_provider_db.admin.request_log;
 
 //clean request log
 delete from dcr_samp_provider_db.admin.request_log;
+delete from dcr_samp_provider_db.admin.approved_hashes;
 
 //process_requests modified for version 5.5 to add validation part on provider side
 
@@ -255,6 +257,7 @@ where r.REQUEST_ID = v.request_id and
       r.REQUEST_ID = vs.request_id and
       r.provider_accounts = CURRENT_ACCOUNT();`;
 snowflake.execute({ sqlText: sql_text });
+snowflake.execute({ sqlText: `call dcr_samp_provider_db.admin.record_approved_hashes('dcr_samp_provider_db.admin.request_tmp')` });
 
 
   // get proposed query
@@ -0,0 +1,116 @@
+/*************************************************************************************************************
+Script:             Data Clean Room - v5.5 - Provider Enable Consumer (Batch Request Processing)
+Create Date:        2026-10-18
+Author:             agent
+Description:        Provider enabling the consumer for submitting requests, using a set-based request
+                    processor that validates every pending request in the consumer's stream per call.
+                    Alternative to provider_enable_consumer.sql. Depends on the execution of script
+                    consumer_init.sql.
+
+Copyright © 2022 Snowflake Inc. All rights reserved
+*************************************************************************************************************
+SUMMARY OF CHANGES
+Date(yyyy-mm-dd)    Author                              Comments
+------------------- -------------------                 --------------------------------------------
+2026-10-18          agent                               Initial Creation
+*************************************************************************************************************/
+
+use role data_clean_room_role;
+use warehouse app_wh;
+
+/////
+// REQUEST HANDLING FROM CONSUMER_ACCT
+/////
+
+// create a new mounted request database, stream, and task for each consumer
+
+// mount request share from consumer
+// NOTE show_initial_rows is not supposed to work across a share but it does and using here for ease of debugging
+
+create or replace database dcr_samp_CONSUMER_ACCT from share CONSUMER_ACCT.dcr_samp_requests_PROVIDER_ACCT;
+create or replace stream dcr_samp_provider_db.admin.request_stream_CONSUMER_ACCT on table dcr_samp_CONSUMER_ACCT.PROVIDER_ACCT_schema.requests append_only = true show_initial_rows = true
+comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}';
+
+// see request status and streams
+
+// see requests
+select * from dcr_samp_CONSUMER_ACCT.PROVIDER_ACCT_schema.requests;
+// see if the stream has anything in it
+select SYSTEM$STREAM_HAS_DATA('dcr_samp_provider_db.admin.request_stream_CONSUMER_ACCT');
+// see processed request log
+select * from dcr_samp_provider_db.admin.request_log;
+
+////////
+// REQUEST VALIDATION
+////////
+
+// process_requests_batch drains the whole stream per call: every pending request is validated in one
+// set-based statement and all approvals and rejections are written with a single insert ... select
+
+create or replace procedure dcr_samp_provider_db.admin.process_requests_batch(party_account string)
+returns string
+language javascript
+comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}'
+execute as owner
+as $$
+
+// snapshot every pending request from the stream, which also advances the stream offset
+
+var request_tbl_sql = `create or replace table dcr_samp_provider_db.admin.request_batch_tmp as select REQUEST:REQUEST_ID::varchar as request_id,
+ REQUEST:QUERY_TEMPLATE::varchar as query_template,
+ REQUEST:REQUESTER_ACCOUNT::varchar as requester_account,
+ array_to_string(REQUEST:PROVIDER_ACCOUNTS, ',') as provider_accounts,
+ REQUEST:REQUEST_TS as request_ts,
+ REQUEST as request,
+ REQUEST:REQUEST_PARAMS as request_params,
+ REQUEST:REQUEST_PARAMS."dimensions" as select_fields
+from dcr_samp_provider_db.admin.request_stream_`+PARTY_ACCOUNT+` `;
+snowflake.execute({ sqlText: request_tbl_sql });
+
+var result = snowflake.execute({ sqlText: `select count(1) from dcr_samp_provider_db.admin.request_batch_tmp` });
+result.next();
+if (result.getColumnValue(1) == 0) {
+  return 'Stream empty : Request Input not recieved';
+}
+
+// validate every request at once, with the validation shared with the consolidated request scheduler
+
+var result = snowflake.execute({ sqlText: `call dcr_samp_provider_db.admin.validate_requests('dcr_samp_provider_db.admin.request_batch_tmp')` });
+result.next();
+var processed = result.getColumnValue(1)[0];
+var approved = result.getColumnValue(1)[1];
+
+return 'Processed ' + processed + ' requests: ' + approved + ' approved, ' + (processed - approved) + ' not approved';
+$$;
+
+// process approvals manually one-time
+
+call dcr_samp_provider_db.admin.process_requests_batch('CONSUMER_ACCT');
+
+////////
+/// ENABLE EACH CONSUMER_ACCT
+////////
+
+// a single task per consumer is enough because each run drains the whole stream
+
+CREATE OR REPLACE TASK dcr_samp_provider_db.admin.process_requests_batch_CONSUMER_ACCT
+  SCHEDULE = '1 minute'  WAREHOUSE = 'app_wh'
+WHEN  SYSTEM$STREAM_HAS_DATA('dcr_samp_provider_db.admin.request_stream_CONSUMER_ACCT')
+AS call dcr_samp_provider_db.admin.process_requests_batch('CONSUMER_ACCT');
+
+ALTER TASK dcr_samp_provider_db.admin.process_requests_batch_CONSUMER_ACCT RESUME;
+show tasks in  dcr_samp_provider_db.admin;
+
+// use this to later pause the clean room request approval task, if needed
+
+//ALTER TASK dcr_samp_provider_db.admin.process_requests_batch_CONSUMER_ACCT SUSPEND;
+
+// if this consumer was previously enabled with provider_enable_consumer.sql, suspend its per-request tasks so they do
+// not compete for the same stream
+
+//ALTER TASK dcr_samp_provider_db.admin.process_requests_CONSUMER_ACCT_1 SUSPEND;
+//ALTER TASK dcr_samp_provider_db.admin.process_requests_CONSUMER_ACCT_2 SUSPEND;
+//ALTER TASK dcr_samp_provider_db.admin.process_requests_CONSUMER_ACCT_3 SUSPEND;
+//ALTER TASK dcr_samp_provider_db.admin.process_requests_CONSUMER_ACCT_4 SUSPEND;
+//ALTER TASK dcr_samp_provider_db.admin.process_requests_CONSUMER_ACCT_5 SUSPEND;
+//ALTER TASK dcr_samp_provider_db.admin.process_requests_CONSUMER_ACCT_6 SUSPEND;
@@ -0,0 +1,52 @@
+/*************************************************************************************************************
+Script:             Data Clean Room - v5.5 - Provider Enable Consumer (Consolidated Scheduling)
+Create Date:        2026-10-18
+Author:             agent
+Description:        Provider enabling the consumer for submitting requests by registering the consumer's request
+                    stream with the consolidated request scheduler. No per-consumer tasks are created. Depends
+                    on the execution of scripts consumer_init.sql and provider_request_scheduler.sql.
+
+Copyright © 2022 Snowflake Inc. All rights reserved
+*************************************************************************************************************
+SUMMARY OF CHANGES
+Date(yyyy-mm-dd)    Author                              Comments
+------------------- -------------------                 --------------------------------------------
+2026-10-18          agent                               Initial Creation
+*************************************************************************************************************/
+
+use role data_clean_room_role;
+use warehouse app_wh;
+
+/////
+// REQUEST HANDLING FROM CONSUMER_ACCT
+/////
+
+// mount request share from consumer
+// NOTE show_initial_rows is not supposed to work across a share but it does and using here for ease of debugging
+
+create or replace database dcr_samp_CONSUMER_ACCT from share CONSUMER_ACCT.dcr_samp_requests_PROVIDER_ACCT;
+create or replace stream dcr_samp_provider_db.admin.request_stream_CONSUMER_ACCT on table dcr_samp_CONSUMER_ACCT.PROVIDER_ACCT_schema.requests append_only = true show_initial_rows = true
+comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}';
+
+// register the consumer's stream with the scheduler, which also adds it to the scheduler task's trigger
+
+call dcr_samp_provider_db.admin.register_request_route('CONSUMER_ACCT');
+
+// process any requests already waiting, one pass
+
+call dcr_samp_provider_db.admin.dispatch_requests(0, 0);
+
+// see registered consumers and processed request log
+select * from dcr_samp_provider_db.admin.request_routing;
+select * from dcr_samp_provider_db.admin.request_log;
+
+// if this consumer was previously enabled with provider_enable_consumer.sql or provider_enable_consumer_batch.sql,
+// suspend its own tasks so they do not compete with the scheduler for the same stream
+
+//ALTER TASK dcr_samp_provider_db.admin.process_requests_CONSUMER_ACCT_1 SUSPEND;
+//ALTER TASK dcr_samp_provider_db.admin.process_requests_CONSUMER_ACCT_2 SUSPEND;
+//ALTER TASK dcr_samp_provider_db.admin.process_requests_CONSUMER_ACCT_3 SUSPEND;
+//ALTER TASK dcr_samp_provider_db.admin.process_requests_CONSUMER_ACCT_4 SUSPEND;
+//ALTER TASK dcr_samp_provider_db.admin.process_requests_CONSUMER_ACCT_5 SUSPEND;
+//ALTER TASK dcr_samp_provider_db.admin.process_requests_CONSUMER_ACCT_6 SUSPEND;
+//ALTER TASK dcr_samp_provider_db.admin.process_requests_batch_CONSUMER_ACCT SUSPEND;
@@ -76,8 +76,8 @@ create or replace function dcr_samp_provider_db.templates.get_sql_jinja(template
   returns string
   language python
   runtime_version = 3.8
-  handler='apply_sql_template'
-  packages = ('six','jinja2==3.0.3','markupsafe')
+  handler='apply_sql_templates'
+  packages = ('six','jinja2==3.0.3','markupsafe','pandas')
   comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}'
 as
 $$
@@ -85,7 +85,7 @@ $$
 from __future__ import unicode_literals
 import jinja2
 from six import string_types
-from copy import deepcopy
+import hashlib
 import os
 import re
 from jinja2 import Environment
@@ -100,7 +100,7 @@ except ImportError:
     # For Python 2.6 and less
     from ordereddict import OrderedDict
 
-from threading import local
+from threading import local, Lock
 from random import Random
 
 _thread_local = local()
@@ -279,6 +279,32 @@ class JinjaSql(object):
             del _thread_local.param_index
 
 # Non-JinjaSql package code starts here
+
+# A single JinjaSql environment is shared by every call in the UDF process, and compiled templates are kept in an LRU
+# keyed by the template text hash, so validating many requests for the same template compiles it only once
+COMPILED_TEMPLATE_CACHE_SIZE = 256
+_jinja_sql = JinjaSql(param_style='pyformat')
+_compiled_templates = OrderedDict()
+_compiled_templates_lock = Lock()
+
+def get_compiled_template(template):
+    '''
+    Returns the compiled jinja Template for a template string, compiling it on first use.
+    '''
+    key = hashlib.sha256(template.encode('utf-8')).hexdigest()
+    with _compiled_templates_lock:
+        compiled = _compiled_templates.get(key)
+        if compiled is not None:
+            _compiled_templates.move_to_end(key)
+            return compiled
+
+    compiled = _jinja_sql.env.from_string(template)
+    with _compiled_templates_lock:
+        _compiled_templates[key] = compiled
+        while len(_compiled_templates) > COMPILED_TEMPLATE_CACHE_SIZE:
+            _compiled_templates.popitem(last=False)
+    return compiled
+
 def quote_sql_string(value):
     '''
     If `value` is a string type, escapes single quotes in the string
@@ -295,9 +321,8 @@ def quote_sql_string(value):
 def get_sql_from_template(query, bind_params):
     if not bind_params:
         return query
-    params = deepcopy(bind_params)
-    for key, val in params.items():
-        params[key] = quote_sql_string(val)
+    # bind params are only read here, so quote into a new dict instead of deep copying them
+    params = {key: quote_sql_string(val) for key, val in bind_params.items()}
     return query % params
 
 def strip_blank_lines(text):
@@ -312,10 +337,31 @@ def apply_sql_template(template, parameters):
     Apply a JinjaSql template (string) substituting parameters (dict) and return
     the final SQL.
     '''
-    j = JinjaSql(param_style='pyformat')
-    query, bind_params = j.prepare_query(template, parameters)
+    query, bind_params = _jinja_sql.prepare_query(get_compiled_template(template), parameters)
     return strip_blank_lines(get_sql_from_template(query, bind_params))
 
+import json
+import pandas
+
+def apply_sql_templates(df):
+    '''
+    Vectorized handler of the UDF. Applies the JinjaSql templates (column 0) to their parameters (column 1) for a
+    batch of rows, so set-based callers compile each distinct template once per batch. Rows without a template or
+    parameters return NULL.
+    '''
+    results = []
+    for template, parameters in zip(df[0], df[1]):
+        if not isinstance(template, string_types) or parameters is None:
+            results.append(None)
+            continue
+        if isinstance(parameters, string_types):
+            parameters = json.loads(parameters)
+        results.append(apply_sql_template(template, parameters))
+    return pandas.Series(results, dtype=object)
+
+apply_sql_templates._sf_vectorized_input = pandas.DataFrame
+apply_sql_templates._sf_max_batch_size = 1000
+
 $$;
 
 
@@ -326,6 +372,7 @@ $$;
 create or replace table dcr_samp_provider_db.cleanroom.provider_account(account_name varchar(1000)) comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}';
 
 // do this for each consumer account
+delete from dcr_samp_provider_db.cleanroom.provider_account where account_name = current_account();
 insert into dcr_samp_provider_db.cleanroom.provider_account (account_name)
 select current_account();
 
@@ -358,15 +405,161 @@ create or replace secure view dcr_samp_provider_db.cleanroom.provider_log commen
 select * from dcr_samp_provider_db.admin.request_log where current_account() = party_account;
 
 
+// create a compact table of currently approved query hashes, kept separate from the ever-growing request log
+// so the data firewall lookup stays small. One row per approved query, refreshed when it is approved again.
+create or replace table dcr_samp_provider_db.admin.approved_hashes
+    (party_account varchar(1000), query_hash varchar(1000), approved_ts timestamp, expires_ts timestamp)
+    cluster by (party_account, query_hash)
+    comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}';
+
+// approved queries pass the data firewall for ttl_minutes after their approval (24 hours by default). Update this
+// table to change it, e.g. update dcr_samp_provider_db.admin.approval_settings set ttl_minutes = 60;
+// the new ttl applies to approvals recorded after the change
+create or replace table dcr_samp_provider_db.admin.approval_settings (ttl_minutes number)
+comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}'
+as select 1440 as ttl_minutes;
+
+// record the approvals for the requests listed in a request table, called by the request processors. Expired
+// approvals are removed at the same time, so the table stays small without a separate task
+create or replace procedure dcr_samp_provider_db.admin.record_approved_hashes(request_table string)
+returns string
+language javascript
+comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}'
+execute as owner
+as $$
+
+var result = snowflake.execute({ sqlText: `merge into dcr_samp_provider_db.admin.approved_hashes h
+  using (select party_account, query_hash, max(processed_ts) as approved_ts,
+                dateadd('minute', (select any_value(ttl_minutes) from dcr_samp_provider_db.admin.approval_settings),
+                        max(processed_ts)) as expires_ts
+         from dcr_samp_provider_db.admin.request_log
+         where approved = true
+           and request_id in (select request_id::varchar from identifier(?))
+         group by party_account, query_hash) a
+  on h.party_account = a.party_account and h.query_hash = a.query_hash
+  when matched then update set approved_ts = a.approved_ts, expires_ts = a.expires_ts
+  when not matched then insert (party_account, query_hash, approved_ts, expires_ts)
+    values (a.party_account, a.query_hash, a.approved_ts, a.expires_ts)`, binds: [REQUEST_TABLE] });
+result.next();
+var message = 'Recorded ' + result.getColumnValue(1) + ' new and ' + result.getColumnValue(2) + ' renewed approvals';
+
+var result = snowflake.execute({ sqlText: `delete from dcr_samp_provider_db.admin.approved_hashes where expires_ts <= sysdate()` });
+result.next();
+return message + ', pruned ' + result.getColumnValue(1) + ' expired approvals';
+$$;
+
+// validate every request listed in a request table at once and log the results, called by the set-based request
+// processors. Rejection reasons are checked in the same order as process_requests, and templates are rendered in
+// batches by the vectorized get_sql_jinja, only for requests that pass the cheaper checks. Returns the number of
+// processed and approved requests
+create or replace procedure dcr_samp_provider_db.admin.validate_requests(request_table string)
+returns array
+language javascript
+comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}'
+execute as owner
+as $$
+
+var max_request_age_minutes = 5;
+
+var sql_text = `
+insert into dcr_samp_provider_db.admin.request_log (party_account, request_id, request_ts, request, app_instance_id, query_hash, template_name, epsilon, sensitivity, processed_ts, approved, error)
+with request as (
+  select req.*,
+  t.template,
+  lower(t.dimensions) as dimensions,
+  datediff('minute', req.request_ts::timestamp, sysdate()) as request_minutes_old
+  from identifier(?) req
+  left join dcr_samp_provider_db.templates.dcr_templates t
+    on t.party_account = req.requester_account
+   and t.template_name = req.query_template
+  qualify row_number() over (partition by req.request_id order by t.template_name) = 1
+),
+checked as (
+  select request.*,
+  case
+    when template is null
+      then 'Not approved: template ' || coalesce(query_template, '') || ' is not available.'
+    when request_minutes_old > `+max_request_age_minutes+`
+      then 'Not approved: request is ' || request_minutes_old || ' minutes old. The maxiumum request age is `+max_request_age_minutes+` minutes.'
+    when request_minutes_old < 0
+      then 'Not approved: request has a future timestamp.'
+    when select_fields is not null
+     and array_size(array_intersection(select_fields, split(dimensions, '|'))) != array_size(select_fields)
+      then 'Not approved:List of dimensions passed does not match with available values :' || replace(dimensions, '|', ''',''') || ' .'
+    when provider_accounts != current_account()
+      then 'Not approved: request is not addressed to this provider.'
+  end as rejection
+  from request
+),
+validated as (
+  select checked.*,
+  get(e.render_errors, request_id)::varchar as render_error,
+  dcr_samp_provider_db.templates.get_sql_jinja(
+    case when rejection is null and render_error is null then template end, request_params) as rendered
+  from checked, (select parse_json(?) as render_errors) e
+)
+select requester_account,
+       request_id,
+       request_ts::timestamp,
+       request,
+       case when rejection is null then request_params:app_instance_id::varchar end,
+       case when rejection is null then sha2(rendered) end,
+       query_template,
+       NULL,
+       NULL,
+       sysdate(),
+       rejection is null
+         and sha2(rendered) = request:PROPOSED_QUERY_HASH::varchar
+         and rendered = request:PROPOSED_QUERY::varchar as approved,
+       coalesce(rejection, 'Not approved: template could not be rendered: ' || render_error, 'None')
+from validated;`;
+
+var render_errors = {};
+try {
+  snowflake.execute({ sqlText: sql_text, binds: [REQUEST_TABLE, JSON.stringify(render_errors)] });
+} catch (err) {
+  // a template that cannot be rendered fails the whole statement, so render the requests one at a time to find
+  // which ones, and log those as not approved with their error
+  var requests = snowflake.execute({ sqlText: `select req.request_id, t.template, to_json(req.request_params)
+    from identifier(?) req
+    join dcr_samp_provider_db.templates.dcr_templates t
+      on t.party_account = req.requester_account
+     and t.template_name = req.query_template`, binds: [REQUEST_TABLE] });
+  while (requests.next()) {
+    try {
+      snowflake.execute({ sqlText: `select dcr_samp_provider_db.templates.get_sql_jinja(?, parse_json(?))`,
+        binds: [requests.getColumnValue(2), requests.getColumnValue(3)] });
+    } catch (render_err) {
+      render_errors[requests.getColumnValue(1)] = render_err.message;
+    }
+  }
+  snowflake.execute({ sqlText: sql_text, binds: [REQUEST_TABLE, JSON.stringify(render_errors)] });
+}
+snowflake.execute({ sqlText: `call dcr_samp_provider_db.admin.record_approved_hashes(?)`, binds: [REQUEST_TABLE] });
+
+var result = snowflake.execute({ sqlText: `select count(1), count_if(l.approved)
+  from dcr_samp_provider_db.admin.request_log l
+  join identifier(?) r on l.request_id = r.request_id`, binds: [REQUEST_TABLE] });
+result.next();
+return [result.getColumnValue(1), result.getColumnValue(2)];
+$$;
+
+
 //////////////////
 // ADD DATA FIREWALL ROW ACCESS POLICY
 //////////////////
 
-create or replace row access policy dcr_samp_provider_db.shared_schema.data_firewall as (foo varchar) returns boolean ->
-    exists  (select request_id from dcr_samp_provider_db.admin.request_log w
+// the policy is created denying all rows and its body is set separately, so the body can be changed while the
+// policy is attached to views
+create row access policy if not exists dcr_samp_provider_db.shared_schema.data_firewall as (foo varchar) returns boolean ->
+    false;
+
+// the policy only consults unexpired approvals, so its cost does not grow with the request log
+alter row access policy dcr_samp_provider_db.shared_schema.data_firewall set body ->
+    exists  (select query_hash from dcr_samp_provider_db.admin.approved_hashes w
                where party_account=current_account()
-                  and approved=true
-                  and query_hash=sha2(current_statement()));
+                  and query_hash=sha2(current_statement())
+                  and expires_ts > sysdate());
 
 //see request log
 select * from dcr_samp_provider_db.admin.request_log;
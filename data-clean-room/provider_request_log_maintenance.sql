@@ -0,0 +1,117 @@
+/*************************************************************************************************************
+Script:             Data Clean Room - v5.5 - Provider Request Log Maintenance
+Create Date:        2026-10-18
+Author:             agent
+Description:        Provider retention and maintenance for the request log. Clusters the log by consumer and
+                    processing time, archives rows older than LOG_RETENTION_DAYS days into a history table
+                    on a daily task, and shares a slim request status view for consumers to poll. Depends on
+                    the execution of script provider_init.sql. Safe to re-run, which also applies a new
+                    retention period.
+
+Copyright © 2022 Snowflake Inc. All rights reserved
+*************************************************************************************************************
+SUMMARY OF CHANGES
+Date(yyyy-mm-dd)    Author                              Comments
+------------------- -------------------                 --------------------------------------------
+2026-10-18          agent                               Initial Creation
+*************************************************************************************************************/
+
+use role data_clean_room_role;
+use warehouse app_wh;
+
+//////
+// CLUSTER THE REQUEST LOG
+//////
+
+// consumer views filter on party_account and recent processed_ts, so cluster the hot log the same way
+alter table dcr_samp_provider_db.admin.request_log cluster by (party_account, processed_ts);
+
+
+//////
+// ARCHIVE OLD REQUESTS
+//////
+
+// history table for archived request log rows, with the same columns as the request log. Snowflake stores it
+// compressed and columnar, and it is not shared with consumers.
+create table if not exists dcr_samp_provider_db.admin.request_log_history
+    (party_account varchar(1000), request_id varchar(1000), request_ts timestamp, request variant, query_hash varchar(1000),
+     template_name varchar(1000), epsilon double, sensitivity int,  app_instance_id varchar(1000), processed_ts timestamp, approved boolean, error varchar(1000),
+     archived_ts timestamp)
+    cluster by (party_account, to_date(processed_ts))
+    comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}';
+
+// moves request log rows processed more than retention_days ago into the history table, in one transaction
+create or replace procedure dcr_samp_provider_db.admin.archive_request_log(retention_days float)
+returns string
+language javascript
+comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}'
+execute as owner
+as $$
+
+var result = snowflake.execute({ sqlText: `select dateadd('day', -1 * :1, sysdate())`, binds: [RETENTION_DAYS] });
+result.next();
+var cutoff_ts = result.getColumnValue(1);
+
+snowflake.execute({ sqlText: `begin` });
+try {
+  var result = snowflake.execute({ sqlText: `insert into dcr_samp_provider_db.admin.request_log_history
+    select party_account, request_id, request_ts, request, query_hash, template_name, epsilon, sensitivity, app_instance_id,
+           processed_ts, approved, error, sysdate()
+    from dcr_samp_provider_db.admin.request_log
+    where processed_ts < :1`, binds: [cutoff_ts] });
+  result.next();
+  var archived = result.getColumnValue(1);
+
+  snowflake.execute({ sqlText: `delete from dcr_samp_provider_db.admin.request_log where processed_ts < :1`, binds: [cutoff_ts] });
+  snowflake.execute({ sqlText: `commit` });
+} catch (err) {
+  snowflake.execute({ sqlText: `rollback` });
+  throw err;
+}
+return 'Archived ' + archived + ' requests processed before ' + cutoff_ts;
+$$;
+
+// archive daily
+
+CREATE OR REPLACE TASK dcr_samp_provider_db.admin.archive_request_log
+  SCHEDULE = 'USING CRON 0 2 * * * UTC'  WAREHOUSE = 'app_wh'
+AS call dcr_samp_provider_db.admin.archive_request_log(LOG_RETENTION_DAYS);
+
+ALTER TASK dcr_samp_provider_db.admin.archive_request_log RESUME;
+
+// archive now, once
+call dcr_samp_provider_db.admin.archive_request_log(LOG_RETENTION_DAYS);
+
+// full request history, for provider-side auditing
+create or replace view dcr_samp_provider_db.admin.request_log_all comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}' as
+select party_account, request_id, request_ts, request, query_hash, template_name, epsilon, sensitivity, app_instance_id,
+       processed_ts, approved, error
+from dcr_samp_provider_db.admin.request_log
+union all
+select party_account, request_id, request_ts, request, query_hash, template_name, epsilon, sensitivity, app_instance_id,
+       processed_ts, approved, error
+from dcr_samp_provider_db.admin.request_log_history;
+
+
+//////
+// SLIM REQUEST STATUS VIEW
+//////
+
+// create a dynamic secure view with only the columns consumers need while polling for approval, so polls do not read
+// the request variant
+create or replace secure view dcr_samp_provider_db.cleanroom.provider_log_status comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}' as
+select request_id, approved, error from dcr_samp_provider_db.admin.request_log where current_account() = party_account;
+
+grant select on dcr_samp_provider_db.cleanroom.provider_log_status to share dcr_samp_app;
+
+// consumers can then poll the status view, and read the proposed query from their own request table
+// select REQUEST_ID, APPROVED, ERROR from dcr_samp_app.cleanroom.provider_log_status where request_id = '<request_id>';
+
+// see the hot log, the history and the archive task
+select count(*) from dcr_samp_provider_db.admin.request_log;
+select count(*) from dcr_samp_provider_db.admin.request_log_history;
+show tasks like 'ARCHIVE_REQUEST_LOG' in dcr_samp_provider_db.admin;
+
+// use this to later pause archival, if needed
+
+//ALTER TASK dcr_samp_provider_db.admin.archive_request_log SUSPEND;
@@ -0,0 +1,196 @@
+/*************************************************************************************************************
+Script:             Data Clean Room - v5.5 - Provider Request Scheduler
+Create Date:        2026-10-18
+Author:             agent
+Description:        Provider setup for consolidated request scheduling. Consumers are registered in a routing
+                    table and a single scheduler task drains every registered request stream in bulk, instead of
+                    each consumer running its own fleet of tasks. Safe to re-run, which also applies a new
+                    latency target. Consumers are registered by provider_enable_consumer_scheduled.sql.
+
+Copyright © 2022 Snowflake Inc. All rights reserved
+*************************************************************************************************************
+SUMMARY OF CHANGES
+Date(yyyy-mm-dd)    Author                              Comments
+------------------- -------------------                 --------------------------------------------
+2026-10-18          agent                               Initial Creation
+*************************************************************************************************************/
+
+use role data_clean_room_role;
+use warehouse app_wh;
+
+////////
+// REQUEST ROUTING
+////////
+
+// one row per consumer whose request stream is dispatched by the scheduler
+create table if not exists dcr_samp_provider_db.admin.request_routing
+    (party_account varchar(1000), stream_name varchar(1000), enabled boolean, registered_ts timestamp)
+    comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}';
+
+// holds the requests drained from every stream during one dispatch pass
+create or replace table dcr_samp_provider_db.admin.request_dispatch_tmp
+    (request_id varchar, query_template varchar, requester_account varchar, provider_accounts varchar,
+     request_ts variant, request variant, request_params variant, select_fields variant)
+    comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}';
+
+////////
+// REQUEST DISPATCH
+////////
+
+// dispatch_requests drains all registered streams with a single insert and validates every drained request with
+// validate_requests from provider_init.sql, the same validation as the batch processor. It repeats every
+// latency_seconds until run_seconds are used up, so the scheduler can meet latency targets shorter than its schedule.
+// Both are done in one transaction per pass, so requests stay in their streams if validation fails.
+// Between passes the task waits with system$wait, which keeps app_wh running. A latency target below 60 seconds
+// therefore bills the warehouse for the whole minute of every task run, even when the streams are empty after the
+// first pass. Targets of 60 seconds or more make a single pass per run.
+
+create or replace procedure dcr_samp_provider_db.admin.dispatch_requests(latency_seconds float, run_seconds float)
+returns string
+language javascript
+comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}'
+execute as owner
+as $$
+
+var start_ms = Date.now();
+var passes = 0;
+var processed = 0;
+var approved = 0;
+var failed_streams = [];
+
+var drain_sql = function (stream_name) {
+  return `select REQUEST:REQUEST_ID::varchar, REQUEST:QUERY_TEMPLATE::varchar, REQUEST:REQUESTER_ACCOUNT::varchar,
+   array_to_string(REQUEST:PROVIDER_ACCOUNTS, ','), REQUEST:REQUEST_TS, REQUEST, REQUEST:REQUEST_PARAMS,
+   REQUEST:REQUEST_PARAMS."dimensions"
+   from ` + stream_name;
+};
+
+while (true) {
+  var stream_names = [];
+  var routes = snowflake.execute({ sqlText: `select stream_name from dcr_samp_provider_db.admin.request_routing where enabled order by party_account` });
+  while (routes.next()) {
+    stream_names.push(routes.getColumnValue(1));
+  }
+  if (stream_names.length == 0) {
+    return 'No consumers registered';
+  }
+
+  snowflake.execute({ sqlText: `begin` });
+  try {
+    snowflake.execute({ sqlText: `delete from dcr_samp_provider_db.admin.request_dispatch_tmp` });
+    try {
+      snowflake.execute({ sqlText: `insert into dcr_samp_provider_db.admin.request_dispatch_tmp ` + stream_names.map(drain_sql).join(` union all `) });
+    } catch (err) {
+      // one unreadable stream (e.g. a dropped consumer share) must not block every other consumer
+      for (var i = 0; i < stream_names.length; i++) {
+        try {
+          snowflake.execute({ sqlText: `insert into dcr_samp_provider_db.admin.request_dispatch_tmp ` + drain_sql(stream_names[i]) });
+        } catch (stream_err) {
+          if (failed_streams.indexOf(stream_names[i]) < 0) {
+            failed_streams.push(stream_names[i]);
+          }
+        }
+      }
+    }
+
+    var result = snowflake.execute({ sqlText: `select count(1) from dcr_samp_provider_db.admin.request_dispatch_tmp` });
+    result.next();
+    if (result.getColumnValue(1) > 0) {
+      var result = snowflake.execute({ sqlText: `call dcr_samp_provider_db.admin.validate_requests('dcr_samp_provider_db.admin.request_dispatch_tmp')` });
+      result.next();
+      processed += result.getColumnValue(1)[0];
+      approved += result.getColumnValue(1)[1];
+    }
+    snowflake.execute({ sqlText: `commit` });
+  } catch (err) {
+    snowflake.execute({ sqlText: `rollback` });
+    throw err;
+  }
+  passes += 1;
+
+  if (Date.now() - start_ms + LATENCY_SECONDS * 1000 >= RUN_SECONDS * 1000) {
+    break;
+  }
+  // app_wh stays running, and billed, while waiting for the next pass
+  snowflake.execute({ sqlText: `call system$wait(` + LATENCY_SECONDS + `)` });
+}
+
+var message = 'Dispatched ' + processed + ' requests in ' + passes + ' passes: ' + approved + ' approved, ' + (processed - approved) + ' not approved';
+if (failed_streams.length > 0) {
+  message += '. Unreadable streams: ' + failed_streams.join(', ');
+}
+return message;
+$$;
+
+////////
+// SCHEDULER TASK
+////////
+
+// (re)creates the single scheduler task. It only wakes the warehouse when a registered stream has data, and each run
+// keeps dispatching at the latency target until the next scheduled run.
+
+create or replace procedure dcr_samp_provider_db.admin.refresh_request_scheduler()
+returns string
+language javascript
+comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}'
+execute as owner
+as $$
+
+var conditions = [];
+var routes = snowflake.execute({ sqlText: `select stream_name from dcr_samp_provider_db.admin.request_routing where enabled order by party_account` });
+while (routes.next()) {
+  conditions.push(`SYSTEM$STREAM_HAS_DATA('` + routes.getColumnValue(1) + `')`);
+}
+
+var task_sql = `CREATE OR REPLACE TASK dcr_samp_provider_db.admin.request_scheduler
+  SCHEDULE = 'SCHEDULER_INTERVAL_MINUTES minute'  WAREHOUSE = 'app_wh'`;
+if (conditions.length > 0) {
+  task_sql += `
+WHEN ` + conditions.join(` OR `);
+}
+task_sql += `
+AS call dcr_samp_provider_db.admin.dispatch_requests(SCHEDULER_LATENCY_SECONDS, SCHEDULER_RUN_SECONDS)`;
+snowflake.execute({ sqlText: task_sql });
+
+if (conditions.length == 0) {
+  return 'Scheduler suspended: no consumers registered';
+}
+snowflake.execute({ sqlText: `ALTER TASK dcr_samp_provider_db.admin.request_scheduler RESUME` });
+return 'Scheduler dispatching ' + conditions.length + ' consumers';
+$$;
+
+// registers (or re-enables) a consumer's request stream with the scheduler
+
+create or replace procedure dcr_samp_provider_db.admin.register_request_route(party_account string)
+returns string
+language javascript
+comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}'
+execute as owner
+as $$
+
+snowflake.execute({ sqlText: `merge into dcr_samp_provider_db.admin.request_routing r
+  using (select :1 as party_account, 'dcr_samp_provider_db.admin.request_stream_' || :1 as stream_name) s
+  on r.party_account = s.party_account
+  when matched then update set stream_name = s.stream_name, enabled = true
+  when not matched then insert (party_account, stream_name, enabled, registered_ts)
+    values (s.party_account, s.stream_name, true, sysdate())`, binds: [PARTY_ACCOUNT] });
+
+var result = snowflake.execute({ sqlText: `call dcr_samp_provider_db.admin.refresh_request_scheduler()` });
+result.next();
+return result.getColumnValue(1);
+$$;
+
+call dcr_samp_provider_db.admin.refresh_request_scheduler();
+
+// see registered consumers and the scheduler task
+select * from dcr_samp_provider_db.admin.request_routing;
+show tasks like 'REQUEST_SCHEDULER' in dcr_samp_provider_db.admin;
+
+// use this to stop dispatching a consumer's requests, then refresh the scheduler
+
+//update dcr_samp_provider_db.admin.request_routing set enabled = false where party_account = 'CONSUMER_ACCT';
+//call dcr_samp_provider_db.admin.refresh_request_scheduler();
+
+// use this to later pause the scheduler, if needed
+
+//ALTER TASK dcr_samp_provider_db.admin.request_scheduler SUSPEND;
@@ -0,0 +1,41 @@
+/*************************************************************************************************************
+Script:             Data Clean Room - v5.5 - Provider Result Cache
+Create Date:        2026-10-18
+Author:             agent
+Description:        Optional provider setup that shares when each shared table last changed, so consumers can
+                    reuse cached request results until the provider data changes. A task refreshes the version
+                    every 5 minutes on app_wh, so a cached result can lag a data change by up to 5 minutes.
+                    Without this script consumers do not reuse cached results.
+
+Copyright © 2022 Snowflake Inc. All rights reserved
+*************************************************************************************************************
+SUMMARY OF CHANGES
+Date(yyyy-mm-dd)    Author                              Comments
+------------------- -------------------                 --------------------------------------------
+2026-10-18          agent                               Initial Creation
+*************************************************************************************************************/
+
+use role data_clean_room_role;
+use warehouse app_wh;
+
+////////
+// PROVIDER DATA VERSION
+////////
+
+// when each shared table last changed, so consumers can drop cached results computed on older provider data
+create or replace table dcr_samp_provider_db.cleanroom.provider_data_version (table_name varchar(1000), last_altered timestamp_ltz)
+    comment='{"origin":"sf_ps_wls","name":"dcr","version":{"major":5, "minor":5},"attributes":{"component":"dcr",“role”:“provider”}}';
+
+insert overwrite into dcr_samp_provider_db.cleanroom.provider_data_version
+  select table_name, last_altered from dcr_samp_provider_db.information_schema.tables
+  where table_schema = 'SHARED_SCHEMA' and table_type = 'BASE TABLE';
+
+CREATE OR REPLACE TASK dcr_samp_provider_db.admin.refresh_provider_data_version
+  SCHEDULE = '5 minute'  WAREHOUSE = 'app_wh'
+AS insert overwrite into dcr_samp_provider_db.cleanroom.provider_data_version
+  select table_name, last_altered from dcr_samp_provider_db.information_schema.tables
+  where table_schema = 'SHARED_SCHEMA' and table_type = 'BASE TABLE';
+
+ALTER TASK dcr_samp_provider_db.admin.refresh_provider_data_version RESUME;
+
+grant select on dcr_samp_provider_db.cleanroom.provider_data_version to share dcr_samp_app;
@@ -18,3 +18,4 @@ use role data_clean_room_role;
 drop share if exists dcr_samp_app;
 drop database if exists dcr_samp_provider_db;
 drop database if exists dcr_samp_CONSUMER_ACCT;
+drop database if exists dcr_samp_deployment_db;
@@ -0,0 +1,130 @@
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import snowflake_dcr as dcr
+
+
+dcr_version = "DCR 5.5 General Availability"
+
+
+# Reads consumer rows from a CSV file with a header row, or from a JSON list of objects. Rows that cannot be read
+# keep an error, so they are reported in the manifest instead of stopping the batch
+def read_consumer_rows(input_file):
+    with open(input_file, "r", encoding='utf-8', newline='') as fin:
+        if input_file.lower().endswith(".json"):
+            rows = json.load(fin)
+        else:
+            rows = list(csv.DictReader(fin))
+
+    consumer_rows = []
+    for row in rows:
+        try:
+            consumer_rows.append({"provider_account": row["provider_account"].strip(),
+                                  "consumer_account": row["consumer_account"].strip(),
+                                  "abbreviation": (row.get("abbreviation") or "").strip(),
+                                  "data_selection": (row.get("data_selection") or "None").strip(),
+                                  "request_processor": (row.get("request_processor") or "Single").strip(),
+                                  "request_scheduler": (row.get("request_scheduler") or "Per Consumer").strip(),
+                                  "scheduler_latency_seconds": int(row.get("scheduler_latency_seconds") or 60),
+                                  "scale_factor": (row.get("scale_factor") or "1M").strip(),
+                                  "error": None})
+        except KeyError as err:
+            consumer_rows.append(invalid_consumer_row(row, "Missing column " + str(err)))
+        except (AttributeError, TypeError, ValueError) as err:
+            consumer_rows.append(invalid_consumer_row(row, "Invalid row: " + str(err)))
+    return consumer_rows
+
+
+# Keeps the accounts of a row that could not be read, for the manifest
+def invalid_consumer_row(row, error):
+    if not isinstance(row, dict):
+        row = {}
+    return {"provider_account": str(row.get("provider_account") or ""),
+            "consumer_account": str(row.get("consumer_account") or ""),
+            "error": error}
+
+
+# Generates the consumer addition scripts for one row and writes them to a numbered zip bundle
+def build_consumer_bundle(bundle_number, row, repo_path, output_dir, include_comments):
+    manifest_entry = dict(row, bundle_number=bundle_number, bundle=None, scripts=[], bytes=0)
+    if manifest_entry["error"] is not None:
+        return manifest_entry
+    if row["provider_account"].split(".")[0].upper() == row["consumer_account"].split(".")[0].upper():
+        manifest_entry["error"] = "Provider and consumer cannot be the same account!"
+        return manifest_entry
+
+    # a row that cannot be generated (e.g. an unknown scale factor) is recorded instead of failing the batch
+    try:
+        data_clean_room = dcr.SnowflakeDcr()
+        data_clean_room.prepare_consumer_addition(True, dcr_version, row["provider_account"], None,
+                                                  row["consumer_account"], None, row["abbreviation"], repo_path,
+                                                  row["data_selection"], row["request_processor"],
+                                                  row["request_scheduler"], row["scheduler_latency_seconds"],
+                                                  row["scale_factor"])
+
+        bundle_name = str(bundle_number).zfill(4) + " - " + row["consumer_account"].split(".")[0].upper() + ".zip"
+        bundle_path = os.path.join(output_dir, bundle_name)
+        scripts = data_clean_room.write_zip(bundle_path, include_comments)
+        manifest_entry["bytes"] = os.path.getsize(bundle_path)
+    except Exception as err:
+        manifest_entry["error"] = type(err).__name__ + ": " + str(err)
+        return manifest_entry
+
+    manifest_entry["scripts"] = scripts
+    manifest_entry["bundle"] = bundle_name
+    return manifest_entry
+
+
+# Generates bundles for every row in parallel and writes a combined manifest
+def run_batch(input_file, output_dir, repo_path, jobs=None, include_comments=True):
+    consumer_rows = read_consumer_rows(input_file)
+    os.makedirs(output_dir, exist_ok=True)
+
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        manifest = list(executor.map(build_consumer_bundle,
+                                     range(1, len(consumer_rows) + 1),
+                                     consumer_rows,
+                                     [repo_path] * len(consumer_rows),
+                                     [output_dir] * len(consumer_rows),
+                                     [include_comments] * len(consumer_rows),
+                                     chunksize=max(1, len(consumer_rows) // ((jobs or os.cpu_count() or 1) * 4))))
+    elapsed_seconds = time.perf_counter() - start_time
+
+    bundle_count = sum(1 for entry in manifest if entry["error"] is None)
+    total_bytes = sum(entry["bytes"] for entry in manifest)
+    summary = {"bundles": bundle_count,
+               "errors": len(manifest) - bundle_count,
+               "seconds": round(elapsed_seconds, 3),
+               "bundles_per_second": round(bundle_count / elapsed_seconds, 2) if elapsed_seconds else None,
+               "total_bytes": total_bytes}
+
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding='utf-8') as fout:
+        json.dump({"dcr_version": dcr_version, "summary": summary, "bundles": manifest}, fout, indent=2)
+
+    for entry in manifest:
+        if entry["error"] is not None:
+            print("Skipped " + (entry["consumer_account"] or "row " + str(entry["bundle_number"])) + ": " +
+                  entry["error"])
+    print("Generated " + str(bundle_count) + " bundles in " + format(elapsed_seconds, ".2f") + "s (" +
+          str(summary["bundles_per_second"]) + " bundles/sec, " + str(total_bytes) + " bytes)")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates consumer addition script bundles for many consumers")
+    parser.add_argument("input_file", help="CSV or JSON file with provider_account, consumer_account, abbreviation, "
+                                           "data_selection, request_processor, request_scheduler, "
+                                           "scheduler_latency_seconds and scale_factor for each consumer")
+    parser.add_argument("--output-dir", default="dcr_bundles", help="Directory for the bundles and manifest")
+    parser.add_argument("--jobs", type=int, default=None, help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--no-comments", action="store_true", help="Remove comments from the scripts")
+    parser.add_argument("--path", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                       "data-clean-room") + "/",
+                        help="Path to the data-clean-room scripts")
+    args = parser.parse_args()
+
+    run_batch(args.input_file, args.output_dir, args.path, args.jobs, not args.no_comments)
@@ -0,0 +1,585 @@
+import argparse
+import asyncio
+import contextlib
+import copy
+import io
+import itertools
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+import snowflake_dcr as dcr
+from tests.fake_snowflake import FakeConsumerConnection, FakeSnowflakeConnection
+
+
+# Per-line replacement loop used by SnowflakeDcr.execute before the compiled substitution engine
+def legacy_render(script_text, check_words, replace_words):
+    comment_code_regex_slash = re.compile(r"(?<!:)//.*")
+    comment_code_regex_dash = re.compile(r"(?<!:)--.*")
+    snowsql_code_regex = re.compile(r"^(?<!:)!.*")
+    prepared_script_text = ""
+    cleaned_script_text = ""
+
+    for line in script_text.splitlines(keepends=True):
+        for check, replace in zip(check_words, replace_words):
+            line = line.replace(check, replace)
+
+        line = re.sub(snowsql_code_regex, '', line)
+        prepared_script_text += line
+
+        line = re.sub(comment_code_regex_slash, '', line)
+        line = re.sub(comment_code_regex_dash, '', line)
+        cleaned_script_text += line
+
+    return prepared_script_text, cleaned_script_text
+
+
+# Whole-file rendering as done by SnowflakeDcr.execute
+def compiled_render(script_text, check_words, replace_words):
+    substitute = dcr.compile_substitutions(check_words, replace_words)
+    prepared_script_text = dcr.prepare_script_text(script_text, substitute)
+    return prepared_script_text, dcr.clean_script_text(prepared_script_text)
+
+
+# Builds a synthetic script containing a number of placeholders, repeated to the requested scale
+def build_synthetic_script(repo_path, scale, placeholder_count):
+    with open(repo_path + "provider_enable_consumer.sql", "r", encoding='utf-8') as fin:
+        script_text = fin.read()
+
+    placeholder_lines = "".join("select 'PLACEHOLDER_" + str(i) + "'; // placeholder " + str(i) + "\n"
+                                for i in range(placeholder_count))
+    return (script_text + placeholder_lines) * scale
+
+
+# Compares the legacy per-line loop against the compiled substitution engine
+def benchmark_substitution(repo_path, scale=10, placeholder_count=100, repeat=5):
+    check_words = ["PROVIDER_ACCT", "provider_acct", "CONSUMER_ACCT", "consumer_acct", "_SAMP_", "_samp_"]
+    replace_words = ["ABC12345", "ABC12345", "XYZ67890", "XYZ67890", "_bench_", "_bench_"]
+    for i in range(placeholder_count):
+        check_words.append("PLACEHOLDER_" + str(i))
+        replace_words.append("value_" + str(i))
+
+    script_text = build_synthetic_script(repo_path, scale, placeholder_count)
+    if legacy_render(script_text, check_words, replace_words) != compiled_render(script_text, check_words,
+                                                                                  replace_words):
+        raise AssertionError("Compiled substitution output differs from the legacy per-line loop")
+
+    legacy_time = min(timeit.repeat(lambda: legacy_render(script_text, check_words, replace_words),
+                                    number=1, repeat=repeat))
+    compiled_time = min(timeit.repeat(lambda: compiled_render(script_text, check_words, replace_words),
+                                      number=1, repeat=repeat))
+
+    print("Script size: " + str(len(script_text)) + " chars, " + str(len(check_words)) + " check words")
+    print("Legacy per-line loop:  " + format(legacy_time * 1000, ".2f") + " ms")
+    print("Compiled substitution: " + format(compiled_time * 1000, ".2f") + " ms")
+    print("Speedup: " + format(legacy_time / compiled_time, ".1f") + "x")
+
+
+# Parameters covering every variable used by the Media & Advertising templates
+SAMPLE_TEMPLATE_PARAMETERS = dict(dcr.SAMPLE_TEMPLATE_PARAMETERS, dimensions=["c.pets", "c.zip", "p.status"])
+
+
+# Renders a template the way get_sql_jinja did before compiled template caching: a new environment per call, and
+# deep-copied bind params
+def uncached_apply_sql_template(udf_module, template, parameters):
+    query, bind_params = udf_module.JinjaSql(param_style='pyformat').prepare_query(template, parameters)
+    if bind_params:
+        params = copy.deepcopy(bind_params)
+        for key, val in params.items():
+            params[key] = udf_module.quote_sql_string(val)
+        query = query % params
+    return udf_module.strip_blank_lines(query)
+
+
+# Measures get_sql_jinja renders/sec for the sample templates, with and without compiled template caching
+def benchmark_template_rendering(repo_path, renders=2000):
+    udf_module = dcr.load_template_renderer(repo_path)
+    templates = [template for _, template, _ in
+                 dcr.read_templates(dcr.script_source_cache.read(repo_path +
+                                                                 "media-and-advertising/provider_templates.sql"))]
+    for template in templates:
+        if (udf_module.apply_sql_template(template, SAMPLE_TEMPLATE_PARAMETERS) !=
+                uncached_apply_sql_template(udf_module, template, SAMPLE_TEMPLATE_PARAMETERS)):
+            raise AssertionError("Cached template rendering differs from uncached rendering")
+
+    render_count = max(renders // len(templates), 1) * len(templates)
+    uncached_time = min(timeit.repeat(
+        lambda: [uncached_apply_sql_template(udf_module, template, SAMPLE_TEMPLATE_PARAMETERS)
+                 for template in templates],
+        number=render_count // len(templates), repeat=3))
+    cached_time = min(timeit.repeat(
+        lambda: [udf_module.apply_sql_template(template, SAMPLE_TEMPLATE_PARAMETERS) for template in templates],
+        number=render_count // len(templates), repeat=3))
+
+    print("Templates: " + str(len(templates)) + ", renders: " + str(render_count))
+    print("Uncached get_sql_jinja: " + format(render_count / uncached_time, ".0f") + " renders/sec")
+    print("Cached get_sql_jinja:   " + format(render_count / cached_time, ".0f") + " renders/sec")
+    print("Speedup: " + format(uncached_time / cached_time, ".1f") + "x")
+
+
+# Measures end-to-end consumer request latency with the async client against a fake consumer connection, sending
+# requests one at a time and then all at once, each fanned out to provider_count providers, and then repeating one
+# single-provider request, which the result cache answers after the first time
+def benchmark_request_client(request_count=50, provider_count=3, approval_latency=0.05, max_concurrent_queries=8):
+    provider_accounts = ["PROVIDER" + str(provider_number) for provider_number in range(1, provider_count + 1)]
+    app_databases = {provider_account: "dcr_samp_app_" + provider_account.lower()
+                     for provider_account in provider_accounts}
+    requests = [(provider_accounts, "customer_overlap_multiparty", {"dimensions": ["p.status", "c.pets"]})
+                for _ in range(request_count)]
+    repeated_requests = [(provider_accounts[0], "customer_overlap", {"dimensions": ["p.status", "c.pets"]})
+                         for _ in range(request_count)]
+
+    async def run_sequential(client, mode_requests):
+        for request in mode_requests:
+            await client.request(*request)
+
+    for mode in ["sequential", "concurrent", "repeated"]:
+        client = dcr.ConsumerRequestClient(FakeConsumerConnection(approval_latency), app_databases=app_databases,
+                                           max_concurrent_queries=max_concurrent_queries,
+                                           poll_interval=approval_latency / 4)
+        start_time = time.perf_counter()
+        if mode == "sequential":
+            asyncio.run(run_sequential(client, requests))
+        elif mode == "concurrent":
+            asyncio.run(client.request_many(requests))
+        else:
+            asyncio.run(run_sequential(client, repeated_requests))
+        elapsed_seconds = time.perf_counter() - start_time
+        client.close()
+        summary = client.latency_summary()
+        print(format(mode, "<11") + str(summary["requests"]) + " requests to " +
+              str(1 if mode == "repeated" else provider_count) + " providers in " + format(elapsed_seconds, ".2f") +
+              "s (" + format(summary["requests"] / elapsed_seconds, ".1f") + " requests/sec), latency p50 " +
+              format(summary["p50"], ".3f") + "s p95 " + format(summary["p95"], ".3f") + "s, " +
+              str(summary["polls"]) + " polls, " + str(summary["cached"]) + " cached")
+
+
+# Times a non-debug deployment against fake provider and consumer connections
+def benchmark_execution(repo_path, latency=0.001):
+    data_clean_room = dcr.SnowflakeDcr()
+    data_clean_room.prepare_dcr_deployment(False, "DCR 5.5 General Availability", "PROVIDER1",
+                                           FakeSnowflakeConnection("PROVIDER1", latency), "CONSUMER1",
+                                           FakeSnowflakeConnection("CONSUMER1", latency), "", repo_path,
+                                           "Media & Advertising")
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        data_clean_room.execute()
+    elapsed_seconds = time.perf_counter() - start_time
+    print("Deployment with " + format(latency * 1000, ".1f") + " ms statement latency: " +
+          format(elapsed_seconds, ".2f") + "s")
+
+
+# Times a non-debug deployment whose consumer connection fails partway through, then its resumed run, which skips
+# the statements the first run completed
+def benchmark_resume(repo_path, latency=0.001, fail_after=20):
+    journal_file = os.path.join(tempfile.mkdtemp(prefix="dcr_benchmark_"), "journal.jsonl")
+    connections = {"PROVIDER1": FakeSnowflakeConnection("PROVIDER1", latency),
+                   "CONSUMER1": FakeSnowflakeConnection("CONSUMER1", latency, fail_after=fail_after)}
+    data_clean_room = dcr.SnowflakeDcr()
+    data_clean_room.journal = dcr.DeploymentJournal(journal_file)
+    data_clean_room.prepare_dcr_deployment(False, "DCR 5.5 General Availability", "PROVIDER1",
+                                           connections["PROVIDER1"], "CONSUMER1", connections["CONSUMER1"], "",
+                                           repo_path, "Media & Advertising")
+    for resume in [False, True]:
+        statement_counts = [len(conn.queries) for conn in connections.values()]
+        start_time = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                data_clean_room.execute(resume=resume)
+            outcome = "completed"
+        except RuntimeError as error:
+            outcome = "failed (" + str(error) + ")"
+        elapsed_seconds = time.perf_counter() - start_time
+        statement_count = sum(len(conn.queries) for conn in connections.values()) - sum(statement_counts)
+        print(("Resumed" if resume else "First") + " run " + outcome + " after " + str(statement_count) +
+              " statements in " + format(elapsed_seconds, ".2f") + "s")
+    shutil.rmtree(os.path.dirname(journal_file))
+
+
+# Returns a copy of the scripts with the first occurrence of text replaced in one script
+def build_changed_repo(repo_path, script, text, replacement):
+    changed_repo_path = tempfile.mkdtemp(prefix="dcr_benchmark_") + "/"
+    shutil.copytree(repo_path, changed_repo_path, dirs_exist_ok=True)
+    with open(os.path.join(changed_repo_path, script), "r", encoding='utf-8') as fin:
+        script_text = fin.read()
+    with open(os.path.join(changed_repo_path, script), "w", encoding='utf-8') as fout:
+        fout.write(script_text.replace(text, replacement, 1))
+    return changed_repo_path
+
+
+# Times a full deployment and then diff-based redeploys against fake connections: one with no changes, one after a
+# template change and one after a data firewall policy change, printing how many statements each run executed
+def benchmark_redeploy(repo_path, latency=0.001):
+    template_repo_path = build_changed_repo(repo_path, "media-and-advertising/provider_templates.sql",
+                                            "count(distinct p.email)  > 25", "count(distinct p.email)  > 50")
+    policy_repo_path = build_changed_repo(template_repo_path, "provider_init.sql", "and expires_ts > sysdate()",
+                                          "and expires_ts > current_timestamp()")
+
+    connections = {"PROVIDER1": FakeSnowflakeConnection("PROVIDER1", latency),
+                   "CONSUMER1": FakeSnowflakeConnection("CONSUMER1", latency)}
+    for run_name, run_repo_path in [("First redeploy", repo_path), ("Unchanged redeploy", repo_path),
+                                    ("Template change redeploy", template_repo_path),
+                                    ("Policy change redeploy", policy_repo_path)]:
+        data_clean_room = dcr.SnowflakeDcr()
+        data_clean_room.prepare_dcr_deployment(False, "DCR 5.5 General Availability", "PROVIDER1",
+                                               connections["PROVIDER1"], "CONSUMER1", connections["CONSUMER1"], "",
+                                               run_repo_path, "Media & Advertising")
+        statement_counts = [len(conn.queries) for conn in connections.values()]
+        start_time = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            data_clean_room.execute(redeploy=True)
+        elapsed_seconds = time.perf_counter() - start_time
+        script_statement_count = sum(len(indexes) for indexes in data_clean_room.redeploy_plan.values())
+        statement_count = sum(len(conn.queries) for conn in connections.values()) - sum(statement_counts)
+        print(format(run_name, "<26") + str(script_statement_count) + " script statements (" +
+              str(statement_count) + " with fingerprint upkeep) in " + format(elapsed_seconds, ".2f") + "s")
+    shutil.rmtree(template_repo_path)
+    shutil.rmtree(policy_repo_path)
+
+
+# Returns the consumer-side insert that clones the latest request into a backlog of fresh requests
+def build_request_backlog_sql(provider_account, abbreviation, request_count):
+    requests_table = "dcr_" + abbreviation + "_consumer." + provider_account + "_schema.requests"
+    return ("insert into " + requests_table + " (request_id, request, signature) "
+            "select ids.request_id, "
+            "object_insert(object_insert(seed.request, 'REQUEST_ID', ids.request_id, true), "
+            "'REQUEST_TS', sysdate()::string, true), '' "
+            "from (select replace(uuid_string(), '-', '_') as request_id "
+            "from table(generator(rowcount => " + str(int(request_count)) + "))) ids, "
+            "(select request from " + requests_table + " order by request:REQUEST_TS::timestamp desc limit 1) seed")
+
+
+# Measures requests/minute for a request processor on a synthetic backlog in a deployed clean room.
+# Requires a consumer that has sent at least one request, and the consumer's processing tasks suspended.
+def benchmark_request_processor(provider_conn, consumer_conn, provider_account, consumer_account, abbreviation="samp",
+                                request_count=100, request_processor="Batch", timeout=600):
+    provider_account = provider_account.split(".")[0].upper()
+    consumer_account = consumer_account.split(".")[0].upper()
+    provider_db = "dcr_" + abbreviation + "_provider_db"
+    stream_name = provider_db + ".admin.request_stream_" + consumer_account
+    if request_processor == "Batch":
+        procedure_name = provider_db + ".admin.process_requests_batch"
+    else:
+        procedure_name = provider_db + ".admin.process_requests"
+
+    consumer_cur = consumer_conn.cursor()
+    provider_cur = provider_conn.cursor()
+    try:
+        consumer_cur.execute(build_request_backlog_sql(provider_account, abbreviation, request_count))
+
+        # Wait for the backlog to arrive through the request share
+        deadline = time.monotonic() + timeout
+        while not provider_cur.execute("select system$stream_has_data('" + stream_name + "')").fetchone()[0]:
+            if time.monotonic() > deadline:
+                raise TimeoutError("Backlog did not reach " + stream_name + " within " + str(timeout) + "s")
+            time.sleep(1)
+
+        provider_cur.execute("select sysdate()")
+        start_ts = provider_cur.fetchone()[0]
+        start_time = time.perf_counter()
+        calls = 0
+        while provider_cur.execute("select system$stream_has_data('" + stream_name + "')").fetchone()[0]:
+            provider_cur.execute("call " + procedure_name + "('" + consumer_account + "')")
+            calls += 1
+        elapsed_seconds = time.perf_counter() - start_time
+
+        provider_cur.execute("select count(distinct request_id), count_if(approved) from " + provider_db +
+                             ".admin.request_log where party_account = %s and processed_ts >= %s",
+                             (consumer_account, start_ts))
+        logged_count, approved_count = provider_cur.fetchone()
+    finally:
+        consumer_cur.close()
+        provider_cur.close()
+
+    result = {"request_processor": request_processor,
+              "requests": request_count,
+              "calls": calls,
+              "logged": logged_count,
+              "approved": approved_count,
+              "seconds": round(elapsed_seconds, 3),
+              "requests_per_minute": round(logged_count / elapsed_seconds * 60, 1) if elapsed_seconds else None}
+    print(request_processor + " processor: " + str(logged_count) + " of " + str(request_count) + " requests logged (" +
+          str(approved_count) + " approved) in " + str(calls) + " calls, " + format(elapsed_seconds, ".2f") + "s, " +
+          str(result["requests_per_minute"]) + " requests/minute")
+    return result
+
+
+# Generates scripts for a prepared dcr object the way the Setup Assistant does, without using cached renders
+def generate_bundle(data_clean_room):
+    dcr.script_render_cache.clear()
+    with contextlib.redirect_stdout(io.StringIO()):
+        data_clean_room.execute()
+    buffer = io.BytesIO()
+    data_clean_room.write_zip(buffer, True)
+    return len(buffer.getvalue())
+
+
+# Writes a scaled copy of the core scripts, plus ID resolution scripts with many placeholders, to a temporary repo
+def build_synthetic_repo(repo_path, scale, placeholder_count):
+    synthetic_path = tempfile.mkdtemp(prefix="dcr_benchmark_") + "/"
+    for script in ["provider_init.sql", "consumer_init.sql", "provider_enable_consumer.sql"]:
+        with open(repo_path + script, "r", encoding='utf-8') as fin:
+            script_text = fin.read()
+        with open(synthetic_path + script, "w", encoding='utf-8') as fout:
+            fout.write(script_text * scale)
+
+    os.makedirs(synthetic_path + "provider/app/")
+    placeholder_lines = "".join("create or replace table &db.&schema_" + str(i) + ".t as select '&value_" + str(i) +
+                                "' as v; // placeholder " + str(i) + "\n" for i in range(placeholder_count))
+    for script_number in range(1, 4):
+        with open(synthetic_path + "provider/app/0" + str(script_number) + "_setup.sql", "w", encoding='utf-8') as fout:
+            fout.write(placeholder_lines)
+    return synthetic_path
+
+
+# Returns (name, iterations, operation) for every benchmark case
+def get_benchmark_cases(repo_path, synthetic_path, iterations, consumer_count, placeholder_count):
+    dcr_version = "DCR 5.5 General Availability"
+    consumer_numbers = itertools.count()
+    bulk_consumer_accounts = ["CONSUMER" + str(consumer_number) for consumer_number in range(50)]
+    bulk_templates = [("benchmark_template_" + str(template_number), "select " + str(template_number) + " as x;",
+                       "c.pets|c.zip") for template_number in range(200)]
+
+    def deployment():
+        data_clean_room = dcr.SnowflakeDcr()
+        data_clean_room.prepare_dcr_deployment(True, dcr_version, "PROVIDER1", None, "CONSUMER1", None, "", repo_path,
+                                               "Media & Advertising")
+        return generate_bundle(data_clean_room)
+
+    def consumer_addition():
+        data_clean_room = dcr.SnowflakeDcr()
+        data_clean_room.prepare_consumer_addition(True, dcr_version, "PROVIDER1", None,
+                                                  "CONSUMER" + str(next(consumer_numbers)), None, "", repo_path,
+                                                  "Media & Advertising")
+        return generate_bundle(data_clean_room)
+
+    def provider_addition():
+        data_clean_room = dcr.SnowflakeDcr()
+        data_clean_room.prepare_provider_addition(True, dcr_version, "PROVIDER2", None, "CONSUMER1", None, "", "",
+                                                  repo_path, "Media & Advertising")
+        return generate_bundle(data_clean_room)
+
+    def uninstall():
+        data_clean_room = dcr.SnowflakeDcr()
+        data_clean_room.prepare_uninstall(True, dcr_version, "Provider", "PROVIDER1", None, "CONSUMER1", "", "",
+                                          repo_path)
+        return generate_bundle(data_clean_room)
+
+    def template_deployment():
+        data_clean_room = dcr.SnowflakeDcr()
+        data_clean_room.prepare_template_deployment(True, dcr_version, "PROVIDER1", None, "CONSUMER1",
+                                                    "benchmark_template", "select 1 as x;", "c.pets|c.zip", "",
+                                                    repo_path)
+        return generate_bundle(data_clean_room)
+
+    def template_bulk_deployment():
+        data_clean_room = dcr.SnowflakeDcr()
+        data_clean_room.prepare_template_bulk_deployment(True, dcr_version, "PROVIDER1", None, bulk_consumer_accounts,
+                                                         bulk_templates, "", repo_path)
+        return generate_bundle(data_clean_room)
+
+    def data_onboarding():
+        data_clean_room = dcr.SnowflakeDcr()
+        data_clean_room.prepare_data_onboarding(True, dcr_version, "PROVIDER1", None, "", repo_path, "SRC_DB",
+                                                "SRC_SCHEMA", "SRC_TABLE", "EMAIL")
+        return generate_bundle(data_clean_room)
+
+    def data_onboarding_match():
+        data_clean_room = dcr.SnowflakeDcr()
+        data_clean_room.prepare_data_onboarding(True, dcr_version, "PROVIDER1", None, "", repo_path, "SRC_DB",
+                                                "SRC_SCHEMA", "SRC_TABLE", "EMAIL", ["STATUS", "AGE_BAND"],
+                                                "CONSUMER1")
+        return generate_bundle(data_clean_room)
+
+    def request_log_maintenance():
+        data_clean_room = dcr.SnowflakeDcr()
+        data_clean_room.prepare_request_log_maintenance(True, dcr_version, "PROVIDER1", None, "", repo_path, 30)
+        return generate_bundle(data_clean_room)
+
+    def overlap_sketches():
+        data_clean_room = dcr.SnowflakeDcr()
+        data_clean_room.prepare_overlap_sketches(True, dcr_version, "PROVIDER1", None, "CONSUMER1", "", repo_path)
+        return generate_bundle(data_clean_room)
+
+    def id_resolution():
+        options = {"db": "idr_db"}
+        options.update(("schema_" + str(i), "schema_" + str(i)) for i in range(placeholder_count))
+        options.update(("value_" + str(i), "value_" + str(i)) for i in range(placeholder_count))
+        data_clean_room = dcr.SnowflakeDcr()
+        data_clean_room.prepare_id_res_deployment(True, "ID Resolution Native App", "PROVIDER1", None, "Provider",
+                                                  options, synthetic_path)
+        return generate_bundle(data_clean_room)
+
+    def scaled_deployment(scale_path):
+        def operation():
+            data_clean_room = dcr.SnowflakeDcr()
+            data_clean_room.prepare_dcr_deployment(True, dcr_version, "PROVIDER1", None, "CONSUMER1", None, "",
+                                                   scale_path, "None")
+            return generate_bundle(data_clean_room)
+        return operation
+
+    return [("deployment", iterations, deployment),
+            ("consumer_addition", iterations, consumer_addition),
+            ("provider_addition", iterations, provider_addition),
+            ("uninstall", iterations, uninstall),
+            ("template_deployment", iterations, template_deployment),
+            ("template_bulk_deployment_200x50", iterations, template_bulk_deployment),
+            ("data_onboarding", iterations, data_onboarding),
+            ("data_onboarding_match", iterations, data_onboarding_match),
+            ("request_log_maintenance", iterations, request_log_maintenance),
+            ("overlap_sketches", iterations, overlap_sketches),
+            ("id_resolution_" + str(placeholder_count) + "_placeholders", iterations, id_resolution),
+            ("deployment_10x", iterations, scaled_deployment(synthetic_path + "10x/")),
+            ("deployment_100x", max(1, iterations // 10), scaled_deployment(synthetic_path + "100x/")),
+            ("consumer_fleet_" + str(consumer_count), consumer_count, consumer_addition)]
+
+
+# Times an operation, reporting throughput, latency percentiles and peak traced memory
+def run_benchmark_case(operation, iterations):
+    operation()
+
+    latencies = []
+    output_bytes = 0
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        operation_start_time = time.perf_counter()
+        output_bytes += operation()
+        latencies.append(time.perf_counter() - operation_start_time)
+    elapsed_seconds = time.perf_counter() - start_time
+
+    tracemalloc.start()
+    try:
+        operation()
+        _, peak_memory_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {"iterations": iterations,
+            "ops_per_second": iterations / elapsed_seconds,
+            "bytes_per_second": output_bytes / elapsed_seconds,
+            "p50_ms": latencies[int(0.50 * (iterations - 1))] * 1000,
+            "p95_ms": latencies[int(0.95 * (iterations - 1))] * 1000,
+            "p99_ms": latencies[int(0.99 * (iterations - 1))] * 1000,
+            "mean_ms": statistics.mean(latencies) * 1000,
+            "peak_memory_bytes": peak_memory_bytes}
+
+
+# Runs every benchmark case and returns the results in a comparable format
+def run_benchmark_suite(repo_path, iterations=20, consumer_count=2000, placeholder_count=500, case_filter=None):
+    synthetic_path = build_synthetic_repo(repo_path, 1, placeholder_count)
+    for scale in [10, 100]:
+        scale_path = build_synthetic_repo(repo_path, scale, 0)
+        shutil.move(scale_path, synthetic_path + str(scale) + "x/")
+
+    results = {"python": platform.python_version(), "platform": platform.platform(),
+               "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "cases": {}}
+    try:
+        print(format("Case", "<36") + format("ops/s", ">10") + format("p50 ms", ">10") + format("p95 ms", ">10") +
+              format("p99 ms", ">10") + format("peak KiB", ">11"))
+        for name, case_iterations, operation in get_benchmark_cases(repo_path, synthetic_path, iterations,
+                                                                    consumer_count, placeholder_count):
+            if case_filter is not None and case_filter not in name:
+                continue
+            case_result = run_benchmark_case(operation, case_iterations)
+            results["cases"][name] = case_result
+            print(format(name, "<36") + format(case_result["ops_per_second"], "10.1f") +
+                  format(case_result["p50_ms"], "10.2f") + format(case_result["p95_ms"], "10.2f") +
+                  format(case_result["p99_ms"], "10.2f") + format(case_result["peak_memory_bytes"] / 1024, "11.0f"))
+    finally:
+        shutil.rmtree(synthetic_path, ignore_errors=True)
+    return results
+
+
+# Compares results against a baseline, returning a list of regressions beyond the tolerance
+def compare_benchmark_results(results, baseline, tolerance=0.2):
+    regressions = []
+    for name, case_result in results["cases"].items():
+        baseline_result = baseline["cases"].get(name)
+        if baseline_result is None:
+            continue
+        if case_result["p50_ms"] > baseline_result["p50_ms"] * (1 + tolerance):
+            regressions.append(name + ": p50 " + format(baseline_result["p50_ms"], ".2f") + " ms -> " +
+                               format(case_result["p50_ms"], ".2f") + " ms")
+        if case_result["peak_memory_bytes"] > baseline_result["peak_memory_bytes"] * (1 + tolerance):
+            regressions.append(name + ": peak memory " + str(baseline_result["peak_memory_bytes"]) + " -> " +
+                               str(case_result["peak_memory_bytes"]) + " bytes")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmarks for script generation and bundling")
+    parser.add_argument("--iterations", type=int, default=20, help="Iterations per case")
+    parser.add_argument("--consumers", type=int, default=2000, help="Consumers in the fleet case")
+    parser.add_argument("--placeholders", type=int, default=500, help="Placeholder pairs in the ID resolution case")
+    parser.add_argument("--case", default=None, help="Only run cases whose name contains this text")
+    parser.add_argument("--output", default=None, help="Write results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="Compare results with this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before a case regresses")
+    parser.add_argument("--micro", action="store_true", help="Also run the substitution and execution micro-benchmarks")
+    parser.add_argument("--templates", action="store_true",
+                        help="Instead of the suite, measure get_sql_jinja renders/sec (requires jinja2, six, "
+                             "markupsafe and pandas)")
+    parser.add_argument("--request-client", action="store_true",
+                        help="Instead of the suite, measure consumer request latency with the async request client "
+                             "against a fake connection")
+    parser.add_argument("--request-backlog", type=int, default=None,
+                        help="Instead of the suite, measure request processing on a backlog of this many requests in "
+                             "a deployed clean room")
+    parser.add_argument("--request-processor", default="Batch", choices=["Single", "Batch"],
+                        help="Request processor to measure")
+    parser.add_argument("--provider-connection", default=None,
+                        help="JSON file with Snowflake connection parameters for the provider")
+    parser.add_argument("--consumer-connection", default=None,
+                        help="JSON file with Snowflake connection parameters for the consumer")
+    parser.add_argument("--abbreviation", default="samp", help="Database abbreviation of the clean room")
+    args = parser.parse_args()
+
+    if args.request_backlog is not None:
+        import snowflake.connector
+
+        with open(args.provider_connection, "r", encoding='utf-8') as fin:
+            provider_params = json.load(fin)
+        with open(args.consumer_connection, "r", encoding='utf-8') as fin:
+            consumer_params = json.load(fin)
+        with snowflake.connector.connect(**provider_params) as provider_connection, \
+                snowflake.connector.connect(**consumer_params) as consumer_connection:
+            benchmark_request_processor(provider_connection, consumer_connection, provider_params["account"],
+                                        consumer_params["account"], args.abbreviation, args.request_backlog,
+                                        args.request_processor)
+        sys.exit(0)
+
+    repo_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data-clean-room") + "/"
+    if args.templates:
+        benchmark_template_rendering(repo_path)
+        sys.exit(0)
+
+    if args.request_client:
+        benchmark_request_client()
+        sys.exit(0)
+
+    if args.micro:
+        benchmark_substitution(repo_path)
+        benchmark_execution(repo_path)
+        benchmark_resume(repo_path)
+        benchmark_redeploy(repo_path)
+
+    suite_results = run_benchmark_suite(repo_path, args.iterations, args.consumers, args.placeholders, args.case)
+    if args.output is not None:
+        with open(args.output, "w", encoding='utf-8') as fout:
+            json.dump(suite_results, fout, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline, "r", encoding='utf-8') as fin:
+            found_regressions = compare_benchmark_results(suite_results, json.load(fin), args.tolerance)
+        for regression in found_regressions:
+            print("REGRESSION " + regression)
+        if found_regressions:
+            sys.exit(1)
@@ -2,7 +2,6 @@ import io
 import streamlit as st
 import snowflake_dcr as dcr
 import os
-from zipfile import ZipFile
 
 # Page settings
 st.set_page_config(
@@ -31,6 +30,9 @@ st.markdown("This sample code is provided for reference purposes only. Please no
 st.markdown("Snowflake will not offer any support for use of the sample code.")
 
 dcr_data_options = ['Media & Advertising', 'None']
+dcr_request_processor_options = ['Single', 'Batch']
+dcr_request_scheduler_options = ['Per Consumer', 'Consolidated']
+dcr_scale_factor_options = list(dcr.DEMO_SCALE_FACTORS)
 
 # Create dcr object
 data_clean_room = dcr.SnowflakeDcr()
@@ -50,33 +52,17 @@ def get_version_info(repo_path):
         return version_list
 
 
-# Used to load the zip file buffer in-memory
-def load_zip_buffer(snowflake_dcr, buffer, do_include_comments):
-    # Add script number to help sort and show the correct order
-    script_number = 1
-    if do_include_comments:
-        with ZipFile(buffer, "w") as archive:
-            for script in snowflake_dcr.prepared_script_dict.keys():
-                # Remove path
-                script_name = script.lstrip("/")
-
-                # Add number
-                script_name = str(script_number) + " - " + script_name
-                script_number += 1
-
-                archive.writestr(script_name, snowflake_dcr.prepared_script_dict[script])
-    else:
-        with ZipFile(buffer, "w") as archive:
-            for script in snowflake_dcr.cleaned_script_dict.keys():
-                # Remove path
-                script_name = script.lstrip("/")
+# Renders the requested script variant straight into a compressed zip, reusing it across reruns and sessions
+@st.experimental_memo(max_entries=64, ttl=3600, show_spinner=False)
+def render_zip(plan_hash, do_include_comments, _snowflake_dcr):
+    buffer = io.BytesIO()
+    _snowflake_dcr.write_zip(buffer, do_include_comments)
+    return buffer.getvalue()
 
-                # Add number
-                script_name = str(script_number) + " - " + script_name
-                script_number += 1
 
-                # write to archive
-                archive.writestr(script_name, snowflake_dcr.cleaned_script_dict[script])
+# Used to load the zip file buffer in-memory
+def load_zip_buffer(snowflake_dcr, buffer, do_include_comments):
+    buffer.write(render_zip(snowflake_dcr.get_plan_hash(), do_include_comments, snowflake_dcr))
 
 
 path = os.getcwd() + "/data-clean-room/"
@@ -101,6 +87,25 @@ if action == "Initial Deployment 🐻‍❄":
                                          help="This should be just the account locator.  Anything beyond a '.' will be "
                                               "removed automatically.")
         dcr_data_selection = st.selectbox("Would you like to load demo data?", dcr_data_options)
+        dcr_scale_factor = st.selectbox(label="How many rows of demo data?", options=dcr_scale_factor_options,
+                                        help="Demo tables larger than 1M rows are clustered on email.")
+        dcr_request_processor = st.selectbox(label="How should the Provider process requests?",
+                                             options=dcr_request_processor_options,
+                                             help="Single validates one request per task run. Batch validates every "
+                                                  "pending request per task run.")
+        dcr_request_scheduler = st.selectbox(label="How should the Provider schedule request processing?",
+                                             options=dcr_request_scheduler_options,
+                                             help="Per Consumer creates tasks for each consumer. Consolidated registers "
+                                                  "consumers with a single scheduler task that processes requests in "
+                                                  "bulk.")
+        scheduler_latency_seconds = st.number_input(label="Consolidated scheduler latency target (seconds)",
+                                                    min_value=10, max_value=3600, value=60, step=10,
+                                                    help="Targets below 60 seconds keep app_wh running for the "
+                                                         "whole minute of each scheduler run, waiting between "
+                                                         "dispatch passes.")
+        result_cache = st.checkbox(label="Let consumers reuse cached request results", value=False,
+                                   help="Adds a task on app_wh that refreshes the provider data version every 5 "
+                                        "minutes, so cached results can lag a data change by up to 5 minutes.")
         include_comments = st.checkbox("Include comments in scripts", True)
 
         submitted = st.form_submit_button("Run")
@@ -111,14 +116,18 @@ if action == "Initial Deployment 🐻‍❄":
             else:
                 with st.spinner("Generating Clean Room Scripts..."):
                     data_clean_room.prepare_dcr_deployment(True, dcr_version, provider_account, None, consumer_account,
-                                                           None, abbreviation, path, dcr_data_selection)
-                    data_clean_room.execute()
+                                                           None, abbreviation, path, dcr_data_selection,
+                                                           request_processor=dcr_request_processor,
+                                                           request_scheduler=dcr_request_scheduler,
+                                                           scheduler_latency_seconds=scheduler_latency_seconds,
+                                                           scale_factor=dcr_scale_factor,
+                                                           result_cache=result_cache)
+
+                    # Populate zip buffer for download buttons
+                    load_zip_buffer(data_clean_room, zip_buffer, include_comments)
 
                 # Message dependent on debug or not
                 st.success("Scripts Ready for Download!")
-
-                # Populate zip buffer for download buttons
-                load_zip_buffer(data_clean_room, zip_buffer, include_comments)
                 st.snow()
 
 elif action == "Add Add'l Consumer 🐧️":
@@ -134,6 +143,22 @@ elif action == "Add Add'l Consumer 🐧️":
                                          help="This should be just the account locator.  Anything beyond a '.' will be "
                                               "removed automatically.")
         dcr_data_selection = st.selectbox("Would you like to load demo data?", dcr_data_options)
+        dcr_scale_factor = st.selectbox(label="How many rows of demo data?", options=dcr_scale_factor_options,
+                                        help="Demo tables larger than 1M rows are clustered on email.")
+        dcr_request_processor = st.selectbox(label="How should the Provider process requests?",
+                                             options=dcr_request_processor_options,
+                                             help="Single validates one request per task run. Batch validates every "
+                                                  "pending request per task run.")
+        dcr_request_scheduler = st.selectbox(label="How should the Provider schedule request processing?",
+                                             options=dcr_request_scheduler_options,
+                                             help="Per Consumer creates tasks for each consumer. Consolidated registers "
+                                                  "consumers with a single scheduler task that processes requests in "
+                                                  "bulk.")
+        scheduler_latency_seconds = st.number_input(label="Consolidated scheduler latency target (seconds)",
+                                                    min_value=10, max_value=3600, value=60, step=10,
+                                                    help="Targets below 60 seconds keep app_wh running for the "
+                                                         "whole minute of each scheduler run, waiting between "
+                                                         "dispatch passes.")
         include_comments = st.checkbox("Include comments in scripts", True)
 
         submitted = st.form_submit_button("Run")
@@ -147,13 +172,16 @@ elif action == "Add Add'l Consumer 🐧️":
                 with st.spinner("Generating Clean Room Scripts..."):
                     data_clean_room.prepare_consumer_addition(True, dcr_version, provider_account,
                                                               None, consumer_account, None,
-                                                              abbreviation, path, dcr_data_selection)
-                    data_clean_room.execute()
+                                                              abbreviation, path, dcr_data_selection,
+                                                              request_processor=dcr_request_processor,
+                                                              request_scheduler=dcr_request_scheduler,
+                                                              scheduler_latency_seconds=scheduler_latency_seconds,
+                                                              scale_factor=dcr_scale_factor)
 
-                st.success("Scripts Ready for Download!")
+                    # Populate zip buffer for download buttons
+                    load_zip_buffer(data_clean_room, zip_buffer, include_comments)
 
-                # Populate zip buffer for download buttons
-                load_zip_buffer(data_clean_room, zip_buffer, include_comments)
+                st.success("Scripts Ready for Download!")
                 st.snow()
 
 elif action == "Add Add'l Provider ☃️":
@@ -171,6 +199,25 @@ elif action == "Add Add'l Provider ☃️":
         app_suffix = st.text_input("What suffix would you like for the Consumer-side app name? (Leave blank for "
                                    "default)")
         dcr_data_selection = st.selectbox("Would you like to load demo data?", dcr_data_options)
+        dcr_scale_factor = st.selectbox(label="How many rows of demo data?", options=dcr_scale_factor_options,
+                                        help="Demo tables larger than 1M rows are clustered on email.")
+        dcr_request_processor = st.selectbox(label="How should the Provider process requests?",
+                                             options=dcr_request_processor_options,
+                                             help="Single validates one request per task run. Batch validates every "
+                                                  "pending request per task run.")
+        dcr_request_scheduler = st.selectbox(label="How should the Provider schedule request processing?",
+                                             options=dcr_request_scheduler_options,
+                                             help="Per Consumer creates tasks for each consumer. Consolidated registers "
+                                                  "consumers with a single scheduler task that processes requests in "
+                                                  "bulk.")
+        scheduler_latency_seconds = st.number_input(label="Consolidated scheduler latency target (seconds)",
+                                                    min_value=10, max_value=3600, value=60, step=10,
+                                                    help="Targets below 60 seconds keep app_wh running for the "
+                                                         "whole minute of each scheduler run, waiting between "
+                                                         "dispatch passes.")
+        result_cache = st.checkbox(label="Let consumers reuse cached request results", value=False,
+                                   help="Adds a task on app_wh that refreshes the provider data version every 5 "
+                                        "minutes, so cached results can lag a data change by up to 5 minutes.")
         include_comments = st.checkbox("Include comments in scripts", True)
 
         submitted = st.form_submit_button("Run")
@@ -184,13 +231,17 @@ elif action == "Add Add'l Provider ☃️":
                 with st.spinner("Generating Clean Room Scripts..."):
                     data_clean_room.prepare_provider_addition(True, dcr_version, provider_account,
                                                               None, consumer_account, None,
-                                                              abbreviation, app_suffix, path, dcr_data_selection)
-                    data_clean_room.execute()
+                                                              abbreviation, app_suffix, path, dcr_data_selection,
+                                                              request_processor=dcr_request_processor,
+                                                              request_scheduler=dcr_request_scheduler,
+                                                              scheduler_latency_seconds=scheduler_latency_seconds,
+                                                              scale_factor=dcr_scale_factor,
+                                                              result_cache=result_cache)
 
-                st.success("Scripts Ready for Download!")
+                    # Populate zip buffer for download buttons
+                    load_zip_buffer(data_clean_room, zip_buffer, include_comments)
 
-                # Populate zip buffer for download buttons
-                load_zip_buffer(data_clean_room, zip_buffer, include_comments)
+                st.success("Scripts Ready for Download!")
                 st.snow()
 
 elif action == "Uninstall 💧":
@@ -226,12 +277,11 @@ elif action == "Uninstall 💧":
                 with st.spinner("Generating Clean Room Scripts..."):
                     data_clean_room.prepare_uninstall(True, dcr_version, account_type, account, None,
                                                       consumer_account, abbreviation, app_suffix, path)
-                    data_clean_room.execute()
 
-                st.success("Scripts Ready for Download!")
+                    # Populate zip buffer for download buttons
+                    load_zip_buffer(data_clean_room, zip_buffer, include_comments)
 
-                # Populate zip buffer for download buttons
-                load_zip_buffer(data_clean_room, zip_buffer, include_comments)
+                st.success("Scripts Ready for Download!")
                 st.snow()
 
 st.write("Once successfully run, please download your scripts!")
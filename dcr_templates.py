@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import sys
+import time
+import snowflake_dcr as dcr
+
+
+# Reads a JSON list of parameter sets, or a single parameter set
+def read_parameter_sets(parameters_file):
+    with open(parameters_file, "r", encoding='utf-8') as fin:
+        parameter_sets = json.load(fin)
+    if isinstance(parameter_sets, dict):
+        parameter_sets = [parameter_sets]
+    return parameter_sets
+
+
+# Validates every template inserted by the template scripts and writes a report with the sha2 of each render
+def run_validation(template_files, repo_path, parameter_sets=None, jobs=None, output_file=None):
+    templates = []
+    for template_file in template_files:
+        templates.extend(dcr.read_templates(dcr.script_source_cache.read(template_file)))
+
+    start_time = time.perf_counter()
+    results = dcr.validate_template_library(repo_path, templates, parameter_sets, jobs)
+    elapsed_seconds = time.perf_counter() - start_time
+
+    error_count = sum(1 for result in results if result["error"] is not None)
+    summary = {"templates": len(templates),
+               "renders": len(results),
+               "errors": error_count,
+               "seconds": round(elapsed_seconds, 3)}
+
+    if output_file is not None:
+        with open(output_file, "w", encoding='utf-8') as fout:
+            json.dump({"summary": summary, "results": results}, fout, indent=2)
+
+    for result in results:
+        if result["error"] is not None:
+            print(result["template_name"] + " (parameter set " + str(result["parameter_set"]) + "): " +
+                  result["error"])
+        elif result["missing_parameters"]:
+            print(result["template_name"] + " (parameter set " + str(result["parameter_set"]) +
+                  ") rendered without: " + ", ".join(result["missing_parameters"]))
+    print("Validated " + str(len(templates)) + " templates with " + str(len(results)) + " renders in " +
+          format(elapsed_seconds, ".2f") + "s, " + str(error_count) + " errors")
+    return summary
+
+
+# Writes one zip with a single merge that deploys every template in the template scripts to every consumer
+def write_bulk_bundle(template_files, repo_path, provider_account, consumer_accounts, bundle_file, abbreviation=""):
+    templates = []
+    for template_file in template_files:
+        templates.extend(dcr.read_templates(dcr.script_source_cache.read(template_file)))
+
+    data_clean_room = dcr.SnowflakeDcr()
+    data_clean_room.prepare_template_bulk_deployment(True, "DCR 5.5 General Availability", provider_account, None,
+                                                     consumer_accounts, templates, abbreviation, repo_path)
+    data_clean_room.write_zip(bundle_file)
+    print("Wrote " + bundle_file + " deploying " + str(len(templates)) + " templates to " +
+          str(len(consumer_accounts)) + " consumers")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Renders and validates clean room templates before they are deployed")
+    parser.add_argument("template_files", nargs="+", help="SQL scripts that insert templates into dcr_templates")
+    parser.add_argument("--parameters", default=None,
+                        help="JSON file with a list of request parameter sets (default: sample parameters)")
+    parser.add_argument("--jobs", type=int, default=None, help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--output", default=None, help="JSON file for the rendered SQL and sha2 of every render")
+    parser.add_argument("--bundle", default=None,
+                        help="If every template is valid, also write a zip that deploys them with a single merge")
+    parser.add_argument("--provider-account", default=None, help="Provider account for the bundle")
+    parser.add_argument("--consumers", default="", help="Comma-separated consumer accounts for the bundle")
+    parser.add_argument("--abbreviation", default="", help="Database abbreviation of the clean room for the bundle")
+    parser.add_argument("--path", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                       "data-clean-room") + "/",
+                        help="Path to the data-clean-room scripts")
+    args = parser.parse_args()
+
+    parameter_sets = read_parameter_sets(args.parameters) if args.parameters else None
+    if run_validation(args.template_files, args.path, parameter_sets, args.jobs, args.output)["errors"]:
+        sys.exit(1)
+    if args.bundle is not None:
+        write_bulk_bundle(args.template_files, args.path, args.provider_account,
+                          [account.strip() for account in args.consumers.split(",") if account.strip()], args.bundle,
+                          args.abbreviation)
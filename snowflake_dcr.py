@@ -1,7 +1,1171 @@
 import re
+import asyncio
+import datetime
 import io
 import glob
+import hashlib
+import itertools
+import json
+import math
 import os
+import random
+import threading
+import time
+import types
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from zipfile import ZipFile, ZIP_DEFLATED
+
+try:
+    from snowflake.connector.errors import OperationalError as SnowflakeOperationalError
+    from snowflake.connector.errors import ProgrammingError as SnowflakeProgrammingError
+except ImportError:
+    SnowflakeOperationalError = ConnectionError
+    SnowflakeProgrammingError = LookupError
+
+
+# Remove SnowSQL lines to enable easier running in worksheets
+SNOWSQL_CODE_REGEX = re.compile(r"^(?<!:)!.*", re.MULTILINE)
+
+# Remove commented SQL from the downloadable scripts without comments
+COMMENT_CODE_REGEX_SLASH = re.compile(r"(?<!:)//.*")
+COMMENT_CODE_REGEX_DASH = re.compile(r"(?<!:)--.*")
+
+# Tokens that change lexer state outside of strings, $$ bodies and comments
+SQL_NORMAL_TOKEN_REGEX = re.compile(r"'|\"|\$\$|//|--|/\*|;")
+SQL_SINGLE_QUOTE_END_REGEX = re.compile(r"(?:[^'\\]|\\.|'')*'(?!')", re.DOTALL)
+SQL_DOUBLE_QUOTE_END_REGEX = re.compile(r'(?:[^"]|"")*"(?!")')
+
+# Statements that change session state are run synchronously so later statements see their effect
+SESSION_STATEMENT_REGEX = re.compile(r"^\s*(?:use|set|unset|alter\s+session)\b", re.IGNORECASE)
+
+# Metadata statements whose results later statements may read with last_query_id(), rerun when resuming
+METADATA_STATEMENT_REGEX = re.compile(r"^\s*(?:show|desc|describe|list|ls)\b", re.IGNORECASE)
+
+# Temporary objects only exist in the session that created them, so they are created and filled again when resuming
+TEMPORARY_OBJECT_REGEX = re.compile(r"^\s*create\s+(?:or\s+replace\s+)?(?:(?:local|global)\s+)?temp(?:orary)?\s+\w+\s+"
+                                    r"(?:if\s+not\s+exists\s+)?([^\s(;]+)", re.IGNORECASE)
+
+# The object created by a DDL statement, the table changed by a DML statement, and the database or schema a use
+# statement switches to, for diff-based redeploys
+DDL_OBJECT_REGEX = re.compile(r"^\s*create\s+(?:or\s+replace\s+)?(?:(?:secure|temporary|temp|transient|local|"
+                              r"global|volatile|recursive|materialized|external|dynamic)\s+)*(database|schema|table|"
+                              r"view|stream|task|procedure|function|share|role|warehouse|row\s+access\s+policy|"
+                              r"masking\s+policy|tag|stage|file\s+format|sequence|pipe)\s+(if\s+not\s+exists\s+)?"
+                              r"([^\s(;]+)", re.IGNORECASE)
+DML_TARGET_REGEX = re.compile(r"^\s*(?:insert\s+(?:overwrite\s+)?into|delete\s+from|update|merge\s+into)\s+"
+                              r"([^\s(;]+)", re.IGNORECASE)
+USE_CONTEXT_REGEX = re.compile(r"^\s*use\s+(database|schema)\s+([^\s;]+)", re.IGNORECASE)
+
+# Attaching a row access policy fails if the object already has one, so it is only repeated after the object is
+# recreated
+POLICY_ATTACHMENT_REGEX = re.compile(r"^\s*alter\s+(?:materialized\s+)?(?:view|table)\s+([^\s;]+)\s+add\s+row\s+"
+                                     r"access\s+policy\b", re.IGNORECASE)
+
+# Table in each target account holding the fingerprints of the last redeploy, rendered like the scripts
+FINGERPRINT_TABLE = "dcr_samp_deployment_db.admin.object_fingerprints"
+
+# Errors worth retrying, such as dropped connections or an unavailable service
+TRANSIENT_ERRORS = (ConnectionError, TimeoutError, SnowflakeOperationalError)
+
+# Demo data row counts by scale factor, and the seed that makes the generated data repeatable
+DEMO_SCALE_FACTORS = OrderedDict([("1M", 1000000), ("10M", 10000000), ("100M", 100000000), ("1B", 1000000000)])
+DEMO_DATA_SEED = 42
+
+# Dimension columns of onboarding match tables are substituted into the scripts unquoted
+MATCH_COLUMN_REGEX = re.compile(r"^[A-Z_][A-Z0-9_$]*$")
+
+# The Python source of the get_sql_jinja UDF, and the templates inserted into dcr_templates by a script
+GET_SQL_JINJA_SOURCE_REGEX = re.compile(r"get_sql_jinja\(template string, parameters variant\).*?\$\$(.*?)\$\$",
+                                        re.DOTALL)
+TEMPLATE_INSERT_REGEX = re.compile(r"\(\s*(?:'[^']*',\s*)?'([^']*)',\s*\$\$(.*?)\$\$\s*,\s*'?([^',]*)'?", re.DOTALL)
+
+# Parameters a consumer request supplies to templates, used when validating templates without parameter sets
+SAMPLE_TEMPLATE_PARAMETERS = {"where_clause": "c.pets <> 'BIRD'",
+                              "app_data": "dcr_samp_app",
+                              "app_two_data": "dcr_samp_app_two",
+                              "app_three_data": "dcr_samp_app_three",
+                              "consumer_db": "dcr_samp_consumer",
+                              "consumer_schema": "mydata",
+                              "consumer_table": "customers",
+                              "consumer_customer_table": "customers",
+                              "consumer_conversions_table": "conversions",
+                              "consumer_join_field": "email",
+                              "consumer_email_field": "email",
+                              "consumer_phone_field": "phone",
+                              "consumer_internal_join_field": "email",
+                              "at_timestamp": "2022-11-08 12:00:00.000"}
+
+
+def compile_substitutions(check_words, replace_words):
+    """
+    Compiles paired check/replace words into a function that substitutes all of them in a single pass
+    Longer check words win over shorter ones they start with (e.g. SNOWCAT2 over SNOWCAT), and the first
+    replacement listed for a repeated check word is the one used
+    """
+    replacements = {}
+    for check, replace in zip(check_words or [], replace_words or []):
+        # Identity pairs are skipped so they cannot shadow overlapping check words
+        if check and check != replace and check not in replacements:
+            replacements[check] = replace
+
+    if not replacements:
+        return lambda text: text
+
+    pattern = re.compile("|".join(re.escape(check) for check in sorted(replacements, key=len, reverse=True)))
+    lookup = replacements.__getitem__
+
+    def substitute(text):
+        return pattern.sub(lambda match: lookup(match.group()), text)
+
+    return substitute
+
+
+class ScriptSourceCache:
+    """
+    An LRU cache of decoded SQL script sources, keyed by absolute path, modification time and size
+    Entries are evicted least recently used first once the cached sources exceed max_bytes
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def read(self, path):
+        """
+        Returns the text of a script, reading it from disk only if it is not cached or has changed
+        """
+        return self._load(path)[1]
+
+    def digest(self, path):
+        """
+        Returns the sha256 hex digest of a script's text
+        """
+        return self._load(path)[2]
+
+    def _load(self, path):
+        full_path = os.path.abspath(path)
+        stat = os.stat(full_path)
+        key = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(full_path)
+            if entry is not None and entry[0] == key:
+                self._entries.move_to_end(full_path)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        with open(full_path, "r", encoding='utf-8') as fin:
+            script_text = fin.read()
+        entry = (key, script_text, hashlib.sha256(script_text.encode('utf-8')).hexdigest())
+
+        with self._lock:
+            old_entry = self._entries.pop(full_path, None)
+            if old_entry is not None:
+                self.current_bytes -= old_entry[0][1]
+
+            # Scripts larger than the whole budget are never cached
+            if stat.st_size <= self.max_bytes:
+                self._entries[full_path] = entry
+                self.current_bytes += stat.st_size
+                while self.current_bytes > self.max_bytes:
+                    _, evicted_entry = self._entries.popitem(last=False)
+                    self.current_bytes -= evicted_entry[0][1]
+
+        return entry
+
+    def stats(self):
+        """
+        Returns hit/miss counters and current usage of the cache
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries),
+                    "bytes": self.current_bytes, "max_bytes": self.max_bytes}
+
+    def clear(self):
+        """
+        Empties the cache and resets its counters
+        """
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+# Shared across SnowflakeDcr instances so repeated generations skip disk reads
+script_source_cache = ScriptSourceCache()
+
+
+class ScriptRenderCache:
+    """
+    An LRU cache of rendered script dictionaries, keyed by the hash of a SnowflakeDcr plan
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, plan_hash):
+        """
+        Returns copies of the cached (prepared_script_dict, cleaned_script_dict), or None if not cached
+        """
+        with self._lock:
+            entry = self._entries.get(plan_hash)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(plan_hash)
+            self.hits += 1
+            return dict(entry[0]), dict(entry[1])
+
+    def put(self, plan_hash, prepared_script_dict, cleaned_script_dict):
+        """
+        Stores copies of rendered script dictionaries for a plan
+        """
+        with self._lock:
+            self._entries[plan_hash] = (dict(prepared_script_dict), dict(cleaned_script_dict))
+            self._entries.move_to_end(plan_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """
+        Returns hit/miss counters and current usage of the cache
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries),
+                    "max_entries": self.max_entries}
+
+    def clear(self):
+        """
+        Empties the cache and resets its counters
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Shared across SnowflakeDcr instances so identical plans are only rendered once
+script_render_cache = ScriptRenderCache()
+
+
+def prepare_script_text(script_text, substitute):
+    """
+    Applies replacements to a whole script and removes SnowSQL-only lines, keeping comments
+    """
+    return SNOWSQL_CODE_REGEX.sub('', substitute(script_text))
+
+
+class SqlStatementLexer:
+    """
+    An incremental SQL lexer that splits scripts into statements
+    Understands quoted strings and identifiers, $$ bodies, //, -- and /* */ comments, and SnowSQL ! directives.
+    Text is fed in chunks of any size and complete statements are yielded as soon as their semicolon is seen.
+    """
+
+    _NORMAL = 0
+    _SINGLE_QUOTE = 1
+    _DOUBLE_QUOTE = 2
+    _DOLLAR_BODY = 3
+    _BLOCK_COMMENT = 4
+
+    def __init__(self, remove_comments=True):
+        self.remove_comments = remove_comments
+        self._state = self._NORMAL
+        self._pending = ""
+        self._parts = []
+        self._has_code = False
+
+    def feed(self, chunk):
+        """
+        Lexes a chunk of text, yielding each statement it completes
+        """
+        self._pending += chunk
+        line_start = 0
+        line_end = self._pending.find("\n")
+        while line_end != -1:
+            yield from self._lex_line(self._pending[line_start:line_end + 1])
+            line_start = line_end + 1
+            line_end = self._pending.find("\n", line_start)
+        self._pending = self._pending[line_start:]
+
+    def close(self):
+        """
+        Lexes any remaining text, yielding the final statement even if it has no terminating semicolon
+        """
+        if self._pending:
+            yield from self._lex_line(self._pending)
+            self._pending = ""
+        yield from self._end_statement()
+        self._state = self._NORMAL
+
+    def _end_statement(self):
+        statement = "".join(self._parts).strip()
+        self._parts.clear()
+        self._has_code = False
+        if statement:
+            yield statement
+
+    def _append_code(self, text):
+        self._parts.append(text)
+        if not self._has_code and text.strip():
+            self._has_code = True
+
+    def _lex_line(self, line):
+        parts = self._parts
+        pos = 0
+        line_length = len(line)
+
+        # SnowSQL directives take up a whole line between statements and cannot be run through a connection
+        if self._state == self._NORMAL and not self._has_code and line.lstrip(" \t").startswith("!"):
+            return
+
+        while pos < line_length:
+            if self._state == self._NORMAL:
+                match = SQL_NORMAL_TOKEN_REGEX.search(line, pos)
+                if match is None:
+                    self._append_code(line[pos:])
+                    break
+                self._append_code(line[pos:match.start()])
+                token = match.group()
+                pos = match.end()
+
+                if token == ";":
+                    yield from self._end_statement()
+                elif token == "//" or token == "--":
+                    comment_end = line.find("\n", match.start())
+                    if comment_end == -1:
+                        comment_end = line_length
+                    if not self.remove_comments:
+                        parts.append(line[match.start():comment_end])
+                    pos = comment_end
+                elif token == "/*":
+                    self._state = self._BLOCK_COMMENT
+                    parts.append(" " if self.remove_comments else token)
+                else:
+                    self._append_code(token)
+                    if token == "'":
+                        self._state = self._SINGLE_QUOTE
+                    elif token == '"':
+                        self._state = self._DOUBLE_QUOTE
+                    else:
+                        self._state = self._DOLLAR_BODY
+            elif self._state == self._BLOCK_COMMENT:
+                comment_end = line.find("*/", pos)
+                if comment_end == -1:
+                    if not self.remove_comments:
+                        parts.append(line[pos:])
+                    break
+                if not self.remove_comments:
+                    parts.append(line[pos:comment_end + 2])
+                pos = comment_end + 2
+                self._state = self._NORMAL
+            elif self._state == self._DOLLAR_BODY:
+                body_end = line.find("$$", pos)
+                if body_end == -1:
+                    parts.append(line[pos:])
+                    break
+                parts.append(line[pos:body_end + 2])
+                pos = body_end + 2
+                self._state = self._NORMAL
+            else:
+                if self._state == self._SINGLE_QUOTE:
+                    match = SQL_SINGLE_QUOTE_END_REGEX.match(line, pos)
+                else:
+                    match = SQL_DOUBLE_QUOTE_END_REGEX.match(line, pos)
+                if match is None:
+                    parts.append(line[pos:])
+                    break
+                parts.append(match.group())
+                pos = match.end()
+                self._state = self._NORMAL
+
+
+def iter_sql_statements(script, remove_comments=True):
+    """
+    Lexes a script in a single streaming pass, yielding one statement at a time without its terminating semicolon
+    script can be a string or an iterable of text chunks, such as an open file
+    """
+    lexer = SqlStatementLexer(remove_comments)
+    chunks = io.StringIO(script) if isinstance(script, str) else script
+    for chunk in chunks:
+        yield from lexer.feed(chunk)
+    yield from lexer.close()
+
+
+def clean_script_text(prepared_script_text):
+    """
+    Removes // and -- comments from a prepared script for the downloadable scripts, keeping its layout
+    Statements are run from the prepared script through the statement lexer instead
+    """
+    return COMMENT_CODE_REGEX_DASH.sub('', COMMENT_CODE_REGEX_SLASH.sub('', prepared_script_text))
+
+
+def chain_dependencies(script_list):
+    """
+    Returns a dependency list that runs each script after the one before it
+    """
+    return [[]] + [[previous_script] for previous_script in script_list[:-1]]
+
+
+def add_request_scheduler(script_list, script_conn_list, script_dependency_list, provider_conn):
+    """
+    Adds the consolidated request scheduler setup to a plan, ahead of the scheduled consumer enablement
+    """
+    if "provider_enable_consumer_scheduled.sql" in script_list:
+        position = script_list.index("provider_enable_consumer_scheduled.sql")
+        script_dependency_list[position] = script_dependency_list[position] + ["provider_request_scheduler.sql"]
+    elif "provider_init.sql" in script_list:
+        position = script_list.index("provider_init.sql") + 1
+    else:
+        return
+
+    script_list.insert(position, "provider_request_scheduler.sql")
+    script_conn_list.insert(position, provider_conn)
+    script_dependency_list.insert(position, ["provider_init.sql"] if "provider_init.sql" in script_list else [])
+
+
+def add_result_cache(script_list, script_conn_list, script_dependency_list, provider_conn):
+    """
+    Adds the optional provider data version setup to a plan, which lets consumers reuse cached request results
+    """
+    if "provider_init.sql" not in script_list:
+        return
+
+    position = script_list.index("provider_init.sql") + 1
+    script_list.insert(position, "provider_result_cache.sql")
+    script_conn_list.insert(position, provider_conn)
+    script_dependency_list.insert(position, ["provider_init.sql"])
+
+
+def get_scheduler_substitutions(scheduler_latency_seconds):
+    """
+    Returns the check and replace words that configure the scheduler task for a latency target in seconds
+    The task runs at most once a minute, so shorter targets are met by repeated dispatch passes within each run
+    """
+    scheduler_interval_minutes = max(1, math.ceil(scheduler_latency_seconds / 60))
+    check_words = ["SCHEDULER_INTERVAL_MINUTES", "SCHEDULER_LATENCY_SECONDS", "SCHEDULER_RUN_SECONDS"]
+    replace_words = [str(scheduler_interval_minutes), str(int(scheduler_latency_seconds)),
+                     str(scheduler_interval_minutes * 60)]
+    return check_words, replace_words
+
+
+def get_demo_data_substitutions(scale_factor="1M", seed=DEMO_DATA_SEED):
+    """
+    Returns the check and replace words that size the demo data scripts for a scale factor in DEMO_SCALE_FACTORS
+    Scales above 1M cluster the demo tables on email, the join column of the templates
+    """
+    if scale_factor not in DEMO_SCALE_FACTORS:
+        raise ValueError("Unknown scale factor " + str(scale_factor) + ", expected one of " +
+                         ", ".join(DEMO_SCALE_FACTORS))
+    row_count = DEMO_SCALE_FACTORS[scale_factor]
+    check_words = ["DEMO_ROW_COUNT", "DEMO_SEED", "DEMO_CLUSTER_BY"]
+    replace_words = [str(row_count), str(int(seed)), "cluster by (email)" if row_count > 1000000 else ""]
+    return check_words, replace_words
+
+
+def get_match_table_substitutions(match_dimensions):
+    """
+    Returns the check and replace words that list the dimension columns of an onboarding match table
+    Columns are upper-cased and de-duplicated, and must be plain identifiers
+    """
+    columns = []
+    for column in match_dimensions:
+        column = column.strip().upper()
+        if not MATCH_COLUMN_REGEX.match(column):
+            raise ValueError("Match table dimensions must be column names, got " + repr(column))
+        if column not in columns:
+            columns.append(column)
+    check_words = ["SOURCE_MATCH_COLUMNS", "source_match_columns", "SOURCE_MATCH_DIMENSIONS",
+                   "source_match_dimensions"]
+    match_columns = "".join(", " + column for column in columns)
+    match_dimensions = "|".join("p." + column for column in columns)
+    replace_words = [match_columns, match_columns, match_dimensions, match_dimensions]
+    return check_words, replace_words
+
+
+def get_critical_path(script_list, script_dependency_list, durations):
+    """
+    Returns the longest chain of dependent scripts by duration, and its total duration in seconds
+    script_list must be in an order where every script comes after its dependencies
+    """
+    path_lengths = {}
+    previous_scripts = {}
+    for current_script, dependencies in zip(script_list, script_dependency_list):
+        dependencies = [dependency for dependency in dependencies if dependency in path_lengths]
+        previous_script = max(dependencies, key=path_lengths.get, default=None)
+        path_lengths[current_script] = durations.get(current_script, 0.0) + path_lengths.get(previous_script, 0.0)
+        previous_scripts[current_script] = previous_script
+
+    if not path_lengths:
+        return [], 0.0
+
+    current_script = max(path_lengths, key=path_lengths.get)
+    total_duration = path_lengths[current_script]
+    critical_path = []
+    while current_script is not None:
+        critical_path.insert(0, current_script)
+        current_script = previous_scripts[current_script]
+    return critical_path, total_duration
+
+
+def build_template_merge_values(consumer_accounts, templates):
+    """
+    Returns the consumer account and template VALUES rows for provider_add_templates_bulk.sql
+    Accounts and (template name, template text, dimensions) tuples are deduplicated, keeping the first occurrence
+    """
+    account_rows = []
+    for consumer_account in consumer_accounts:
+        account_row = "('" + consumer_account.split(".")[0].upper().replace("'", "''") + "')"
+        if account_row not in account_rows:
+            account_rows.append(account_row)
+
+    template_dict = OrderedDict()
+    for template_name, template_text, available_dimensions in templates:
+        available_dimensions = (available_dimensions or "").strip().strip("'")
+        if "$$" in template_text:
+            raise ValueError("Template " + template_name + " cannot contain $$")
+        if template_dict.setdefault(template_name, (template_text, available_dimensions)) != (template_text,
+                                                                                             available_dimensions):
+            raise ValueError("Template " + template_name + " is defined more than once with different content")
+
+    template_rows = ["('" + template_name.replace("'", "''") + "', $$" + template_text + "$$, '" +
+                     available_dimensions.replace("'", "''") + "')"
+                     for template_name, (template_text, available_dimensions) in template_dict.items()]
+    if not account_rows or not template_rows:
+        raise ValueError("At least one consumer account and one template are required")
+    return ", ".join(account_rows), ",\n".join(template_rows)
+
+
+# Template renderers loaded from provider_init.sql, keyed by script path and digest, one set per process
+template_renderers = {}
+template_renderers_lock = threading.Lock()
+
+
+def load_template_renderer(path):
+    """
+    Loads the get_sql_jinja UDF code embedded in provider_init.sql as a module, so templates render locally exactly
+    as they will in Snowflake, with the same compiled template cache
+    Requires the jinja2, six, markupsafe and pandas packages that the UDF uses
+    """
+    script_path = os.path.join(path, "provider_init.sql")
+    key = (os.path.abspath(script_path), script_source_cache.digest(script_path))
+    with template_renderers_lock:
+        renderer = template_renderers.get(key)
+        if renderer is None:
+            source_match = GET_SQL_JINJA_SOURCE_REGEX.search(script_source_cache.read(script_path))
+            if source_match is None:
+                raise ValueError("No get_sql_jinja function found in " + script_path)
+            renderer = types.ModuleType("get_sql_jinja")
+            exec(compile(source_match.group(1), script_path, "exec"), renderer.__dict__)
+            template_renderers[key] = renderer
+    return renderer
+
+
+def read_templates(script_text):
+    """
+    Returns (template name, template, dimensions) for every template a script inserts into dcr_templates, either
+    one per insert or as VALUES rows for provider_add_templates_bulk.sql
+    """
+    return TEMPLATE_INSERT_REGEX.findall(script_text)
+
+
+def render_template(path, template, parameters):
+    """
+    Renders a template locally, returning the SQL and the sha2 that the data firewall will expect for it
+    """
+    sql = load_template_renderer(path).apply_sql_template(template, parameters)
+    return sql, hashlib.sha256(sql.encode('utf-8')).hexdigest()
+
+
+def validate_template(path, template_name, template, dimensions, parameter_sets=None):
+    """
+    Renders one template against each parameter set, returning a result per set with the SQL and its sha2, or the
+    error a request would be rejected with, plus any template variables the set does not supply
+    Without parameter sets, the sample parameters are used with the first two available dimensions
+    """
+    available_dimensions = [dimension for dimension in dimensions.lower().split("|") if dimension]
+    if parameter_sets is None:
+        parameter_sets = [dict(SAMPLE_TEMPLATE_PARAMETERS, dimensions=available_dimensions[:2])]
+
+    results = [{"template_name": template_name, "parameter_set": index, "sql": None, "sha2": None, "error": None,
+                "missing_parameters": []} for index in range(len(parameter_sets))]
+    try:
+        # parse without the JinjaSql extension first, whose token filter never ends on an unclosed {{ tag
+        from jinja2 import Environment, meta
+        renderer = load_template_renderer(path)
+        environment = Environment()
+        environment.filters.update(renderer._jinja_sql.env.filters)
+        template_variables = meta.find_undeclared_variables(environment.parse(template))
+        renderer.get_compiled_template(template)
+    except Exception as err:
+        for result in results:
+            result["error"] = type(err).__name__ + ": " + str(err)
+        return results
+
+    for result, parameters in zip(results, parameter_sets):
+        result["missing_parameters"] = sorted(template_variables - set(parameters))
+        invalid_dimensions = [dimension for dimension in parameters.get("dimensions") or []
+                              if dimension.lower() not in available_dimensions]
+        if invalid_dimensions:
+            result["error"] = "Dimensions not available: " + ", ".join(invalid_dimensions)
+            continue
+        try:
+            result["sql"], result["sha2"] = render_template(path, template, parameters)
+        except Exception as err:
+            result["error"] = type(err).__name__ + ": " + str(err)
+    return results
+
+
+def validate_template_library(path, templates, parameter_sets=None, max_workers=None):
+    """
+    Validates (template name, template, dimensions) tuples against the parameter sets across worker processes,
+    returning every result in template order. max_workers=1 validates in this process
+    """
+    template_names, template_texts, template_dimensions = zip(*templates) if templates else ((), (), ())
+    arguments = (itertools.repeat(path), template_names, template_texts, template_dimensions,
+                 itertools.repeat(parameter_sets))
+    if max_workers == 1 or len(templates) < 2:
+        template_results = map(validate_template, *arguments)
+        return [result for results in template_results for result in results]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        chunk_size = max(1, len(templates) // ((max_workers or os.cpu_count() or 1) * 4))
+        template_results = executor.map(validate_template, *arguments, chunksize=chunk_size)
+        return [result for results in template_results for result in results]
+
+
+class StatementRunner:
+    """
+    Runs statements, retrying transient errors with backoff
+    A statement is only resubmitted if no query id was returned for it, since the server may already be running it
+    Results are discarded unless max_rows is set, in which case only the first max_rows rows are fetched
+    At most max_concurrent_queries statements run at once across all connections
+    """
+
+    def __init__(self, max_rows=0, max_concurrent_queries=8, max_retries=3, retry_backoff=1.0):
+        self.max_rows = max_rows
+        self.max_concurrent_queries = max_concurrent_queries
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._query_slots = threading.BoundedSemaphore(max_concurrent_queries)
+
+    def run(self, conn, statement):
+        """
+        Runs one statement on a connection, returning its query id, its row count and up to max_rows result rows
+        """
+        with self._query_slots:
+            cur = conn.cursor()
+            try:
+                if SESSION_STATEMENT_REGEX.match(statement) or METADATA_STATEMENT_REGEX.match(statement):
+                    # these change no stored data, so resubmitting them is safe
+                    self._retry(cur.execute, statement)
+                else:
+                    self._submit(cur, statement)
+                rows = cur.fetchmany(self.max_rows) if self.max_rows else []
+                return cur.sfqid, cur.rowcount, rows
+            finally:
+                cur.close()
+
+    def _submit(self, cur, statement):
+        # once a query id was returned the server has the statement, so it is not resubmitted and the error is raised
+        for attempt in range(self.max_retries + 1):
+            try:
+                return cur.execute(statement)
+            except TRANSIENT_ERRORS:
+                if cur.sfqid is not None or attempt == self.max_retries:
+                    raise
+                time.sleep(self.retry_backoff * 2 ** attempt)
+
+    def _retry(self, func, *args):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return func(*args)
+            except TRANSIENT_ERRORS:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.retry_backoff * 2 ** attempt)
+
+
+class ExecutionTrace:
+    """
+    Collects timing events from SnowflakeDcr.render and execute
+    Each event is a dict that is kept in memory, optionally written to a JSON lines file, and passed to each callback
+    """
+
+    def __init__(self, trace_file=None, callbacks=None):
+        self.trace_file = trace_file
+        self.callbacks = callbacks or []
+        self.events = []
+        self._lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        """
+        Records one event
+        """
+        record = dict(event=event, timestamp=time.time(), **fields)
+        with self._lock:
+            self.events.append(record)
+            if self.trace_file is not None:
+                with open(self.trace_file, "a", encoding='utf-8') as fout:
+                    fout.write(json.dumps(record, default=str) + "\n")
+        for callback in self.callbacks:
+            callback(record)
+
+    def slowest_statements(self, top_n=10):
+        """
+        Returns the top_n statement events by wall time
+        """
+        statement_events = [record for record in self.events if record["event"] == "statement"]
+        return sorted(statement_events, key=lambda record: record["seconds"], reverse=True)[:top_n]
+
+    def print_summary(self, top_n=10):
+        """
+        Prints render and execution totals followed by the slowest statements
+        """
+        render_events = [record for record in self.events if record["event"] == "render"]
+        script_events = [record for record in self.events if record["event"] == "script"]
+        print("Rendered " + str(sum(record["bytes"] for record in render_events)) + " bytes in " +
+              format(sum(record["substitution_seconds"] + record["clean_seconds"] for record in render_events), ".3f") +
+              "s (substitution " + format(sum(record["substitution_seconds"] for record in render_events), ".3f") +
+              "s), executed " + str(sum(record["statements"] for record in script_events)) + " statements in " +
+              format(sum(record["seconds"] for record in script_events), ".3f") + "s")
+        print(format("Seconds", ">9") + "  " + format("Rows", ">8") + "  " + format("Script", "<40") + "  Statement")
+        for record in self.slowest_statements(top_n):
+            print(format(record["seconds"], "9.3f") + "  " + format(str(record["rows"]), ">8") + "  " +
+                  format(record["script"], "<40") + "  " + str(record["statement_index"]) + ": " +
+                  " ".join(record["statement"].split())[:80])
+
+
+class DeploymentJournal:
+    """
+    Records the statements completed by SnowflakeDcr.execute in a JSON lines file, so a failed deployment can resume
+    Each entry has the script, statement index, sha256 of the statement text, wall time and query id
+    """
+
+    def __init__(self, journal_file):
+        self.journal_file = journal_file
+        self.completed = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """
+        Starts an empty journal
+        """
+        with self._lock:
+            self.completed = {}
+            with open(self.journal_file, "w", encoding='utf-8'):
+                pass
+
+    def load(self):
+        """
+        Reads the statements completed by earlier runs, returning how many there are
+        """
+        with self._lock:
+            self.completed = {}
+            if os.path.exists(self.journal_file):
+                with open(self.journal_file, "r", encoding='utf-8') as fin:
+                    for line in fin:
+                        if line.strip():
+                            entry = json.loads(line)
+                            self.completed[(entry["script"], entry["statement_index"])] = entry["statement_hash"]
+            return len(self.completed)
+
+    def is_completed(self, script, statement_index, statement):
+        """
+        Returns True if an earlier run completed this statement with the same text at the same position
+        """
+        return self.completed.get((script, statement_index)) == get_statement_hash(statement)
+
+    def record(self, script, statement_index, statement, seconds, query_id):
+        """
+        Appends one completed statement
+        """
+        entry = {"script": script, "statement_index": statement_index, "statement_hash": get_statement_hash(statement),
+                 "seconds": round(seconds, 3), "query_id": query_id, "timestamp": time.time()}
+        with self._lock:
+            self.completed[(script, statement_index)] = entry["statement_hash"]
+            with open(self.journal_file, "a", encoding='utf-8') as fout:
+                fout.write(json.dumps(entry) + "\n")
+
+
+def is_session_statement(statement, temporary_objects):
+    """
+    Returns True for statements a new session has to run again: session and metadata statements, statements creating
+    temporary objects, which are added to temporary_objects, and DML into those objects
+    """
+    temporary_match = TEMPORARY_OBJECT_REGEX.match(statement)
+    if temporary_match:
+        temporary_objects.add(temporary_match.group(1).lower())
+        return True
+    dml_match = DML_TARGET_REGEX.match(statement)
+    return bool(SESSION_STATEMENT_REGEX.match(statement) or METADATA_STATEMENT_REGEX.match(statement) or
+                (dml_match and dml_match.group(1).lower() in temporary_objects))
+
+
+def get_statement_hash(statement):
+    """
+    Returns the sha256 of a statement's text
+    """
+    return hashlib.sha256(statement.encode('utf-8')).hexdigest()
+
+
+def get_statement_fingerprint(statement):
+    """
+    Returns the sha256 of a statement's text with its whitespace normalized
+    """
+    return get_statement_hash(" ".join(statement.split()))
+
+
+def qualify_object_name(object_name, object_type, context):
+    """
+    Returns the parts of an object name, completed with the current database and schema in context
+    """
+    parts = object_name.lower().split(".")
+    if object_type in ["database", "role", "warehouse", "share"] or context["database"] is None:
+        return parts
+    if object_type == "schema":
+        return parts if len(parts) > 1 else [context["database"]] + parts
+    if len(parts) == 1 and context["schema"] is not None:
+        return [context["database"], context["schema"]] + parts
+    return [context["database"]] + parts if len(parts) == 2 else parts
+
+
+def update_name_context(statement, object_type, object_parts, context):
+    """
+    Tracks the current database and schema, which use statements and creating a database or schema change
+    """
+    use_match = USE_CONTEXT_REGEX.match(statement)
+    if use_match:
+        object_type = use_match.group(1).lower()
+        object_parts = qualify_object_name(use_match.group(2), object_type, context)
+    if object_type == "database":
+        context["database"], context["schema"] = object_parts[0], "public"
+    elif object_type == "schema" and len(object_parts) == 2:
+        context["database"], context["schema"] = object_parts
+
+
+def get_object_reference_regex(object_parts, object_type):
+    """
+    Returns a regex matching references to an object by its qualified name, or by its last two name parts
+    Databases and schemas also match by their bare name used as a qualifier, as in schema.table
+    """
+    suffixes = [".".join(object_parts[start:]) for start in range(max(len(object_parts) - 1, 1))]
+    patterns = [re.escape(suffix) + r"(?![\w$])" for suffix in suffixes]
+    if object_type in ["database", "schema"]:
+        patterns.append(re.escape(object_parts[-1]) + r"\.")
+    return re.compile(r"(?<![\w$.])(?:" + "|".join(patterns) + ")", re.IGNORECASE)
+
+
+def plan_redeploy(script_statements, stored_fingerprints):
+    """
+    Chooses the statements a redeploy runs, given (script, statements) pairs for one account and the fingerprints
+    stored by its last redeploy. Returns ({script: set of statement indexes to run}, {key: (fingerprint, script)})
+    Objects are fingerprinted by the text of the statements that create them, and other statements by their own
+    text. A statement runs if its fingerprint is new or changed, or if it refers to an object rebuilt in this run.
+    Only objects whose DDL runs are rebuilt, so DML never recreates its table, and create if not exists rebuilds
+    nothing once deployed. DML following a delete from the same table runs together with the delete, which is how
+    the scripts make their inserts repeatable. A row access policy attachment only runs again when its object is
+    recreated, and a changed attachment recreates its object. References are found by qualified name, as the
+    scripts write them. Session and metadata statements, and the creation and loading of temporary tables, always run
+    """
+    # fingerprint every object and statement
+    statement_infos = []
+    object_texts = OrderedDict()
+    for current_script, statements in script_statements:
+        context = {"database": None, "schema": None}
+        dml_group = None
+        temporary_objects = set()
+        for statement_index, statement in enumerate(statements):
+            ddl_match = DDL_OBJECT_REGEX.match(statement)
+            dml_match = DML_TARGET_REGEX.match(statement)
+            attachment_match = POLICY_ATTACHMENT_REGEX.match(statement)
+            info = {"script": current_script, "index": statement_index, "statement": statement, "object": None,
+                    "group": [], "fingerprint": get_statement_fingerprint(statement), "reference_text": statement,
+                    "attached_to": None, "is_rebuild": False,
+                    "is_session": is_session_statement(statement, temporary_objects)}
+            if ddl_match:
+                object_type = " ".join(ddl_match.group(1).lower().split())
+                info["object"] = (qualify_object_name(ddl_match.group(3), object_type, context), object_type)
+                info["key"] = object_type + " " + ".".join(info["object"][0])
+                info["is_rebuild"] = ddl_match.group(2) is None or info["key"] not in stored_fingerprints
+                object_texts.setdefault(info["key"], []).append(" ".join(statement.split()))
+                update_name_context(statement, object_type, info["object"][0], context)
+            elif attachment_match:
+                # only the object the policy is attached to counts as a reference
+                info["attached_to"] = qualify_object_name(attachment_match.group(1), "view", context)
+                info["reference_text"] = ".".join(info["attached_to"])
+                info["key"] = "row access policy attachment " + info["reference_text"]
+            else:
+                info["key"] = "statement " + current_script + " " + info["fingerprint"]
+                update_name_context(statement, None, None, context)
+            if dml_match:
+                info["target"] = qualify_object_name(dml_match.group(1), "table", context)
+                is_delete = statement.split(None, 1)[0].lower() == "delete"
+                if not is_delete and dml_group is not None and dml_group[0]["target"] == info["target"]:
+                    dml_group.append(info)
+                else:
+                    dml_group = [info] if is_delete else None
+                info["group"] = dml_group or [info]
+            else:
+                dml_group = None
+            statement_infos.append(info)
+
+    fingerprints = {}
+    for info in statement_infos:
+        if info["object"] is not None:
+            info["fingerprint"] = get_statement_hash("\n".join(object_texts[info["key"]]))
+        fingerprints.setdefault(info["key"], (info["fingerprint"], info["script"]))
+
+    # run changed statements, then everything referring to what they rebuild, until nothing more changes
+    run_infos = []
+    for info in statement_infos:
+        is_changed = stored_fingerprints.get(info["key"]) != info["fingerprint"]
+        if info["attached_to"] is not None and is_changed and info["key"] in stored_fingerprints:
+            run_infos.extend([other_info for other_info in statement_infos
+                              if other_info["object"] is not None and other_info["object"][0] == info["attached_to"]]
+                             or [info])
+        elif info["is_session"] or is_changed:
+            run_infos.append(info)
+    run_ids = {id(info) for info in run_infos}
+    rebuilt_names = set()
+    pending_infos = run_infos
+    while pending_infos:
+        reference_regexes = []
+        for info in pending_infos:
+            if info["is_rebuild"] and ".".join(info["object"][0]) not in rebuilt_names:
+                rebuilt_names.add(".".join(info["object"][0]))
+                reference_regexes.append(get_object_reference_regex(*info["object"]))
+        pending_infos = []
+        for info in statement_infos:
+            if id(info) not in run_ids and any(regex.search(info["reference_text"]) for regex in reference_regexes):
+                run_ids.add(id(info))
+                pending_infos.append(info)
+
+    # DML that runs takes the rest of its delete group with it
+    for info in statement_infos:
+        if id(info) in run_ids:
+            run_ids.update(id(group_info) for group_info in info["group"])
+
+    run_plan = {current_script: set() for current_script, _ in script_statements}
+    for info in statement_infos:
+        if id(info) in run_ids:
+            run_plan[info["script"]].add(info["index"])
+    return run_plan, fingerprints
+
+
+def parse_variant(value):
+    """
+    Returns a variant returned by a procedure, which the Python connector sends as JSON text
+    """
+    return json.loads(value) if isinstance(value, str) else value
+
+
+class ConsumerRequestClient:
+    """
+    Submits consumer requests, polls each provider's log for the approval and runs the approved query, using asyncio
+    A request can be fanned out to several providers at once, sharing one request id and timestamp as multi-party
+    requests do. At most max_concurrent_queries statements are in flight at once on the consumer connection
+    Polls back off exponentially with jitter, from poll_interval up to max_poll_interval seconds
+    With result_cache, single-provider requests run through run_request so repeated requests are answered from the
+    consumer's result cache
+    """
+
+    def __init__(self, conn, abbreviation="samp", app_databases=None, status_view="provider_log",
+                 max_concurrent_queries=8, poll_interval=0.5, max_poll_interval=8.0, timeout=300.0, max_rows=None,
+                 result_cache=True):
+        self.conn = conn
+        self.abbreviation = abbreviation or "samp"
+        self.app_databases = dict(app_databases or {})
+        self.status_view = status_view
+        self.max_concurrent_queries = max_concurrent_queries
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.timeout = timeout
+        self.max_rows = max_rows
+        self.result_cache = result_cache
+        self.metrics = []
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_queries)
+        self._query_slots = {}
+
+    def close(self):
+        """
+        Shuts down the worker threads, leaving the connection open
+        """
+        self._executor.shutdown(wait=True)
+
+    def app_database(self, provider_account):
+        """
+        Returns the database the provider's app share is mounted as, dcr_samp_app unless set in app_databases
+        """
+        return self.app_databases.get(provider_account, "dcr_" + self.abbreviation + "_app")
+
+    async def _execute(self, statement, params=None, fetch="one"):
+        loop = asyncio.get_running_loop()
+        if loop not in self._query_slots:
+            self._query_slots = {loop: asyncio.Semaphore(self.max_concurrent_queries)}
+
+        def execute():
+            cur = self.conn.cursor()
+            try:
+                cur.execute(statement, params)
+                if fetch == "one":
+                    return cur.fetchone()
+                return cur.fetchmany(self.max_rows) if self.max_rows else cur.fetchall()
+            finally:
+                cur.close()
+
+        async with self._query_slots[loop]:
+            return await loop.run_in_executor(self._executor, execute)
+
+    async def submit(self, provider_account, template_name, parameters, request_id=None, at_timestamp=None):
+        """
+        Calls the request procedure for one provider, returning the request object with its id and proposed query
+        Parameters are sent as JSON, and the request procedure strips characters like single quotes from them
+        A request answered from the result cache returns its id and the cached result as CACHED_RESULT instead
+        """
+        row = await self._execute("call dcr_" + self.abbreviation + "_consumer." + provider_account +
+                                  "_schema.request(%s, %s, %s, %s)",
+                                  (template_name, json.dumps(parameters or {}), request_id, at_timestamp))
+        response = parse_variant(row[0])
+        if response[0] == "Cached Result":
+            return {"REQUEST_ID": response[1], "CACHED_RESULT": parse_variant(response[2])}
+        return parse_variant(response[2])
+
+    async def run_request(self, provider_account, request_id):
+        """
+        Runs an approved request with the run_request procedure, which caches the result, and returns its rows
+        """
+        row = await self._execute("call dcr_" + self.abbreviation + "_consumer." + provider_account +
+                                  "_schema.run_request(%s)", (request_id,))
+        response = parse_variant(row[0])
+        if response[0] != "Request Complete":
+            raise RuntimeError("Request " + request_id + " could not be run: " + response[0])
+        return self._result_rows(parse_variant(response[2]))
+
+    def _result_rows(self, cached_result):
+        rows = [tuple(row) for row in cached_result["ROWS"]]
+        return rows[:self.max_rows] if self.max_rows else rows
+
+    async def wait_for_approval(self, provider_account, request_id):
+        """
+        Polls the provider log until the request is processed, returning (approved, error, polls)
+        """
+        deadline = time.monotonic() + self.timeout
+        delay = self.poll_interval
+        polls = 0
+        while True:
+            row = await self._execute("select approved, error from " + self.app_database(provider_account) +
+                                      ".cleanroom." + self.status_view + " where request_id = %s", (request_id,))
+            polls += 1
+            if row is not None:
+                return bool(row[0]), row[1], polls
+            if time.monotonic() + delay / 2 > deadline:
+                raise TimeoutError("Request " + request_id + " was not processed by " + provider_account +
+                                   " within " + str(self.timeout) + "s")
+            await asyncio.sleep(random.uniform(delay / 2, delay))
+            delay = min(delay * 2, self.max_poll_interval)
+
+    async def request(self, provider_accounts, template_name, parameters=None):
+        """
+        Sends a request to one provider, or fans it out to a list of providers, and runs the proposed query once
+        every provider approved it. Returns a result dict with the rows, the approvals and latency in seconds
+        """
+        if isinstance(provider_accounts, str):
+            provider_accounts = [provider_accounts]
+        provider_accounts = [provider_account.split(".")[0].upper() for provider_account in provider_accounts]
+        request_id = None
+        at_timestamp = None
+        if len(provider_accounts) > 1:
+            request_id = str(uuid.uuid4()).replace("-", "_")
+            at_timestamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+        start_time = time.perf_counter()
+        requests = await asyncio.gather(*[self.submit(provider_account, template_name, parameters, request_id,
+                                                      at_timestamp) for provider_account in provider_accounts])
+        submitted_time = time.perf_counter()
+
+        if "CACHED_RESULT" in requests[0]:
+            result = {"request_id": requests[0]["REQUEST_ID"],
+                      "template_name": template_name,
+                      "approved": True,
+                      "cached": True,
+                      "approvals": [],
+                      "rows": self._result_rows(requests[0]["CACHED_RESULT"]),
+                      "submit_seconds": round(submitted_time - start_time, 3),
+                      "approval_seconds": 0.0,
+                      "query_seconds": 0.0,
+                      "seconds": round(submitted_time - start_time, 3)}
+            self.metrics.append(result)
+            return result
+
+        async def approval(provider_account, provider_request):
+            approved, error, polls = await self.wait_for_approval(provider_account, provider_request["REQUEST_ID"])
+            return {"provider_account": provider_account, "approved": approved, "error": error, "polls": polls,
+                    "seconds": round(time.perf_counter() - submitted_time, 3)}
+
+        approvals = await asyncio.gather(*[approval(provider_account, provider_request) for provider_account,
+                                           provider_request in zip(provider_accounts, requests)])
+        approved_time = time.perf_counter()
+
+        result = {"request_id": requests[0]["REQUEST_ID"],
+                  "template_name": template_name,
+                  "approved": all(provider_approval["approved"] for provider_approval in approvals),
+                  "cached": False,
+                  "approvals": approvals,
+                  "rows": None,
+                  "submit_seconds": round(submitted_time - start_time, 3),
+                  "approval_seconds": round(approved_time - submitted_time, 3),
+                  "query_seconds": None}
+        if result["approved"] and self.result_cache and len(provider_accounts) == 1:
+            result["rows"] = await self.run_request(provider_accounts[0], result["request_id"])
+            result["query_seconds"] = round(time.perf_counter() - approved_time, 3)
+        elif result["approved"]:
+            # multi-party templates propose the same query to every provider
+            result["rows"] = await self._execute(requests[0]["PROPOSED_QUERY"], fetch="all")
+            result["query_seconds"] = round(time.perf_counter() - approved_time, 3)
+        result["seconds"] = round(time.perf_counter() - start_time, 3)
+        self.metrics.append(result)
+        return result
+
+    async def request_many(self, requests):
+        """
+        Runs (provider accounts, template name, parameters) requests concurrently, returning results in order
+        Failed requests return the exception instead of a result
+        """
+        return await asyncio.gather(*[self.request(*request) for request in requests], return_exceptions=True)
+
+    def latency_summary(self):
+        """
+        Returns request counts and end-to-end latency percentiles in seconds for the requests run so far
+        """
+        latencies = sorted(result["seconds"] for result in self.metrics)
+        if not latencies:
+            return {"requests": 0}
+
+        def percentile(fraction):
+            return latencies[min(len(latencies) - 1, int(round(fraction * (len(latencies) - 1))))]
+
+        return {"requests": len(latencies),
+                "approved": sum(1 for result in self.metrics if result["approved"]),
+                "cached": sum(1 for result in self.metrics if result["cached"]),
+                "polls": sum(provider_approval["polls"] for result in self.metrics
+                             for provider_approval in result["approvals"]),
+                "mean": round(sum(latencies) / len(latencies), 3),
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": latencies[-1]}
 
 
 class SnowflakeDcr:
@@ -20,68 +1184,332 @@ class SnowflakeDcr:
         self.path = None
         self.script_list = None
         self.script_conn_list = None
+        self.script_dependency_list = None
         self.check_words = None
         self.replace_words = None
         self.prepared_script_dict = {}
         self.cleaned_script_dict = {}
-
-    def execute(self):
+        self.execution_events = []
+        self.critical_path = []
+        self.statement_runner = StatementRunner()
+        self.trace = None
+        self.journal = None
+        self.redeploy_plan = {}
+
+    def execute(self, resume=False, redeploy=False):
         """
         Runs a series of SQL scripts with some automated replacements
+        With a journal, completed statements are recorded. resume skips the statements an earlier run of the same
+        scripts completed, up to the first statement of each script that changed or did not complete
+        redeploy only runs the statements whose objects changed since the last redeploy, and what depends on them,
+        using fingerprints stored in each target account
         """
         if self.is_debug_mode is None or self.path is None or self.script_list is None:
             print("Run a prepare script first!")
         else:
             # Prepare scripts
-            comment_code_regex_slash = re.compile(r"(?<!:)//.*")
-            comment_code_regex_dash = re.compile(r"(?<!:)--.*")
-            snowsql_code_regex = re.compile(r"^(?<!:)!.*")
-
-            for current_script in self.script_list:
-                print("Starting " + current_script)
-                original_script = current_script
-                original_script_full_path = self.path + original_script
-                original_script_no_path = os.path.basename(original_script_full_path)
-                script_index = self.script_list.index(current_script)
-                script_conn = self.script_conn_list[script_index]
-                prepared_script_text = ""
-                cleaned_script_text = ""
-
-                # Prepared scripts still contain comments
-                with open(original_script_full_path, "r", encoding='utf-8') as fin:
-                    for line in fin:
-                        # Replace values
-                        for check, replace in zip(self.check_words, self.replace_words):
-                            line = line.replace(check, replace)
+            self.render()
+
+            if resume and self.journal is None:
+                raise ValueError("Resuming a deployment requires a journal")
+            if resume:
+                print("Resuming after " + str(self.journal.load()) + " completed statements")
+            elif self.journal is not None and not self.is_debug_mode:
+                self.journal.reset()
+
+            self.redeploy_plan = {}
+            redeploy_fingerprints = {}
+            if redeploy and not self.is_debug_mode:
+                redeploy_fingerprints = self.plan_redeploy()
+
+            # Run scripts as soon as their dependencies finish, one at a time per connection
+            script_dependency_list = self.script_dependency_list or chain_dependencies(self.script_list)
+            conn_count = len({id(conn) for conn in self.script_conn_list if conn is not None})
+            remaining_indexes = list(range(len(self.script_list)))
+            running_futures = {}
+            busy_conns = set()
+            finished_scripts = set()
+            start_offsets = {}
+            durations = {}
+            failure = None
+            self.execution_events = []
+            start_time = time.perf_counter()
+
+            with ThreadPoolExecutor(max_workers=max(conn_count, 1)) as executor:
+                while remaining_indexes or running_futures:
+                    for script_index in list(remaining_indexes):
+                        current_script = self.script_list[script_index]
+                        script_conn = self.script_conn_list[script_index]
+                        is_ready = all(dependency in finished_scripts or dependency not in self.script_list
+                                       for dependency in script_dependency_list[script_index])
+                        if is_ready and (script_conn is None or id(script_conn) not in busy_conns):
+                            if script_conn is not None:
+                                busy_conns.add(id(script_conn))
+                            remaining_indexes.remove(script_index)
+                            start_offsets[current_script] = time.perf_counter() - start_time
+                            self.execution_events.append((start_offsets[current_script], "start", current_script))
+                            running_futures[executor.submit(self._run_script, current_script, script_conn,
+                                                            resume, self.redeploy_plan.get(current_script))] = \
+                                script_index
+
+                    if not running_futures:
+                        raise ValueError("Script dependencies cannot be satisfied: " +
+                                         ", ".join(self.script_list[i] for i in remaining_indexes))
+
+                    done_futures, _ = wait(running_futures, return_when=FIRST_COMPLETED)
+                    for future in done_futures:
+                        script_index = running_futures.pop(future)
+                        current_script = self.script_list[script_index]
+                        script_conn = self.script_conn_list[script_index]
+                        busy_conns.discard(id(script_conn))
+                        finish_offset = time.perf_counter() - start_time
+                        self.execution_events.append((finish_offset, "finish", current_script))
+                        durations[current_script] = finish_offset - start_offsets[current_script]
+
+                        if future.exception() is not None:
+                            # Stop scheduling new scripts, but let running ones finish
+                            if failure is None:
+                                failure = future.exception()
+                            remaining_indexes.clear()
+                        else:
+                            finished_scripts.add(current_script)
+
+            if failure is not None:
+                raise failure
+
+            for script_conn, fingerprints in redeploy_fingerprints.values():
+                self.store_fingerprints(script_conn, fingerprints)
+
+            self.critical_path, critical_path_duration = get_critical_path(self.script_list, script_dependency_list,
+                                                                           durations)
+            # The timeline is only worth printing when statements ran, debug mode only renders the scripts
+            if not self.is_debug_mode:
+                for offset, event, current_script in self.execution_events:
+                    print(format(offset, "8.2f") + "s " + event + " " + current_script)
+                print("Critical path (" + format(critical_path_duration, ".2f") + "s): " +
+                      " -> ".join(self.critical_path))
+            if self.trace is not None:
+                self.trace.print_summary()
+
+    def _run_script(self, current_script, script_conn, resume=False, statement_indexes=None):
+        """
+        Runs the statements of one rendered script on its connection
+        When resuming, skips its leading statements completed by an earlier run. Session statements like use role,
+        metadata statements like show, and the creation and loading of temporary tables always run, since the new
+        session needs them
+        With statement_indexes, only runs the statements at those indexes
+        """
+        print("Starting " + current_script)
+        original_script_no_path = os.path.basename(self.path + current_script)
+
+        if not self.is_debug_mode and script_conn is not None:
+            print("Running statements for " + current_script)
+
+            # Run script, removing comments and splitting statements as they are executed
+            script_start_time = time.perf_counter()
+            statement_count = 0
+            skipped_count = 0
+            row_count = 0
+            is_skipping = resume
+            temporary_objects = set()
+            for statement_index, statement in enumerate(
+                    iter_sql_statements(self.prepared_script_dict[original_script_no_path])):
+                if statement_indexes is not None and statement_index not in statement_indexes:
+                    skipped_count += 1
+                    continue
+                if is_skipping and not is_session_statement(statement, temporary_objects):
+                    if self.journal.is_completed(current_script, statement_index, statement):
+                        skipped_count += 1
+                        continue
+                    is_skipping = False
+
+                statement_start_time = time.perf_counter()
+                query_id, statement_row_count, rows = self.statement_runner.run(script_conn, statement)
+                statement_seconds = time.perf_counter() - statement_start_time
+                statement_count += 1
+                row_count += statement_row_count or 0
+                if self.journal is not None:
+                    self.journal.record(current_script, statement_index, statement, statement_seconds, query_id)
+                if self.trace is not None:
+                    self.trace.emit("statement", script=current_script, statement_index=statement_index,
+                                    query_id=query_id, seconds=statement_seconds, rows=statement_row_count,
+                                    statement=statement)
+                print(statement)
+                for ret in rows:
+                    print(ret)
+
+            if skipped_count:
+                print("Skipped " + str(skipped_count) + " completed or unchanged statements of " + current_script)
+            if self.trace is not None:
+                self.trace.emit("script", script=current_script, seconds=time.perf_counter() - script_start_time,
+                                statements=statement_count, skipped=skipped_count, rows=row_count)
+        else:
+            print("Debug mode: Script generated but not run for " + current_script)
 
-                        # Remove SnowSQL lines to enable easier running in worksheets
-                        line = re.sub(snowsql_code_regex, '', line)
+    def get_fingerprint_table(self):
+        """
+        Returns the name of the fingerprint table for this clean room, with the same replacements as the scripts
+        """
+        return compile_substitutions(self.check_words, self.replace_words)(FINGERPRINT_TABLE)
 
-                        prepared_script_text += line
+    def load_fingerprints(self, conn):
+        """
+        Returns the fingerprints stored in an account by its last redeploy, or none if it was never redeployed
+        """
+        cur = conn.cursor()
+        try:
+            cur.execute("select object_key, fingerprint from " + self.get_fingerprint_table())
+            return {object_key: fingerprint for object_key, fingerprint in cur.fetchall()}
+        except SnowflakeProgrammingError:
+            return {}
+        finally:
+            cur.close()
+
+    def store_fingerprints(self, conn, fingerprints):
+        """
+        Replaces the fingerprints stored in an account for the scripts that were redeployed
+        """
+        fingerprint_table = self.get_fingerprint_table()
+        scripts = sorted({fingerprint_script for _, fingerprint_script in fingerprints.values()})
+        statements = ["create database if not exists " + fingerprint_table.split(".")[0],
+                      "create schema if not exists " + ".".join(fingerprint_table.split(".")[:2]),
+                      "create table if not exists " + fingerprint_table + " (object_key varchar, fingerprint "
+                      "varchar(64), script varchar(1000), deployed_ts timestamp_ltz)",
+                      "delete from " + fingerprint_table + " where script in (" +
+                      ", ".join("'" + script.replace("'", "''") + "'" for script in scripts) + ")"]
+        rows = ["('" + object_key.replace("'", "''") + "', '" + fingerprint + "', '" +
+                fingerprint_script.replace("'", "''") + "')"
+                for object_key, (fingerprint, fingerprint_script) in fingerprints.items()]
+        for start in range(0, len(rows), 1000):
+            statements.append("insert into " + fingerprint_table + " (object_key, fingerprint, script, deployed_ts) "
+                              "select column1, column2, column3, current_timestamp() from values " +
+                              ", ".join(rows[start:start + 1000]))
+        for statement in statements:
+            self.statement_runner.run(conn, statement)
+
+    def plan_redeploy(self):
+        """
+        Populates redeploy_plan with the statements to run for each script, comparing the rendered scripts with the
+        fingerprints stored in each account. Returns {connection id: (connection, fingerprints to store)}
+        """
+        scripts_by_conn = OrderedDict()
+        for current_script, script_conn in zip(self.script_list, self.script_conn_list):
+            if script_conn is not None:
+                scripts_by_conn.setdefault(id(script_conn), (script_conn, []))[1].append(current_script)
+
+        redeploy_fingerprints = {}
+        for conn_id, (script_conn, conn_scripts) in scripts_by_conn.items():
+            script_statements = [(current_script, list(iter_sql_statements(
+                self.prepared_script_dict[os.path.basename(self.path + current_script)])))
+                for current_script in conn_scripts]
+            run_plan, fingerprints = plan_redeploy(script_statements, self.load_fingerprints(script_conn))
+            self.redeploy_plan.update(run_plan)
+            redeploy_fingerprints[conn_id] = (script_conn, fingerprints)
+            print("Redeploy runs " + str(sum(len(indexes) for indexes in run_plan.values())) + " of " +
+                  str(sum(len(statements) for _, statements in script_statements)) + " statements for " +
+                  ", ".join(conn_scripts))
+        return redeploy_fingerprints
+
+    def get_plan_hash(self):
+        """
+        Returns a hash of everything that determines the rendered scripts: the script list, the check/replace
+        words and the content of each source script
+        """
+        plan_hash = hashlib.sha256()
+        for value in [self.path] + self.script_list + [None] + self.check_words + [None] + self.replace_words:
+            plan_hash.update(repr(value).encode('utf-8'))
+        for current_script in self.script_list:
+            plan_hash.update(script_source_cache.digest(self.path + current_script).encode('utf-8'))
+        return plan_hash.hexdigest()
+
+    def render(self):
+        """
+        Populates prepared_script_dict and cleaned_script_dict, reusing earlier output for an identical plan
+        """
+        plan_hash = self.get_plan_hash()
+        cached_scripts = script_render_cache.get(plan_hash)
+        if cached_scripts is not None:
+            self.prepared_script_dict, self.cleaned_script_dict = cached_scripts
+            if self.trace is not None:
+                self.trace.emit("render_cache_hit", plan_hash=plan_hash, scripts=len(self.script_list))
+            return
+
+        substitute = compile_substitutions(self.check_words, self.replace_words)
+        self.prepared_script_dict = {}
+        self.cleaned_script_dict = {}
 
-                        # Remove commented SQL lines due to finicky execute_stream behavior
-                        line = re.sub(comment_code_regex_slash, '', line)
-                        line = re.sub(comment_code_regex_dash, '', line)
+        for current_script in self.script_list:
+            original_script_full_path = self.path + current_script
+            original_script_no_path = os.path.basename(original_script_full_path)
 
-                        cleaned_script_text += line
+            # Prepared scripts still contain comments
+            script_text = script_source_cache.read(original_script_full_path)
+            substitution_start_time = time.perf_counter()
+            prepared_script_text = prepare_script_text(script_text, substitute)
+            clean_start_time = time.perf_counter()
+            self.prepared_script_dict[original_script_no_path] = prepared_script_text
+            self.cleaned_script_dict[original_script_no_path] = clean_script_text(prepared_script_text)
 
-                    self.prepared_script_dict[original_script_no_path] = prepared_script_text
-                    self.cleaned_script_dict[original_script_no_path] = cleaned_script_text
+            if self.trace is not None:
+                self.trace.emit("render", script=current_script, bytes=len(prepared_script_text.encode('utf-8')),
+                                substitution_seconds=clean_start_time - substitution_start_time,
+                                clean_seconds=time.perf_counter() - clean_start_time)
 
-                if not self.is_debug_mode and script_conn is not None:
-                    print("Running statements for " + current_script)
+        script_render_cache.put(plan_hash, self.prepared_script_dict, self.cleaned_script_dict)
 
-                    # Run script
-                    f = io.StringIO(cleaned_script_text)
-                    for cur in script_conn.execute_stream(f, remove_comments=True):
-                        print(cur.query)
-                        for ret in cur:
-                            print(ret)
-                else:
-                    print("Debug mode: Script generated but not run for " + current_script)
+    def iter_rendered_scripts(self, include_comments=True):
+        """
+        Lazily renders only the requested variant of each script, yielding (script name, iterable of text chunks)
+        Scripts are rendered one at a time unless the whole plan is already in the render cache
+        """
+        cached_scripts = script_render_cache.get(self.get_plan_hash())
+        if cached_scripts is not None:
+            script_dict = cached_scripts[0] if include_comments else cached_scripts[1]
+            for original_script_no_path, script_text in script_dict.items():
+                yield original_script_no_path, [script_text]
+            return
+
+        substitute = compile_substitutions(self.check_words, self.replace_words)
+        for current_script in self.script_list:
+            original_script_full_path = self.path + current_script
+            prepared_script_text = prepare_script_text(script_source_cache.read(original_script_full_path),
+                                                       substitute)
+            if include_comments:
+                yield os.path.basename(original_script_full_path), [prepared_script_text]
+            else:
+                yield os.path.basename(original_script_full_path), [clean_script_text(prepared_script_text)]
+
+    def write_zip(self, file, include_comments=True):
+        """
+        Streams the requested variant of each script into a deflate-compressed zip, one script at a time
+        Returns the numbered names of the scripts written
+        """
+        script_names = []
+        with ZipFile(file, "w", compression=ZIP_DEFLATED) as archive:
+            for script, script_chunks in self.iter_rendered_scripts(include_comments):
+                # Add script number to help sort and show the correct order
+                script_name = str(len(script_names) + 1) + " - " + script.lstrip("/")
+                with archive.open(script_name, "w") as script_file:
+                    for chunk in script_chunks:
+                        script_file.write(chunk.encode('utf-8'))
+                script_names.append(script_name)
+        return script_names
+
+    def validate_templates(self, parameter_sets=None, max_workers=None):
+        """
+        Renders every template the prepared scripts would deploy against the parameter sets, before deploying
+        """
+        self.render()
+        templates = []
+        for script_text in self.prepared_script_dict.values():
+            # only the templates of statements that run, not those in comments
+            templates.extend(read_templates(";\n".join(iter_sql_statements(script_text))))
+        return validate_template_library(self.path, templates, parameter_sets, max_workers)
 
     def prepare_dcr_deployment(self, is_debug_mode, dcr_version, provider_account, provider_conn, consumer_account,
-                               consumer_conn, abbreviation, path, data_selection=None, deployment_type=None):
+                               consumer_conn, abbreviation, path, data_selection=None, deployment_type=None,
+                               request_processor=None, request_scheduler=None, scheduler_latency_seconds=60,
+                               scale_factor="1M", result_cache=False):
         """
         Prepares object to deploy 2-party DCRs
         """
@@ -116,6 +1544,7 @@ class SnowflakeDcr:
             self.path = path
             self.script_list = script_list
             self.script_conn_list = script_conn_list
+            self.script_dependency_list = chain_dependencies(script_list)
             self.check_words = check_words
             self.replace_words = replace_words
         elif dcr_version == "DCR 5.5 General Availability":
@@ -132,67 +1561,113 @@ class SnowflakeDcr:
             else:
                 use_case_directory = None
 
+            # Determine how the provider processes consumer requests
+            if request_scheduler == "Consolidated":
+                enable_consumer_script = "provider_enable_consumer_scheduled.sql"
+            elif request_processor == "Batch":
+                enable_consumer_script = "provider_enable_consumer_batch.sql"
+            else:
+                enable_consumer_script = "provider_enable_consumer.sql"
+
             if deployment_type == "Provider":
                 if use_case_directory is None:
                     script_list = ["provider_init.sql"]
                     script_conn_list = [provider_conn]
+                    script_dependency_list = [[]]
                 else:
                     script_list = ["provider_init.sql", use_case_directory + "/provider_data.sql",
                                    use_case_directory + "/provider_templates.sql"]
                     script_conn_list = [provider_conn, provider_conn,
                                         provider_conn]
+                    script_dependency_list = [[], ["provider_init.sql"],
+                                              ["provider_init.sql"]]
             elif deployment_type == "Consumer":
                 if use_case_directory is None:
                     script_list = ["consumer_init.sql",
-                                   "provider_enable_consumer.sql"]
+                                   enable_consumer_script]
                     script_conn_list = [consumer_conn,
                                         provider_conn]
+                    script_dependency_list = chain_dependencies(script_list)
                 else:
                     script_list = ["consumer_init.sql", use_case_directory + "/consumer_data.sql",
-                                   "provider_enable_consumer.sql",
+                                   enable_consumer_script,
                                    use_case_directory + "/consumer_request.sql"]
                     script_conn_list = [consumer_conn, consumer_conn,
                                         provider_conn,
                                         None]
+                    # Consumer data can load while the provider enables the consumer
+                    script_dependency_list = [[], ["consumer_init.sql"],
+                                              ["consumer_init.sql"],
+                                              [use_case_directory + "/consumer_data.sql", enable_consumer_script]]
             else:
                 if use_case_directory is None:
                     script_list = ["provider_init.sql",
                                    "consumer_init.sql",
-                                   "provider_enable_consumer.sql"]
+                                   enable_consumer_script]
                     script_conn_list = [provider_conn,
                                         consumer_conn,
                                         provider_conn]
+                    script_dependency_list = chain_dependencies(script_list)
                 else:
                     script_list = ["provider_init.sql", use_case_directory + "/provider_data.sql",
                                    use_case_directory + "/provider_templates.sql",
                                    "consumer_init.sql", use_case_directory + "/consumer_data.sql",
-                                   "provider_enable_consumer.sql",
+                                   enable_consumer_script,
                                    use_case_directory + "/consumer_request.sql"]
                     script_conn_list = [provider_conn, provider_conn,
                                         provider_conn,
                                         consumer_conn, consumer_conn,
                                         provider_conn,
                                         None]
+                    # Provider data and templates load while the consumer initializes. Consumer data queries the
+                    # shared provider views, so it waits for the provider data
+                    script_dependency_list = [[], ["provider_init.sql"],
+                                              ["provider_init.sql"],
+                                              ["provider_init.sql"],
+                                              ["consumer_init.sql", use_case_directory + "/provider_data.sql"],
+                                              ["consumer_init.sql"],
+                                              [use_case_directory + "/provider_data.sql",
+                                               use_case_directory + "/provider_templates.sql",
+                                               use_case_directory + "/consumer_data.sql",
+                                               enable_consumer_script]]
 
             check_words = ["PROVIDER_ACCT", "provider_acct", "CONSUMER_ACCT", "consumer_acct", "_SAMP_", "_samp_"]
             replace_words = [provider_account, provider_account, consumer_account, consumer_account,
                              "_" + abbreviation +
                              "_", "_" + abbreviation + "_"]
 
+            if request_scheduler == "Consolidated":
+                add_request_scheduler(script_list, script_conn_list, script_dependency_list, provider_conn)
+                scheduler_check_words, scheduler_replace_words = get_scheduler_substitutions(scheduler_latency_seconds)
+                check_words += scheduler_check_words
+                replace_words += scheduler_replace_words
+
+            if result_cache:
+                add_result_cache(script_list, script_conn_list, script_dependency_list, provider_conn)
+
+            demo_data_check_words, demo_data_replace_words = get_demo_data_substitutions(scale_factor)
+            check_words += demo_data_check_words
+            replace_words += demo_data_replace_words
+
             self.is_debug_mode = is_debug_mode
             self.path = path
             self.script_list = script_list
             self.script_conn_list = script_conn_list
+            self.script_dependency_list = script_dependency_list
             self.check_words = check_words
             self.replace_words = replace_words
 
     def prepare_data_onboarding(self, is_debug_mode, dcr_version, provider_account, provider_conn, abbreviation, path,
-                                source_database, source_schema, source_table, source_column):
+                                source_database, source_schema, source_table, source_column, match_dimensions=None,
+                                consumer_account=None):
         """
         Prepares deployment of custom data table/view
+        With match_dimensions, shares a narrow match table of the hashed source column and those columns instead,
+        and for a consumer adds a template that joins against it
         """
-        # prepare account
+        # prepare accounts
         provider_account = provider_account.split(".")[0].upper()
+        consumer_account = consumer_account.split(".")[0].upper() if consumer_account else ""
 
         script_list = []
         script_conn_list = []
@@ -218,10 +1693,21 @@ class SnowflakeDcr:
                              source_table, source_table,
                              source_column, source_column]
 
+            if match_dimensions is not None:
+                script_list = ["provider_data_onboarding_match.sql"]
+                if consumer_account:
+                    script_list.append("provider_data_onboarding_match_templates.sql")
+                    script_conn_list.append(provider_conn)
+
+                match_check_words, match_replace_words = get_match_table_substitutions(match_dimensions)
+                check_words = check_words + ["CONSUMER_ACCT", "consumer_acct"] + match_check_words
+                replace_words = replace_words + [consumer_account, consumer_account] + match_replace_words
+
             self.is_debug_mode = is_debug_mode
             self.path = path
             self.script_list = script_list
             self.script_conn_list = script_conn_list
+            self.script_dependency_list = chain_dependencies(script_list)
             self.check_words = check_words
             self.replace_words = replace_words
 
@@ -262,11 +1748,118 @@ class SnowflakeDcr:
             self.path = path
             self.script_list = script_list
             self.script_conn_list = script_conn_list
+            self.script_dependency_list = chain_dependencies(script_list)
+            self.check_words = check_words
+            self.replace_words = replace_words
+
+    def prepare_template_bulk_deployment(self, is_debug_mode, dcr_version, provider_account, provider_conn,
+                                         consumer_accounts, templates, abbreviation, path):
+        """
+        Prepares deployment of a catalog of templates to many consumers with a single merge
+        templates is a list of (template name, template text, available dimensions) tuples
+        """
+        # prepare accounts
+        provider_account = provider_account.split(".")[0].upper()
+        consumer_account_values, template_values = build_template_merge_values(consumer_accounts, templates)
+
+        script_list = []
+        script_conn_list = []
+
+        # if dcr_version == "DCR 6.0 Native App": TODO - Add later
+        if dcr_version == "DCR 5.5 General Availability":
+            if abbreviation == "":
+                abbreviation = "samp"
+
+            script_list = ["provider_add_templates_bulk.sql"]
+            script_conn_list = [provider_conn]
+
+            check_words = ["PROVIDER_ACCT", "provider_acct", "_SAMP_", "_samp_",
+                           "NEW_CONSUMER_ACCOUNTS", "new_consumer_accounts", "NEW_TEMPLATE_VALUES",
+                           "new_template_values"]
+            replace_words = [provider_account, provider_account, "_" + abbreviation + "_", "_" + abbreviation + "_",
+                             consumer_account_values, consumer_account_values, template_values, template_values]
+
+            self.is_debug_mode = is_debug_mode
+            self.path = path
+            self.script_list = script_list
+            self.script_conn_list = script_conn_list
+            self.script_dependency_list = chain_dependencies(script_list)
+            self.check_words = check_words
+            self.replace_words = replace_words
+
+    def prepare_request_log_maintenance(self, is_debug_mode, dcr_version, provider_account, provider_conn, abbreviation,
+                                        path, retention_days=30):
+        """
+        Prepares retention and maintenance of the provider request log
+        """
+        # prepare account
+        provider_account = provider_account.split(".")[0].upper()
+
+        script_list = []
+        script_conn_list = []
+
+        # if dcr_version == "DCR 6.0 Native App": TODO - Add later
+        if dcr_version == "DCR 5.5 General Availability":
+            if abbreviation == "":
+                abbreviation = "samp"
+
+            script_list = ["provider_request_log_maintenance.sql"]
+            script_conn_list = [provider_conn]
+
+            check_words = ["PROVIDER_ACCT", "provider_acct", "_SAMP_", "_samp_", "LOG_RETENTION_DAYS"]
+            replace_words = [provider_account, provider_account,
+                             "_" + abbreviation +
+                             "_", "_" + abbreviation + "_",
+                             str(int(retention_days))]
+
+            self.is_debug_mode = is_debug_mode
+            self.path = path
+            self.script_list = script_list
+            self.script_conn_list = script_conn_list
+            self.script_dependency_list = chain_dependencies(script_list)
+            self.check_words = check_words
+            self.replace_words = replace_words
+
+    def prepare_overlap_sketches(self, is_debug_mode, dcr_version, provider_account, provider_conn, consumer_account,
+                                 abbreviation, path, data_selection="Media & Advertising"):
+        """
+        Prepares the provider overlap sketches, their refresh task and, for a consumer, the approximate overlap
+        templates that use them
+        """
+        # prepare accounts
+        provider_account = provider_account.split(".")[0].upper()
+        consumer_account = consumer_account.split(".")[0].upper() if consumer_account else ""
+
+        script_list = []
+        script_conn_list = []
+
+        # if dcr_version == "DCR 6.0 Native App": TODO - Add later
+        if dcr_version == "DCR 5.5 General Availability" and data_selection == "Media & Advertising":
+            if abbreviation == "":
+                abbreviation = "samp"
+
+            script_list = ["media-and-advertising/provider_overlap_sketches.sql"]
+            script_conn_list = [provider_conn]
+            if consumer_account:
+                script_list.append("media-and-advertising/provider_sketch_templates.sql")
+                script_conn_list.append(provider_conn)
+
+            check_words = ["PROVIDER_ACCT", "provider_acct", "CONSUMER_ACCT", "consumer_acct", "_SAMP_", "_samp_"]
+            replace_words = [provider_account, provider_account, consumer_account, consumer_account,
+                             "_" + abbreviation +
+                             "_", "_" + abbreviation + "_"]
+
+            self.is_debug_mode = is_debug_mode
+            self.path = path
+            self.script_list = script_list
+            self.script_conn_list = script_conn_list
+            self.script_dependency_list = chain_dependencies(script_list)
             self.check_words = check_words
             self.replace_words = replace_words
 
     def prepare_consumer_addition(self, is_debug_mode, dcr_version, provider_account, provider_conn, consumer_account,
-                                  consumer_conn, abbreviation, path, data_selection=None):
+                                  consumer_conn, abbreviation, path, data_selection=None, request_processor=None,
+                                  request_scheduler=None, scheduler_latency_seconds=60, scale_factor="1M"):
         """
         Prepares object to add consumers to existing DCRs
         """
@@ -297,6 +1890,7 @@ class SnowflakeDcr:
             self.path = path
             self.script_list = script_list
             self.script_conn_list = script_conn_list
+            self.script_dependency_list = chain_dependencies(script_list)
             self.check_words = check_words
             self.replace_words = replace_words
         elif dcr_version == "DCR 5.5 General Availability":
@@ -313,37 +1907,66 @@ class SnowflakeDcr:
             else:
                 use_case_directory = None
 
+            # Determine how the provider processes consumer requests
+            if request_scheduler == "Consolidated":
+                enable_consumer_script = "provider_enable_consumer_scheduled.sql"
+            elif request_processor == "Batch":
+                enable_consumer_script = "provider_enable_consumer_batch.sql"
+            else:
+                enable_consumer_script = "provider_enable_consumer.sql"
+
             if use_case_directory is None:
                 script_list = ["provider_add_consumer_to_share.sql",
                                "consumer_init.sql",
-                               "provider_enable_consumer.sql"]
+                               enable_consumer_script]
                 script_conn_list = [provider_conn,
                                     consumer_conn,
                                     provider_conn]
+                script_dependency_list = chain_dependencies(script_list)
             else:
                 script_list = [use_case_directory + "/provider_templates.sql", "provider_add_consumer_to_share.sql",
                                "consumer_init.sql", use_case_directory + "/consumer_data.sql",
-                               "provider_enable_consumer.sql",
+                               enable_consumer_script,
                                use_case_directory + "/consumer_request.sql"]
                 script_conn_list = [provider_conn, provider_conn,
                                     consumer_conn, consumer_conn,
                                     provider_conn,
                                     None]
+                # Consumer data can load while the provider enables the consumer
+                script_dependency_list = [[], [],
+                                          ["provider_add_consumer_to_share.sql"], ["consumer_init.sql"],
+                                          ["consumer_init.sql"],
+                                          [use_case_directory + "/provider_templates.sql",
+                                           use_case_directory + "/consumer_data.sql",
+                                           enable_consumer_script]]
 
             check_words = ["PROVIDER_ACCT", "provider_acct", "CONSUMER_ACCT", "consumer_acct", "_SAMP_", "_samp_"]
             replace_words = [provider_account, provider_account, consumer_account, consumer_account,
                              "_" + abbreviation +
                              "_", "_" + abbreviation + "_"]
 
+            if request_scheduler == "Consolidated":
+                add_request_scheduler(script_list, script_conn_list, script_dependency_list, provider_conn)
+                scheduler_check_words, scheduler_replace_words = get_scheduler_substitutions(scheduler_latency_seconds)
+                check_words += scheduler_check_words
+                replace_words += scheduler_replace_words
+
+            demo_data_check_words, demo_data_replace_words = get_demo_data_substitutions(scale_factor)
+            check_words += demo_data_check_words
+            replace_words += demo_data_replace_words
+
             self.is_debug_mode = is_debug_mode
             self.path = path
             self.script_list = script_list
             self.script_conn_list = script_conn_list
+            self.script_dependency_list = script_dependency_list
             self.check_words = check_words
             self.replace_words = replace_words
 
     def prepare_provider_addition(self, is_debug_mode, dcr_version, provider_account, provider_conn, consumer_account,
-                                  consumer_conn, abbreviation, app_suffix, path, data_selection=None):
+                                  consumer_conn, abbreviation, app_suffix, path, data_selection=None,
+                                  request_processor=None, request_scheduler=None, scheduler_latency_seconds=60,
+                                  scale_factor="1M", result_cache=False):
         """
         Prepares object to add providers to existing DCRs
         """
@@ -368,19 +1991,28 @@ class SnowflakeDcr:
             else:
                 use_case_directory = None
 
+            # Determine how the provider processes consumer requests
+            if request_scheduler == "Consolidated":
+                enable_consumer_script = "provider_enable_consumer_scheduled.sql"
+            elif request_processor == "Batch":
+                enable_consumer_script = "provider_enable_consumer_batch.sql"
+            else:
+                enable_consumer_script = "provider_enable_consumer.sql"
+
             if use_case_directory is None:
                 script_list = ["provider_init.sql",
                                "consumer_init_new_provider.sql",
-                               "provider_enable_consumer.sql"]
-                script_conn_list = [provider_conn, provider_conn,
+                               enable_consumer_script]
+                script_conn_list = [provider_conn,
                                     consumer_conn,
                                     provider_conn]
+                script_dependency_list = chain_dependencies(script_list)
             else:
                 script_list = ["provider_init.sql",
                                use_case_directory + "/provider_data.sql",
                                use_case_directory + "/provider_templates.sql",
                                "consumer_init_new_provider.sql",
-                               "provider_enable_consumer.sql",
+                               enable_consumer_script,
                                use_case_directory + "/consumer_request.sql"]
                 script_conn_list = [provider_conn,
                                     provider_conn,
@@ -388,22 +2020,46 @@ class SnowflakeDcr:
                                     consumer_conn,
                                     provider_conn,
                                     None]
+                # The consumer mounts the new provider's app while the provider loads templates. Mounting queries
+                # the shared provider views, so it waits for the provider data
+                script_dependency_list = [[],
+                                          ["provider_init.sql"],
+                                          ["provider_init.sql"],
+                                          ["provider_init.sql", use_case_directory + "/provider_data.sql"],
+                                          ["consumer_init_new_provider.sql"],
+                                          [use_case_directory + "/provider_data.sql",
+                                           use_case_directory + "/provider_templates.sql",
+                                           enable_consumer_script]]
 
             check_words = ["dcr_samp_app_two", "DCR_SAMP_APP_TWO",
                            "PROVIDER2_ACCT", "provider2_acct",
                            "PROVIDER_ACCT", "provider_acct",
                            "CONSUMER_ACCT", "consumer_acct",
                            "_SAMP_", "_samp_"]
-            replace_words = ["dcr_samp_app_" + app_suffix, "dcr_samp_app_" + app_suffix,
+            replace_words = ["dcr_" + abbreviation + "_app_" + app_suffix, "dcr_" + abbreviation + "_app_" + app_suffix,
                              provider_account, provider_account,
                              provider_account, provider_account,
                              consumer_account, consumer_account,
                              "_" + abbreviation + "_", "_" + abbreviation + "_"]
 
+            if request_scheduler == "Consolidated":
+                add_request_scheduler(script_list, script_conn_list, script_dependency_list, provider_conn)
+                scheduler_check_words, scheduler_replace_words = get_scheduler_substitutions(scheduler_latency_seconds)
+                check_words += scheduler_check_words
+                replace_words += scheduler_replace_words
+
+            if result_cache:
+                add_result_cache(script_list, script_conn_list, script_dependency_list, provider_conn)
+
+            demo_data_check_words, demo_data_replace_words = get_demo_data_substitutions(scale_factor)
+            check_words += demo_data_check_words
+            replace_words += demo_data_replace_words
+
             self.is_debug_mode = is_debug_mode
             self.path = path
             self.script_list = script_list
             self.script_conn_list = script_conn_list
+            self.script_dependency_list = script_dependency_list
             self.check_words = check_words
             self.replace_words = replace_words
 
@@ -425,7 +2081,7 @@ class SnowflakeDcr:
         script_list = ["provider_init.sql", "provider_upgrade.sql",
                        "consumer_init.sql",
                        "provider_enable_consumer.sql", "provider_ml.sql",
-                       "consumer_ml.sql"
+                       "consumer_ml.sql",
                        "consumer_request.sql"]
         script_conn_list = [provider_conn, provider_conn,
                             consumer_conn,
@@ -442,6 +2098,7 @@ class SnowflakeDcr:
         self.path = path
         self.script_list = script_list
         self.script_conn_list = script_conn_list
+        self.script_dependency_list = chain_dependencies(script_list)
         self.check_words = check_words
         self.replace_words = replace_words
 
@@ -470,6 +2127,10 @@ class SnowflakeDcr:
                 script_conn_list = [account_conn]
                 # Support for multi-provider
                 if app_suffix != "":
+                    check_words.append("_DEMO_APP")
+                    replace_words.append("_" + abbreviation + "_app_" + app_suffix)
+                    check_words.append("_demo_app")
+                    replace_words.append("_" + abbreviation + "_app_" + app_suffix)
                     check_words.append("_app")
                     replace_words.append("_app_" + app_suffix)
                     check_words.append("_APP")
@@ -482,6 +2143,7 @@ class SnowflakeDcr:
             self.path = path
             self.script_list = script_list
             self.script_conn_list = script_conn_list
+            self.script_dependency_list = chain_dependencies(script_list)
             self.check_words = check_words
             self.replace_words = replace_words
         elif dcr_version == "DCR 5.5 General Availability":
@@ -506,6 +2168,7 @@ class SnowflakeDcr:
             self.path = path
             self.script_list = script_list
             self.script_conn_list = script_conn_list
+            self.script_dependency_list = chain_dependencies(script_list)
             self.check_words = check_words
             self.replace_words = replace_words
 
@@ -546,5 +2209,6 @@ class SnowflakeDcr:
             self.path = path
             self.script_list = script_list
             self.script_conn_list = script_conn_list
+            self.script_dependency_list = chain_dependencies(script_list)
             self.check_words = check_words
             self.replace_words = replace_words
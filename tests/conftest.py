@@ -0,0 +1,7 @@
+import os
+import pytest
+
+
+@pytest.fixture
+def repo_path():
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data-clean-room") + "/"
@@ -0,0 +1,188 @@
+import itertools
+import json
+import re
+import threading
+import time
+import uuid
+import snowflake_dcr as dcr
+
+
+# Local stand-in for a Snowflake connection, implementing the cursor protocol used by StatementRunner
+class FakeSnowflakeConnection:
+    _query_ids = itertools.count(1)
+
+    def __init__(self, account="FAKE", latency=0.0, rows_per_query=1, transient_failures=0, fail_after=None):
+        self.account = account
+        self.latency = latency
+        self.rows_per_query = rows_per_query
+        self.transient_failures = transient_failures
+        self.fail_after = fail_after
+        self.queries = {}
+        self.fingerprints = None
+        self.attached_policies = {}
+
+    def cursor(self):
+        return FakeSnowflakeCursor(self)
+
+    def submit(self, statement):
+        if self.transient_failures > 0:
+            self.transient_failures -= 1
+            raise ConnectionError("Simulated transient failure")
+        if self.fail_after is not None and len(self.queries) >= self.fail_after:
+            self.fail_after = None
+            raise RuntimeError("Simulated statement failure")
+        if "object_fingerprints" in statement:
+            self.update_fingerprints(statement)
+        self.update_policies(statement)
+        query_id = "fake-" + str(next(self._query_ids))
+        self.queries[query_id] = (statement, time.perf_counter() + self.latency)
+        return query_id
+
+    # Keeps the fingerprint table of diff-based redeploys as a dict of object key to (fingerprint, script)
+    def update_fingerprints(self, statement):
+        if statement.startswith("select") and self.fingerprints is None:
+            raise dcr.SnowflakeProgrammingError("Object does not exist")
+        elif statement.startswith("create table"):
+            self.fingerprints = self.fingerprints or {}
+        elif statement.startswith("delete"):
+            scripts = set(re.findall(r"'([^']*)'", statement))
+            self.fingerprints = {object_key: value for object_key, value in self.fingerprints.items()
+                                 if value[1] not in scripts}
+        elif statement.startswith("insert"):
+            for object_key, fingerprint, script in re.findall(r"\('((?:[^']|'')*)', '(\w+)', '([^']*)'\)", statement):
+                self.fingerprints[object_key.replace("''", "'")] = (fingerprint, script)
+
+    # Keeps the row access policy attached to each view, rejecting what Snowflake rejects: replacing an attached
+    # policy, and attaching a second policy to a view
+    def update_policies(self, statement):
+        replace_match = re.match(r"\s*create\s+or\s+replace\s+(?:secure\s+)?(database|view|row\s+access\s+policy)\s+"
+                                 r"([^\s(;]+)", statement, re.IGNORECASE)
+        attachment_match = dcr.POLICY_ATTACHMENT_REGEX.match(statement)
+        if replace_match and replace_match.group(1).lower() == "database":
+            self.attached_policies = {view: policy for view, policy in self.attached_policies.items()
+                                      if not view.startswith(replace_match.group(2).lower() + ".")}
+        elif replace_match and replace_match.group(1).lower() == "view":
+            self.attached_policies.pop(replace_match.group(2).lower(), None)
+        elif replace_match and replace_match.group(2).lower() in self.attached_policies.values():
+            raise dcr.SnowflakeProgrammingError("Cannot replace a row access policy that is attached")
+        elif attachment_match:
+            view = attachment_match.group(1).lower()
+            if view in self.attached_policies:
+                raise dcr.SnowflakeProgrammingError("A row access policy is already attached to " + view)
+            self.attached_policies[view] = statement[attachment_match.end():].split()[0].lower()
+
+    def close(self):
+        pass
+
+
+class FakeSnowflakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.sfqid = None
+        self.query = None
+        self.rowcount = None
+        self._rows = []
+
+    def execute(self, statement):
+        self.sfqid = self.conn.submit(statement)
+        self.query = statement
+        time.sleep(self.conn.latency)
+        if self.query.startswith("select object_key"):
+            self._rows = [(object_key, value[0]) for object_key, value in self.conn.fingerprints.items()]
+        else:
+            self._rows = [(self.sfqid, row_number) for row_number in range(self.conn.rows_per_query)]
+        self.rowcount = len(self._rows)
+        return self
+
+    def fetchmany(self, size):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def close(self):
+        pass
+
+
+# Local stand-in for a consumer connection, approving each request approval_latency seconds after it is submitted
+class FakeConsumerConnection:
+    def __init__(self, approval_latency=0.05, latency=0.005, rows_per_query=10, rejected_templates=()):
+        self.approval_latency = approval_latency
+        self.latency = latency
+        self.rows_per_query = rows_per_query
+        self.rejected_templates = set(rejected_templates)
+        self.submitted = {}
+        self.result_cache = {}
+        self._lock = threading.Lock()
+
+    def cursor(self):
+        return FakeConsumerCursor(self)
+
+    def close(self):
+        pass
+
+
+class FakeConsumerCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self._rows = []
+
+    def execute(self, statement, params=None):
+        time.sleep(self.conn.latency)
+        if "_schema.request(" in statement:
+            template_name, parameters, request_id, at_timestamp = params
+            provider = statement.split()[1].split(".")[1][:-len("_schema")]
+            # like the request procedure, only requests without a given request id use the result cache, keyed by
+            # their timestamp if one was given
+            cache_key = (provider, template_name, parameters, at_timestamp) if request_id is None else None
+            with self.conn._lock:
+                cached = self.conn.result_cache.get(cache_key)
+            if cached is not None:
+                self._rows = [(json.dumps(["Cached Result", cached[0], cached[1]]),)]
+                return self
+            request_id = request_id or str(uuid.uuid4()).replace("-", "_")
+            database = statement.split()[1].split(".")[0]
+            request = {"REQUEST_ID": request_id, "QUERY_TEMPLATE": template_name, "REQUEST_TS": at_timestamp,
+                       "REQUEST_PARAMS": json.loads(parameters),
+                       "PROPOSED_QUERY": "select " + template_name + " from " + database}
+            with self.conn._lock:
+                self.conn.submitted[(provider, request_id)] = (
+                    time.perf_counter() + self.conn.approval_latency, template_name not in self.conn.rejected_templates,
+                    cache_key)
+            self._rows = [(json.dumps(["Request Sent", request_id, request]),)]
+        elif "_schema.run_request(" in statement:
+            provider = statement.split()[1].split(".")[1][:-len("_schema")]
+            result = {"COLUMNS": ["ROW_NUMBER"],
+                      "ROWS": [[row_number] for row_number in range(self.conn.rows_per_query)]}
+            with self.conn._lock:
+                cache_key = self.conn.submitted[(provider, params[0])][2]
+                if cache_key is not None:
+                    self.conn.result_cache[cache_key] = (params[0], result)
+            self._rows = [(json.dumps(["Request Complete", params[0], result]),)]
+        elif ".cleanroom.provider_log" in statement:
+            with self.conn._lock:
+                approvals = sorted((provider not in statement.upper(), approval)
+                                   for (provider, request_id), approval in self.conn.submitted.items()
+                                   if request_id == params[0])
+                approvals = [approval for _, approval in approvals]
+            if approvals and approvals[0][0] <= time.perf_counter():
+                self._rows = [(approvals[0][1], "None" if approvals[0][1] else "Not approved: rejected template")]
+            else:
+                self._rows = []
+        else:
+            self._rows = [(row_number,) for row_number in range(self.conn.rows_per_query)]
+        return self
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchmany(self, size):
+        return self._rows[:size]
+
+    def close(self):
+        pass
@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+import snowflake_dcr as dcr
+from tests.fake_snowflake import FakeConsumerConnection
+
+PROVIDER_ACCOUNTS = ["PROVIDER1", "PROVIDER2", "PROVIDER3"]
+APP_DATABASES = {provider_account: "dcr_samp_app_" + provider_account.lower() for provider_account in PROVIDER_ACCOUNTS}
+
+
+# Runs the given requests one after another on a new client, closing it afterwards
+def run_requests(conn, requests, **client_args):
+    client = dcr.ConsumerRequestClient(conn, app_databases=APP_DATABASES, poll_interval=0.01, **client_args)
+
+    async def run_sequential():
+        return [await client.request(*request) for request in requests]
+
+    try:
+        return asyncio.run(run_sequential()), client
+    finally:
+        client.close()
+
+
+def test_approved_request_returns_the_query_rows():
+    results, client = run_requests(FakeConsumerConnection(0.02, 0, rows_per_query=3),
+                                   [("provider1.us-east-1", "customer_overlap", {"dimensions": ["c.pets"]})])
+    assert results[0]["approved"] is True
+    assert results[0]["cached"] is False
+    assert [approval["provider_account"] for approval in results[0]["approvals"]] == ["PROVIDER1"]
+    assert results[0]["rows"] == [(0,), (1,), (2,)]
+
+
+def test_repeated_request_is_answered_from_the_result_cache():
+    request = ("PROVIDER1", "customer_overlap", {"dimensions": ["c.pets"]})
+    results, client = run_requests(FakeConsumerConnection(0.02, 0, rows_per_query=3), [request, request])
+    assert results[1]["cached"] is True
+    assert results[1]["request_id"] == results[0]["request_id"]
+    assert results[1]["approvals"] == []
+    assert results[1]["rows"] == results[0]["rows"]
+    assert client.latency_summary()["cached"] == 1
+
+
+def test_result_cache_can_be_turned_off():
+    request = ("PROVIDER1", "customer_overlap", {"dimensions": ["c.pets"]})
+    conn = FakeConsumerConnection(0.02, 0, rows_per_query=3)
+    results, client = run_requests(conn, [request, request], result_cache=False)
+    assert [result["cached"] for result in results] == [False, False]
+    assert results[0]["rows"] == [(0,), (1,), (2,)]
+    assert conn.result_cache == {}
+
+
+def test_rejected_request_returns_the_error_and_no_rows():
+    results, client = run_requests(FakeConsumerConnection(0.02, 0, rejected_templates=["drop_everything"]),
+                                   [("PROVIDER1", "drop_everything", {})])
+    assert results[0]["approved"] is False
+    assert results[0]["rows"] is None
+    assert results[0]["approvals"][0]["error"] == "Not approved: rejected template"
+
+
+def test_multi_party_request_shares_one_request_id():
+    conn = FakeConsumerConnection(0.02, 0, rows_per_query=2)
+    results, client = run_requests(conn, [(PROVIDER_ACCOUNTS, "customer_overlap_multiparty", {})])
+    assert results[0]["approved"] is True
+    assert sorted(approval["provider_account"] for approval in results[0]["approvals"]) == PROVIDER_ACCOUNTS
+    assert sorted(conn.submitted) == [(provider_account, results[0]["request_id"])
+                                      for provider_account in PROVIDER_ACCOUNTS]
+    assert results[0]["rows"] == [(0,), (1,)]
+
+
+def test_max_rows_limits_the_rows_returned():
+    results, client = run_requests(FakeConsumerConnection(0.02, 0, rows_per_query=10),
+                                   [("PROVIDER1", "customer_overlap", {}), (PROVIDER_ACCOUNTS, "multiparty", {})],
+                                   max_rows=4)
+    assert [len(result["rows"]) for result in results] == [4, 4]
+
+
+def test_unprocessed_request_times_out():
+    with pytest.raises(TimeoutError):
+        run_requests(FakeConsumerConnection(5, 0), [("PROVIDER1", "customer_overlap", {})], timeout=0.1)
+
+
+def test_request_many_returns_results_in_order():
+    conn = FakeConsumerConnection(0.02, 0, rejected_templates=["rejected"])
+    client = dcr.ConsumerRequestClient(conn, app_databases=APP_DATABASES, poll_interval=0.01)
+    requests = [("PROVIDER1", "customer_overlap", {"row": row}) for row in range(5)] + [("PROVIDER2", "rejected", {})]
+    results = asyncio.run(client.request_many(requests))
+    client.close()
+
+    assert [result["approved"] for result in results] == [True] * 5 + [False]
+    summary = client.latency_summary()
+    assert (summary["requests"], summary["approved"], summary["cached"]) == (6, 5, 0)
+    assert summary["p50"] <= summary["p95"] <= summary["max"]
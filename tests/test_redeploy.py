@@ -0,0 +1,115 @@
+import shutil
+import snowflake_dcr as dcr
+from tests.fake_snowflake import FakeSnowflakeConnection
+
+STATEMENTS = ["use role data_clean_room_role",
+              "create or replace table db.s.t (id int)",
+              "create or replace secure view db.s.v as select * from db.s.t",
+              "alter view db.s.v add row access policy db.s.firewall on (id)",
+              "delete from db.s.log where k = 1",
+              "insert into db.s.log values (1)",
+              "create table if not exists db.s.keep (id int)",
+              "create or replace view db.s.keep_v as select * from db.s.keep"]
+
+
+# Plans a redeploy of one script after a deployment of the previous statements
+def plan_statements(statements, previous_statements=None):
+    stored_fingerprints = {}
+    if previous_statements is not None:
+        _, fingerprints = dcr.plan_redeploy([("script.sql", previous_statements)], {})
+        stored_fingerprints = {object_key: fingerprint for object_key, (fingerprint, _) in fingerprints.items()}
+    run_plan, _ = dcr.plan_redeploy([("script.sql", statements)], stored_fingerprints)
+    return run_plan["script.sql"]
+
+
+# Returns the statements with the first occurrence of text replaced
+def change_statements(text, replacement):
+    return [statement.replace(text, replacement, 1) for statement in STATEMENTS]
+
+
+def test_first_redeploy_runs_every_statement():
+    assert plan_statements(STATEMENTS) == set(range(len(STATEMENTS)))
+
+
+def test_unchanged_redeploy_only_runs_session_statements():
+    assert plan_statements(STATEMENTS, STATEMENTS) == {0}
+
+
+def test_whitespace_changes_do_not_run_statements():
+    assert plan_statements(change_statements("select * from db.s.t", "select *\n  from db.s.t"), STATEMENTS) == {0}
+
+
+def test_rebuilt_objects_rerun_what_refers_to_them():
+    assert plan_statements(change_statements("t (id int)", "t (id bigint)"), STATEMENTS) == {0, 1, 2, 3}
+
+
+def test_changed_dml_runs_with_its_delete():
+    assert plan_statements(change_statements("values (1)", "values (2)"), STATEMENTS) == {0, 4, 5}
+
+
+def test_create_if_not_exists_rebuilds_nothing_once_deployed():
+    assert plan_statements(change_statements("keep (id int)", "keep (id int, name varchar)"), STATEMENTS) == {0, 6}
+
+
+def test_changed_policy_attachment_recreates_its_view():
+    assert plan_statements(change_statements("on (id)", "on (k)"), STATEMENTS) == {0, 2, 3}
+
+
+def test_fingerprints_are_stored_per_object_and_script():
+    _, fingerprints = dcr.plan_redeploy([("a.sql", STATEMENTS[:3]), ("b.sql", STATEMENTS[3:])], {})
+    assert fingerprints["table db.s.t"][1] == "a.sql"
+    assert fingerprints["row access policy attachment db.s.v"][1] == "b.sql"
+    assert fingerprints["table db.s.t"][0] == dcr.get_statement_hash("create or replace table db.s.t (id int)")
+
+
+# Redeploys the media and advertising clean room from path, returning the statement indexes run per script
+def redeploy(path, connections):
+    data_clean_room = dcr.SnowflakeDcr()
+    data_clean_room.prepare_dcr_deployment(False, "DCR 5.5 General Availability", "PROVIDER1",
+                                           connections["PROVIDER1"], "CONSUMER1", connections["CONSUMER1"], "", path,
+                                           "Media & Advertising")
+    data_clean_room.execute(redeploy=True)
+    return data_clean_room.redeploy_plan
+
+
+# Copies the scripts to a temporary directory with the first occurrence of text replaced in one script
+def build_changed_repo(repo_path, tmp_path, script, text, replacement):
+    changed_repo_path = str(tmp_path / "data-clean-room") + "/"
+    shutil.copytree(repo_path, changed_repo_path, dirs_exist_ok=True)
+    with open(changed_repo_path + script, "r", encoding='utf-8') as fin:
+        script_text = fin.read()
+    assert text in script_text
+    with open(changed_repo_path + script, "w", encoding='utf-8') as fout:
+        fout.write(script_text.replace(text, replacement, 1))
+    return changed_repo_path
+
+
+def test_redeploys_run_only_changed_statements(repo_path, tmp_path):
+    connections = {"PROVIDER1": FakeSnowflakeConnection("PROVIDER1"),
+                   "CONSUMER1": FakeSnowflakeConnection("CONSUMER1")}
+    first_plan = redeploy(repo_path, connections)
+    unchanged_plan = redeploy(repo_path, connections)
+    template_repo_path = build_changed_repo(repo_path, tmp_path, "media-and-advertising/provider_templates.sql",
+                                            "count(distinct p.email)  > 25", "count(distinct p.email)  > 50")
+    template_plan = redeploy(template_repo_path, connections)
+
+    statement_count = sum(len(indexes) for indexes in first_plan.values())
+    unchanged_count = sum(len(indexes) for indexes in unchanged_plan.values())
+    assert unchanged_count < statement_count / 4
+    assert sum(len(indexes) for indexes in template_plan.values()) > unchanged_count
+    changed_scripts = [script for script, indexes in template_plan.items() if indexes != unchanged_plan[script]]
+    assert changed_scripts == ["media-and-advertising/provider_templates.sql"]
+
+
+def test_policy_change_redeploys_without_replacing_the_attached_policy(repo_path, tmp_path):
+    connections = {"PROVIDER1": FakeSnowflakeConnection("PROVIDER1"),
+                   "CONSUMER1": FakeSnowflakeConnection("CONSUMER1")}
+    redeploy(repo_path, connections)
+    unchanged_plan = redeploy(repo_path, connections)
+    policy_repo_path = build_changed_repo(repo_path, tmp_path, "provider_init.sql", "and expires_ts > sysdate()",
+                                          "and expires_ts > current_timestamp()")
+    policy_plan = redeploy(policy_repo_path, connections)
+
+    changed_scripts = [script for script, indexes in policy_plan.items() if indexes != unchanged_plan[script]]
+    assert changed_scripts == ["provider_init.sql"]
+    assert connections["PROVIDER1"].attached_policies
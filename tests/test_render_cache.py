@@ -0,0 +1,73 @@
+import shutil
+import snowflake_dcr as dcr
+
+
+def prepare_deployment(path, consumer_account="CONSUMER1"):
+    data_clean_room = dcr.SnowflakeDcr()
+    data_clean_room.prepare_dcr_deployment(True, "DCR 5.5 General Availability", "PROVIDER1", None, consumer_account,
+                                           None, "", path, "Media & Advertising")
+    return data_clean_room
+
+
+def test_identical_plans_are_rendered_once(repo_path):
+    dcr.script_render_cache.clear()
+    first = prepare_deployment(repo_path)
+    first.render()
+    second = prepare_deployment(repo_path)
+    second.render()
+
+    assert dcr.script_render_cache.stats()["hits"] == 1
+    assert second.prepared_script_dict == first.prepared_script_dict
+    assert second.cleaned_script_dict == first.cleaned_script_dict
+
+
+def test_different_parameters_are_rendered_separately(repo_path):
+    dcr.script_render_cache.clear()
+    first = prepare_deployment(repo_path, "CONSUMER1")
+    first.render()
+    second = prepare_deployment(repo_path, "CONSUMER2")
+    second.render()
+
+    assert dcr.script_render_cache.stats()["hits"] == 0
+    assert "CONSUMER2" in second.prepared_script_dict["consumer_init.sql"]
+    assert "CONSUMER2" not in first.prepared_script_dict["consumer_init.sql"]
+
+
+def test_changed_script_is_rendered_again(repo_path, tmp_path):
+    changed_repo_path = str(tmp_path / "data-clean-room") + "/"
+    shutil.copytree(repo_path, changed_repo_path)
+    first = prepare_deployment(changed_repo_path)
+    first.render()
+    first_plan_hash = first.get_plan_hash()
+
+    with open(changed_repo_path + "provider_init.sql", "a", encoding='utf-8') as fout:
+        fout.write("\nselect 'changed';\n")
+    second = prepare_deployment(changed_repo_path)
+    second.render()
+
+    assert second.get_plan_hash() != first_plan_hash
+    assert "select 'changed';" in second.prepared_script_dict["provider_init.sql"]
+    assert "select 'changed';" not in first.prepared_script_dict["provider_init.sql"]
+
+
+def test_cached_scripts_are_copies(repo_path):
+    dcr.script_render_cache.clear()
+    first = prepare_deployment(repo_path)
+    first.render()
+    first.prepared_script_dict["provider_init.sql"] = "modified"
+
+    second = prepare_deployment(repo_path)
+    second.render()
+    assert second.prepared_script_dict["provider_init.sql"] != "modified"
+
+
+def test_least_recently_used_plans_are_evicted():
+    render_cache = dcr.ScriptRenderCache(max_entries=2)
+    render_cache.put("a", {"a.sql": "a"}, {"a.sql": "a"})
+    render_cache.put("b", {"b.sql": "b"}, {"b.sql": "b"})
+    render_cache.get("a")
+    render_cache.put("c", {"c.sql": "c"}, {"c.sql": "c"})
+
+    assert render_cache.get("b") is None
+    assert render_cache.get("a") == ({"a.sql": "a"}, {"a.sql": "a"})
+    assert render_cache.get("c") == ({"c.sql": "c"}, {"c.sql": "c"})
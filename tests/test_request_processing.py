@@ -0,0 +1,56 @@
+import pytest
+import snowflake_dcr as dcr
+
+PROVIDER_CONN = object()
+CONSUMER_CONN = object()
+PREPARE_METHODS = ["prepare_dcr_deployment", "prepare_consumer_addition", "prepare_provider_addition"]
+
+
+# Returns a debug dcr object prepared by the given prepare_ method, with placeholder connections to check the plan
+def prepare(path, prepare_method, **options):
+    data_clean_room = dcr.SnowflakeDcr()
+    if prepare_method == "prepare_provider_addition":
+        data_clean_room.prepare_provider_addition(True, "DCR 5.5 General Availability", "PROVIDER2", PROVIDER_CONN,
+                                                  "CONSUMER1", CONSUMER_CONN, "", "_two", path, "Media & Advertising",
+                                                  **options)
+    else:
+        getattr(data_clean_room, prepare_method)(True, "DCR 5.5 General Availability", "PROVIDER1", PROVIDER_CONN,
+                                                 "CONSUMER1", CONSUMER_CONN, "", path, "Media & Advertising",
+                                                 **options)
+    return data_clean_room
+
+
+# Returns the statements of a rendered script
+def statements(data_clean_room, script):
+    data_clean_room.render()
+    return list(dcr.iter_sql_statements(data_clean_room.prepared_script_dict[script]))
+
+
+@pytest.mark.parametrize("prepare_method", PREPARE_METHODS)
+def test_single_request_processor_is_the_default(repo_path, prepare_method):
+    data_clean_room = prepare(repo_path, prepare_method)
+    assert "provider_enable_consumer.sql" in data_clean_room.script_list
+    assert "provider_enable_consumer_batch.sql" not in data_clean_room.script_list
+
+
+@pytest.mark.parametrize("prepare_method", PREPARE_METHODS)
+def test_batch_request_processor_enables_the_consumer_on_the_provider(repo_path, prepare_method):
+    data_clean_room = prepare(repo_path, prepare_method, request_processor="Batch")
+    assert "provider_enable_consumer.sql" not in data_clean_room.script_list
+    position = data_clean_room.script_list.index("provider_enable_consumer_batch.sql")
+    assert data_clean_room.script_conn_list[position] is PROVIDER_CONN
+    assert any(script.startswith("consumer_init") for script in data_clean_room.script_dependency_list[position])
+
+
+def test_batch_request_processor_uses_the_shared_validation_procedure(repo_path):
+    data_clean_room = prepare(repo_path, "prepare_dcr_deployment", request_processor="Batch")
+    batch_statements = statements(data_clean_room, "provider_enable_consumer_batch.sql")
+    init_statements = statements(data_clean_room, "provider_init.sql")
+
+    assert any(statement.startswith("create or replace procedure dcr_samp_provider_db.admin.validate_requests(")
+               for statement in init_statements)
+    assert any("call dcr_samp_provider_db.admin.validate_requests('dcr_samp_provider_db.admin.request_batch_tmp')"
+               in statement for statement in batch_statements)
+    assert "call dcr_samp_provider_db.admin.process_requests_batch('CONSUMER1')" in batch_statements
+    assert any(statement.startswith("CREATE OR REPLACE TASK dcr_samp_provider_db.admin.process_requests_batch_"
+                                    "CONSUMER1") for statement in batch_statements)
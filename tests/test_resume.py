@@ -0,0 +1,105 @@
+import os
+import pytest
+import snowflake_dcr as dcr
+from tests.fake_snowflake import FakeSnowflakeConnection
+
+SCRIPT_TEXT = """use role data_clean_room_role;
+create temporary table tmp_ids (id int);
+insert into tmp_ids values (1);
+create table t1 (id int);
+create table t2 (id int);
+create table t3 (id int);
+"""
+
+
+# Returns a non-debug dcr object running one script from a temporary directory on conn, with a journal
+def prepare_single_script(tmp_path, conn, script_text=SCRIPT_TEXT):
+    (tmp_path / "script.sql").write_text(script_text, encoding='utf-8')
+    data_clean_room = dcr.SnowflakeDcr()
+    data_clean_room.is_debug_mode = False
+    data_clean_room.path = str(tmp_path) + "/"
+    data_clean_room.script_list = ["script.sql"]
+    data_clean_room.script_conn_list = [conn]
+    data_clean_room.script_dependency_list = [[]]
+    data_clean_room.check_words = []
+    data_clean_room.replace_words = []
+    data_clean_room.journal = dcr.DeploymentJournal(str(tmp_path / "journal.jsonl"))
+    return data_clean_room
+
+
+# Runs execute, returning the statements it sent to conn in order
+def run_statements(data_clean_room, conn, resume):
+    query_count = len(conn.queries)
+    try:
+        data_clean_room.execute(resume=resume)
+    except RuntimeError:
+        pass
+    return [statement for statement, _ in list(conn.queries.values())[query_count:]]
+
+
+def test_resume_skips_completed_statements_and_reruns_session_statements(tmp_path):
+    conn = FakeSnowflakeConnection(fail_after=5)
+    data_clean_room = prepare_single_script(tmp_path, conn)
+    assert len(run_statements(data_clean_room, conn, False)) == 5
+
+    assert run_statements(data_clean_room, conn, True) == ["use role data_clean_room_role",
+                                                           "create temporary table tmp_ids (id int)",
+                                                           "insert into tmp_ids values (1)",
+                                                           "create table t3 (id int)"]
+
+
+def test_resume_stops_skipping_at_the_first_changed_statement(tmp_path):
+    conn = FakeSnowflakeConnection(fail_after=5)
+    data_clean_room = prepare_single_script(tmp_path, conn)
+    run_statements(data_clean_room, conn, False)
+
+    data_clean_room = prepare_single_script(tmp_path, conn, SCRIPT_TEXT.replace("t2 (id int)", "t2 (id bigint)"))
+    assert run_statements(data_clean_room, conn, True)[3:] == ["create table t2 (id bigint)",
+                                                               "create table t3 (id int)"]
+
+
+def test_resume_after_a_completed_run_only_reruns_session_statements(tmp_path):
+    conn = FakeSnowflakeConnection()
+    data_clean_room = prepare_single_script(tmp_path, conn)
+    assert len(run_statements(data_clean_room, conn, False)) == 6
+    assert len(run_statements(data_clean_room, conn, True)) == 3
+
+
+def test_a_new_run_resets_the_journal(tmp_path):
+    conn = FakeSnowflakeConnection()
+    data_clean_room = prepare_single_script(tmp_path, conn)
+    run_statements(data_clean_room, conn, False)
+    run_statements(data_clean_room, conn, False)
+    assert data_clean_room.journal.load() == 6
+
+
+def test_resume_requires_a_journal(tmp_path):
+    data_clean_room = prepare_single_script(tmp_path, FakeSnowflakeConnection())
+    data_clean_room.journal = None
+    with pytest.raises(ValueError):
+        data_clean_room.execute(resume=True)
+
+
+def test_resumed_deployment_completes_without_rerunning_completed_statements(repo_path, tmp_path):
+    connections = {"PROVIDER1": FakeSnowflakeConnection("PROVIDER1"),
+                   "CONSUMER1": FakeSnowflakeConnection("CONSUMER1", fail_after=20)}
+    data_clean_room = dcr.SnowflakeDcr()
+    data_clean_room.journal = dcr.DeploymentJournal(str(tmp_path / "journal.jsonl"))
+    data_clean_room.prepare_dcr_deployment(False, "DCR 5.5 General Availability", "PROVIDER1",
+                                           connections["PROVIDER1"], "CONSUMER1", connections["CONSUMER1"], "",
+                                           repo_path, "Media & Advertising")
+    with pytest.raises(RuntimeError):
+        data_clean_room.execute()
+    first_run_count = len(connections["CONSUMER1"].queries)
+    completed_count = data_clean_room.journal.load()
+
+    data_clean_room.execute(resume=True)
+    resumed_statements = list(connections["CONSUMER1"].queries.values())[first_run_count:]
+    consumer_statement_count = 0
+    for current_script, script_conn in zip(data_clean_room.script_list, data_clean_room.script_conn_list):
+        if script_conn is connections["CONSUMER1"]:
+            script_text = data_clean_room.prepared_script_dict[os.path.basename(current_script)]
+            consumer_statement_count += len(list(dcr.iter_sql_statements(script_text)))
+    assert completed_count >= 20
+    assert first_run_count + len(resumed_statements) > consumer_statement_count
+    assert len(resumed_statements) < consumer_statement_count
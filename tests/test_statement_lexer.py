@@ -0,0 +1,52 @@
+import snowflake_dcr as dcr
+
+
+def split(script, remove_comments=True):
+    return list(dcr.iter_sql_statements(script, remove_comments))
+
+
+def test_splits_on_semicolons():
+    assert split("use role r;\nselect 1;\n\nselect 2") == ["use role r", "select 1", "select 2"]
+
+
+def test_semicolons_in_strings_and_identifiers_do_not_split():
+    assert split("select 'a;b', \"c;d\" from t;") == ["select 'a;b', \"c;d\" from t"]
+
+
+def test_escaped_quotes_stay_inside_strings():
+    assert split("select 'it''s;', 'a\\';b';select 2;") == ["select 'it''s;', 'a\\';b'", "select 2"]
+
+
+def test_dollar_bodies_are_one_statement():
+    script = "create function f() returns string as\n$$\nvar a = 1; // not a comment\nreturn 'x';\n$$;\nselect 1;"
+    assert split(script) == ["create function f() returns string as\n$$\nvar a = 1; // not a comment\n"
+                             "return 'x';\n$$", "select 1"]
+
+
+def test_comments_are_removed():
+    script = "// leading comment;\nselect 1; -- trailing; comment\n/* block;\ncomment */ select 2;"
+    assert split(script) == ["select 1", "select 2"]
+
+
+def test_comment_markers_in_strings_are_kept():
+    assert split("select '//x', '--y', '/*z*/';") == ["select '//x', '--y', '/*z*/'"]
+
+
+def test_comments_are_kept_when_asked():
+    assert split("select 1; // note\nselect 2;", remove_comments=False) == ["select 1", "// note\nselect 2"]
+
+
+def test_snowsql_directives_are_skipped():
+    assert split("!set variable_substitution=true\nselect 1;\n!print done\n") == ["select 1"]
+
+
+def test_comment_only_statements_are_dropped():
+    assert split("select 1;\n// only a comment\n;\n") == ["select 1"]
+
+
+def test_chunk_boundaries_do_not_change_statements(repo_path):
+    with open(repo_path + "provider_init.sql", "r", encoding='utf-8') as fin:
+        script_text = fin.read()
+    chunks = [script_text[i:i + 7] for i in range(0, len(script_text), 7)]
+    assert split(chunks) == split(script_text)
+    assert split(script_text)[-1] == "alter share dcr_samp_app add accounts = CONSUMER_ACCT"
@@ -0,0 +1,58 @@
+import pytest
+import snowflake_dcr as dcr
+from tests.fake_snowflake import FakeSnowflakeConnection, FakeSnowflakeCursor
+
+
+# Returns a query id for each statement, then loses the connection while reading its result
+class LostResultCursor(FakeSnowflakeCursor):
+    def execute(self, statement):
+        self.sfqid = self.conn.submit(statement)
+        raise ConnectionError("Simulated lost result")
+
+
+class LostResultConnection(FakeSnowflakeConnection):
+    def cursor(self):
+        return LostResultCursor(self)
+
+
+def test_statement_is_retried_until_it_is_submitted():
+    conn = FakeSnowflakeConnection(transient_failures=2)
+    query_id, row_count, rows = dcr.StatementRunner(retry_backoff=0).run(conn, "insert into t values (1)")
+    assert query_id in conn.queries
+    assert len(conn.queries) == 1
+    assert (row_count, rows) == (1, [])
+
+
+def test_retries_stop_after_max_retries():
+    conn = FakeSnowflakeConnection(transient_failures=3)
+    with pytest.raises(ConnectionError):
+        dcr.StatementRunner(max_retries=2, retry_backoff=0).run(conn, "insert into t values (1)")
+    assert conn.queries == {}
+
+
+def test_statement_with_a_query_id_is_not_resubmitted():
+    conn = LostResultConnection()
+    with pytest.raises(ConnectionError):
+        dcr.StatementRunner(retry_backoff=0).run(conn, "insert into t values (1)")
+    assert len(conn.queries) == 1
+
+
+def test_session_statements_are_retried_even_with_a_query_id():
+    conn = LostResultConnection()
+    with pytest.raises(ConnectionError):
+        dcr.StatementRunner(max_retries=2, retry_backoff=0).run(conn, "use role data_clean_room_role")
+    assert len(conn.queries) == 3
+
+
+def test_other_errors_are_not_retried():
+    conn = FakeSnowflakeConnection(fail_after=0)
+    with pytest.raises(RuntimeError):
+        dcr.StatementRunner(retry_backoff=0).run(conn, "insert into t values (1)")
+    assert conn.queries == {}
+
+
+def test_only_max_rows_rows_are_fetched():
+    conn = FakeSnowflakeConnection(rows_per_query=5)
+    query_id, row_count, rows = dcr.StatementRunner(max_rows=2).run(conn, "select * from t")
+    assert row_count == 5
+    assert rows == [(query_id, 0), (query_id, 1)]
@@ -0,0 +1,53 @@
+import snowflake_dcr as dcr
+
+
+# The per-line replacement loop the compiled engine replaced
+def replace_sequentially(text, check_words, replace_words):
+    lines = []
+    for line in text.splitlines(keepends=True):
+        for check, replace in zip(check_words, replace_words):
+            line = line.replace(check, replace)
+        lines.append(line)
+    return "".join(lines)
+
+
+def test_matches_sequential_replacement_for_deployment_words(repo_path):
+    check_words = ["PROVIDER_ACCT", "provider_acct", "CONSUMER_ACCT", "consumer_acct", "_SAMP_", "_samp_"]
+    replace_words = ["ABC12345", "ABC12345", "XYZ67890", "XYZ67890", "_demo_", "_demo_"]
+    for script in ["provider_init.sql", "consumer_init.sql", "provider_enable_consumer.sql"]:
+        with open(repo_path + script, "r", encoding='utf-8') as fin:
+            script_text = fin.read()
+        substitute = dcr.compile_substitutions(check_words, replace_words)
+        assert substitute(script_text) == replace_sequentially(script_text, check_words, replace_words)
+
+
+def test_longer_check_words_win():
+    substitute = dcr.compile_substitutions(["SNOWCAT", "SNOWCAT2"], ["first", "second"])
+    assert substitute("SNOWCAT2 and SNOWCAT") == "second and first"
+
+
+def test_replacements_are_not_substituted_again():
+    substitute = dcr.compile_substitutions(["PROVIDER_ACCT", "ABC"], ["ABC", "XYZ"])
+    assert substitute("PROVIDER_ACCT ABC") == "ABC XYZ"
+
+
+def test_first_replacement_of_a_repeated_check_word_is_used():
+    substitute = dcr.compile_substitutions(["_samp_", "_samp_"], ["_one_", "_two_"])
+    assert substitute("dcr_samp_app") == "dcr_one_app"
+
+
+def test_identity_pairs_do_not_shadow_overlapping_check_words():
+    substitute = dcr.compile_substitutions(["PROVIDER_ACCT", "PROVIDER_ACCT_schema"], ["PROVIDER_ACCT", "p_schema"])
+    assert substitute("PROVIDER_ACCT_schema.requests") == "p_schema.requests"
+
+
+def test_no_check_words_returns_text_unchanged():
+    assert dcr.compile_substitutions([], [])("select 1;") == "select 1;"
+    assert dcr.compile_substitutions(None, None)("select 1;") == "select 1;"
+
+
+def test_prepare_script_text_removes_snowsql_lines_and_keeps_comments():
+    substitute = dcr.compile_substitutions(["_samp_"], ["_demo_"])
+    prepared = dcr.prepare_script_text("!set variable_substitution=true\n// comment\nuse database dcr_samp_db;\n",
+                                       substitute)
+    assert prepared == "\n// comment\nuse database dcr_demo_db;\n"
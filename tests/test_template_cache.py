@@ -0,0 +1,74 @@
+import collections
+import pandas
+import pytest
+import snowflake_dcr as dcr
+
+
+@pytest.fixture
+def renderer(repo_path, monkeypatch):
+    renderer = dcr.load_template_renderer(repo_path)
+    monkeypatch.setattr(renderer, "_compiled_templates", collections.OrderedDict())
+    return renderer
+
+
+# Returns (template, parameters) for every template the media and advertising use case inserts
+def sample_templates(repo_path):
+    with open(repo_path + "media-and-advertising/provider_templates.sql", "r", encoding='utf-8') as fin:
+        templates = dcr.read_templates(fin.read())
+    return [(template, dict(dcr.SAMPLE_TEMPLATE_PARAMETERS, dimensions=dimensions.lower().split("|")[:2]))
+            for template_name, template, dimensions in templates]
+
+
+# Renders a template the way the UDF did before compiled templates were cached
+def render_uncached(renderer, template, parameters):
+    query, bind_params = renderer.JinjaSql(param_style='pyformat').prepare_query(template, parameters)
+    return renderer.strip_blank_lines(renderer.get_sql_from_template(query, bind_params))
+
+
+def test_renderer_is_loaded_once_per_script_version(repo_path):
+    assert dcr.load_template_renderer(repo_path) is dcr.load_template_renderer(repo_path)
+
+
+def test_same_template_is_compiled_once(renderer):
+    compiled = renderer.get_compiled_template("select {{ dimensions | sqlsafe }} from t")
+    assert renderer.get_compiled_template("select {{ dimensions | sqlsafe }} from t") is compiled
+    assert len(renderer._compiled_templates) == 1
+
+
+def test_least_recently_used_templates_are_evicted(renderer, monkeypatch):
+    monkeypatch.setattr(renderer, "COMPILED_TEMPLATE_CACHE_SIZE", 2)
+    first = renderer.get_compiled_template("select 1")
+    renderer.get_compiled_template("select 2")
+    renderer.get_compiled_template("select 1")
+    renderer.get_compiled_template("select 3")
+
+    assert len(renderer._compiled_templates) == 2
+    assert renderer.get_compiled_template("select 1") is first
+    assert renderer.get_compiled_template("select 2") is not None
+    assert len(renderer._compiled_templates) == 2
+
+
+def test_cached_rendering_matches_uncached_rendering(renderer, repo_path):
+    templates = sample_templates(repo_path)
+    assert templates
+    for template, parameters in templates:
+        expected = render_uncached(renderer, template, parameters)
+        assert renderer.apply_sql_template(template, parameters) == expected
+        assert renderer.apply_sql_template(template, parameters) == expected
+
+
+def test_vectorized_handler_renders_each_row(renderer, repo_path):
+    template, parameters = sample_templates(repo_path)[0]
+    df = pandas.DataFrame([[template, parameters], [template, dict(parameters, dimensions=["c.pets"])],
+                           [None, parameters], [template, None]])
+    results = renderer.apply_sql_templates(df)
+
+    assert list(results[:2]) == [renderer.apply_sql_template(template, parameters),
+                                 renderer.apply_sql_template(template, dict(parameters, dimensions=["c.pets"]))]
+    assert list(results[2:]) == [None, None]
+    assert len(renderer._compiled_templates) == 1
+
+
+def test_vectorized_handler_reads_json_parameters(renderer):
+    df = pandas.DataFrame([["select {{ dimensions | sqlsafe }} from t", '{"dimensions": "c.pets"}']])
+    assert list(renderer.apply_sql_templates(df)) == ["select c.pets from t"]